@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.imaging import ImageWriter, WRITE_CHUNK
+
+def make_images(workdir, size, changed):
+    base = os.path.join(workdir, "base.img")
+    new = os.path.join(workdir, "new.img")
+    with open(base, "wb") as f:
+        left = size
+        while left:
+            n = min(left, WRITE_CHUNK)
+            f.write(os.urandom(n))
+            left -= n
+    shutil.copyfile(base, new)
+    chunks = max(1, size // WRITE_CHUNK)
+    step = max(1, int(1 / changed)) if changed > 0 else 0
+    with open(new, "r+b") as f:
+        for i in range(0, chunks, step or chunks + 1):
+            f.seek(i * WRITE_CHUNK + 4096)
+            f.write(os.urandom(4096))
+    return base, new
+
+def timed_write(src, dst, **kw):
+    w = ImageWriter(**kw)
+    errors = []
+    w.on_error = errors.append
+    t0 = time.perf_counter()
+    c0 = time.process_time()
+    w.start(src, dst)
+    w._thread.join()
+    if errors:
+        raise RuntimeError(errors[0])
+    return {"seconds": round(time.perf_counter() - t0, 3),
+            "cpu_seconds": round(time.process_time() - c0, 3),
+            "stats": dict(w.stats)}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compare plain and delta rewrites of a nightly-style image.")
+    ap.add_argument("--size-mb", type=int, default=512)
+    ap.add_argument("--changed", type=float, default=0.05, help="fraction of chunks that differ")
+    ap.add_argument("--dir", default=None)
+    args = ap.parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="bitburner_bench_", dir=args.dir)
+    try:
+        base, new = make_images(workdir, args.size_mb * 1024 * 1024, args.changed)
+        results = {}
+        for mode, kw in (("plain", {}), ("delta", {"delta": True})):
+            target = os.path.join(workdir, f"target_{mode}.img")
+            shutil.copyfile(base, target)
+            results[mode] = timed_write(new, target, **kw)
+        results["speedup"] = round(results["plain"]["seconds"] / max(results["delta"]["seconds"], 1e-9), 2)
+        print(json.dumps(results, indent=2))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
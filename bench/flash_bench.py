@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+import os
+import sys
+import bz2
+import gzip
+import json
+import lzma
+import time
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MiB = 1024 * 1024
+KINDS = ("random", "zeros", "sparse")
+FORMATS = ("raw", "gz", "xz", "bz2", "zst")
+MODES = {
+    "buffered": {"direct": False, "writeback": 0},
+    "writeback": {"direct": False},
+    "direct": {"direct": True},
+    "dsync": {"direct": False, "sync": "dsync"},
+    "sparse": {"direct": False, "sparse": True},
+    "keep-cache": {"direct": False, "keep_source_cache": True},
+    "user-copy": {"direct": False, "zero_copy": False},
+}
+
+def _randbytes(rng, n):
+    return rng.getrandbits(n * 8).to_bytes(n, "little") if n else b""
+
+def make_raw(path, kind, size, seed):
+    rng = random.Random(seed)
+    with open(path, "wb") as f:
+        if kind == "sparse":
+            f.truncate(size)
+        for off in range(0, size, MiB):
+            n = min(MiB, size - off)
+            if kind == "random":
+                f.write(_randbytes(rng, n))
+            elif kind == "zeros":
+                f.write(_randbytes(rng, n) if rng.random() < 0.1 else bytes(n))
+            elif rng.random() < 0.1:
+                f.seek(off)
+                f.write(_randbytes(rng, n))
+
+def compress(raw, fmt):
+    out = f"{raw}.{fmt}"
+    if fmt == "zst":
+        try:
+            import zstandard
+            with open(raw, "rb") as fi, open(out, "wb") as fo:
+                zstandard.ZstdCompressor(level=3).copy_stream(fi, fo)
+            return out
+        except ImportError:
+            exe = shutil.which("zstd")
+            if not exe:
+                return None
+            subprocess.run([exe, "-q", "-3", "-f", raw, "-o", out], check=True)
+            return out
+    opener = {"gz": lambda p: gzip.open(p, "wb", compresslevel=6),
+              "xz": lambda p: lzma.open(p, "wb", preset=1),
+              "bz2": lambda p: bz2.open(p, "wb", compresslevel=1)}[fmt]
+    with open(raw, "rb") as fi, opener(out) as fo:
+        shutil.copyfileobj(fi, fo, MiB)
+    return out
+
+def _proc_io():
+    try:
+        with open("/proc/self/io") as f:
+            return {k: int(v) for k, v in (line.split(": ") for line in f)}
+    except Exception:
+        return {}
+
+def _meminfo_kb(*keys):
+    out = dict.fromkeys(keys, 0)
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                k = line.split(":", 1)[0]
+                if k in out:
+                    out[k] = int(line.split()[1])
+    except Exception:
+        pass
+    return out
+
+class _MemSampler(threading.Thread):
+    KEYS = ("Dirty", "Cached")
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.base = _meminfo_kb(*self.KEYS)
+        self.peak = dict(self.base)
+        self.stop = threading.Event()
+
+    def run(self):
+        while not self.stop.wait(self.interval):
+            now = _meminfo_kb(*self.KEYS)
+            self.peak = {k: max(self.peak[k], now[k]) for k in self.KEYS}
+
+    def growth(self, key):
+        return max(0, self.peak[key] - self.base[key])
+
+def _evict(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    except Exception:
+        pass
+
+def _resident_kb(path):
+    try:
+        import mmap
+        import ctypes
+        size = os.path.getsize(path)
+        if not size:
+            return 0
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p]
+        page = mmap.PAGESIZE
+        pages = (size + page - 1) // page
+        vec = (ctypes.c_ubyte * pages)()
+        with open(path, "rb") as f:
+            m = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_COPY)
+            try:
+                buf = ctypes.c_char.from_buffer(m)
+                try:
+                    if libc.mincore(ctypes.addressof(buf), size, vec) != 0:
+                        return None
+                finally:
+                    del buf
+            finally:
+                m.close()
+        return sum(v & 1 for v in vec) * page // 1024
+    except Exception:
+        return None
+
+def run_case(case):
+    from core.imaging import ImageWriter
+    kw = dict(MODES[case["mode"]])
+    w = ImageWriter(chunk_size=case["chunk"], adaptive=False, **kw)
+    errors = []
+    w.on_error = errors.append
+    _evict(case["image"])
+    mem = _MemSampler()
+    mem.start()
+    io0 = _proc_io()
+    c0 = time.process_time()
+    t0 = time.perf_counter()
+    w.start(case["image"], case["target"])
+    w._thread.join()
+    seconds = time.perf_counter() - t0
+    mem.stop.set()
+    mem.join()
+    resident = _resident_kb(case["image"])
+    sync = w.runs[0].times.get("sync") if w.runs else None
+    cpu = time.process_time() - c0
+    io1 = _proc_io()
+    if errors:
+        return {"error": errors[0]}
+    size = case["size"]
+    return {"seconds": round(seconds, 4), "mb_s": round(size / MiB / max(seconds, 1e-9), 2),
+            "cpu_seconds": round(cpu, 4), "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "read_syscalls": io1.get("syscr", 0) - io0.get("syscr", 0),
+            "write_syscalls": io1.get("syscw", 0) - io0.get("syscw", 0),
+            "dirty_peak_kb": mem.growth("Dirty"), "cached_peak_kb": mem.growth("Cached"),
+            "source_resident_kb": resident,
+            "sync_stall_seconds": round(sync[1] - sync[0], 4) if sync and sync[1] else None,
+            "written": w.stats["written"], "skipped": w.stats["skipped"], "copy_method": w.copy_method}
+
+class _Target:
+    def __init__(self, workdir, size, loop):
+        self.path = os.path.join(workdir, "target.img")
+        with open(self.path, "wb") as f:
+            f.truncate(size)
+        self.loop = None
+        if loop:
+            self.loop = subprocess.run(["losetup", "-f", "--show", self.path], check=True,
+                                       stdout=subprocess.PIPE, text=True).stdout.strip()
+
+    @property
+    def device(self):
+        return self.loop or self.path
+
+    def reset(self, size):
+        if not self.loop:
+            os.remove(self.path)
+            with open(self.path, "wb") as f:
+                f.truncate(size)
+
+    def close(self):
+        if self.loop:
+            subprocess.run(["losetup", "-d", self.loop], check=False)
+
+def _size_list(text):
+    out = []
+    for t in text.split(","):
+        t = t.strip().lower()
+        out.append(int(float(t[:-1]) * (1024 if t.endswith("k") else MiB)) if t[-1:] in "km" else int(t))
+    return out
+
+def compare(results, baseline, tolerance):
+    report = []
+    base = {r["case"]: r for r in baseline.get("results", [])}
+    for r in results:
+        b = base.get(r["case"])
+        if not b or "mb_s" not in b or "mb_s" not in r:
+            continue
+        ratio = r["mb_s"] / b["mb_s"] if b["mb_s"] else 0.0
+        report.append({"case": r["case"], "baseline_mb_s": b["mb_s"], "mb_s": r["mb_s"],
+                       "ratio": round(ratio, 3), "regressed": ratio < 1 - tolerance})
+    return report
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark ImageWriter on synthetic images and file/loop targets.")
+    ap.add_argument("--size-mb", type=int, default=256)
+    ap.add_argument("--kinds", default=",".join(KINDS))
+    ap.add_argument("--formats", default="raw,gz,xz")
+    ap.add_argument("--modes", default="buffered,writeback,direct", help=",".join(MODES))
+    ap.add_argument("--chunks", default="1M,8M", help="comma separated chunk sizes")
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--loop", action="store_true", help="write to a loop device (needs root)")
+    ap.add_argument("--dir", default=None, help="scratch directory (default: system temp)")
+    ap.add_argument("--baseline", help="JSON file from a previous run to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.1, help="allowed MB/s drop before a case counts as a regression")
+    ap.add_argument("--save", help="write the JSON report to this file")
+    ap.add_argument("--case", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.case:
+        print(json.dumps(run_case(json.loads(args.case))))
+        return 0
+    size = args.size_mb * MiB
+    workdir = tempfile.mkdtemp(prefix="bitburner_flash_bench_", dir=args.dir)
+    target = None
+    results = []
+    try:
+        target = _Target(workdir, size, args.loop)
+        for kind in args.kinds.split(","):
+            raw = os.path.join(workdir, f"{kind}.img")
+            make_raw(raw, kind, size, args.seed)
+            for fmt in args.formats.split(","):
+                image = raw if fmt == "raw" else compress(raw, fmt)
+                if not image:
+                    continue
+                for mode in args.modes.split(","):
+                    for chunk in _size_list(args.chunks):
+                        name = f"{kind}/{fmt}/{mode}/{chunk // 1024}k"
+                        runs = []
+                        for _ in range(args.repeat):
+                            target.reset(size)
+                            case = {"image": image, "target": target.device, "mode": mode, "chunk": chunk, "size": size}
+                            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--case", json.dumps(case)],
+                                                 stdout=subprocess.PIPE, text=True, check=False)
+                            try:
+                                runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+                            except Exception:
+                                runs.append({"error": f"case exited with {out.returncode}"})
+                        ok = [r for r in runs if "error" not in r]
+                        best = max(ok, key=lambda r: r["mb_s"]) if ok else runs[0]
+                        results.append(dict(best, case=name, kind=kind, format=fmt, mode=mode, chunk=chunk))
+                        print(f"{name:<32} " + (f"{best['mb_s']:9.1f} MB/s" if ok else best["error"]), file=sys.stderr)
+                if image != raw:
+                    os.remove(image)
+            os.remove(raw)
+    finally:
+        if target:
+            target.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    report = {"size_mb": args.size_mb, "seed": args.seed, "loop": args.loop,
+              "python": sys.version.split()[0], "results": results}
+    code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(results, json.load(f), args.tolerance)
+        code = 1 if any(c["regressed"] for c in report["comparison"]) else 0
+    text = json.dumps(report, indent=2)
+    if args.save:
+        with open(args.save, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flash_bench import make_raw, compress
+from core.imaging import ImageWriter
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    root = "."
+    ranges = True
+    fail_rate = 0.0
+    latency = 0.0
+    rate = 0
+    stats = {"requests": 0, "connections": set(), "dropped": 0}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        st = self.stats
+        st["requests"] += 1
+        st["connections"].add(self.client_address)
+        path = os.path.join(self.root, os.path.basename(self.path.split("?", 1)[0]))
+        if not os.path.isfile(path):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        size = os.path.getsize(path)
+        m = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+        if m and self.ranges:
+            a, b = int(m.group(1)), min(int(m.group(2) or size - 1), size - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {a}-{b}/{size}")
+        else:
+            a, b = 0, size - 1
+            self.send_response(200)
+        self.send_header("Content-Length", str(b - a + 1))
+        self.end_headers()
+        time.sleep(self.latency)
+        with open(path, "rb") as f:
+            f.seek(a)
+            left = b - a + 1
+            while left:
+                data = f.read(min(left, 64 * 1024))
+                if random.random() < self.fail_rate:
+                    st["dropped"] += 1
+                    self.close_connection = True
+                    return
+                if self.rate:
+                    time.sleep(len(data) / self.rate)
+                try:
+                    self.wfile.write(data)
+                except OSError:
+                    return
+                left -= len(data)
+
+def serve(root, ranges=True, fail_rate=0.0, latency=0.0, rate=0):
+    handler = type("Handler", (_Handler,), {"root": root, "ranges": ranges, "fail_rate": fail_rate,
+                                            "latency": latency, "rate": rate,
+                                            "stats": {"requests": 0, "connections": set(), "dropped": 0}})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, handler.stats
+
+def run_case(url, target, size):
+    w = ImageWriter()
+    errors = []
+    w.on_error = errors.append
+    t0 = time.perf_counter()
+    w.start(url, target)
+    w._thread.join()
+    seconds = time.perf_counter() - t0
+    if errors:
+        return {"error": errors[0]}
+    return {"seconds": round(seconds, 3), "mb_s": round(size / 1048576 / max(seconds, 1e-9), 2),
+            "written": w.stats["written"]}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Flash images served by a local HTTP stand-in with Range support.")
+    ap.add_argument("--size-mb", type=int, default=128)
+    ap.add_argument("--formats", default="raw,xz,gz")
+    ap.add_argument("--latency", type=float, default=0.02, help="per-request server latency in seconds")
+    ap.add_argument("--rate-mb", type=float, default=0, help="per-connection server bandwidth cap (0: unlimited)")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="chance to drop a connection per 64 KiB sent")
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--dir", default=None)
+    args = ap.parse_args(argv)
+    size = args.size_mb * 1048576
+    workdir = tempfile.mkdtemp(prefix="bitburner_http_bench_", dir=args.dir)
+    results = []
+    try:
+        raw = os.path.join(workdir, "image.img")
+        make_raw(raw, "zeros", size, args.seed)
+        target = os.path.join(workdir, "target.img")
+        for fmt in args.formats.split(","):
+            image = raw if fmt == "raw" else compress(raw, fmt)
+            if not image:
+                continue
+            for ranges in (True, False):
+                server, stats = serve(workdir, ranges, args.fail_rate if ranges else 0.0, args.latency,
+                                      int(args.rate_mb * 1048576))
+                try:
+                    open(target, "wb").close()
+                    url = f"http://127.0.0.1:{server.server_address[1]}/{os.path.basename(image)}"
+                    r = run_case(url, target, size)
+                finally:
+                    server.shutdown()
+                    server.server_close()
+                r.update(format=fmt, ranged=ranges, requests=stats["requests"],
+                         connections=len(stats["connections"]), dropped=stats["dropped"])
+                results.append(r)
+                print(f"{fmt:<4} {'ranged' if ranges else 'single':<7} " +
+                      (f"{r['mb_s']:9.1f} MB/s" if "mb_s" in r else r["error"]), file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps({"size_mb": args.size_mb, "results": results}, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
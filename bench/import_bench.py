@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("PySide6", "psutil", "ctypes", "zipfile", "xml", "core.imaging", "core.sources", "core.bmap")
+
+PROBE = """
+import sys, io, contextlib
+sys.path.insert(0, {root!r})
+from core.cli import main
+with contextlib.redirect_stdout(io.StringIO()):
+    main(["list", "--json"])
+heavy = {heavy!r}
+print(",".join(sorted(m for m in sys.modules if m.split(".")[0] in heavy or m in heavy)))
+"""
+
+def wall(cmd, runs):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Guard the start-up time of the headless 'list' command.")
+    ap.add_argument("--runs", type=int, default=15)
+    ap.add_argument("--budget-ms", type=float, default=120.0, help="allowed overhead over a bare interpreter")
+    args = ap.parse_args(argv)
+    base = wall([sys.executable, "-c", "pass"], args.runs)
+    cli = wall([sys.executable, os.path.join(ROOT, "main.py"), "list", "--json"], args.runs)
+    probe = subprocess.run([sys.executable, "-c", PROBE.format(root=ROOT, heavy=HEAVY)],
+                           stdout=subprocess.PIPE, text=True, check=False)
+    loaded = [m for m in probe.stdout.strip().split(",") if m]
+    if not sys.platform.startswith("linux"):
+        loaded = [m for m in loaded if m.split(".")[0] not in ("psutil", "ctypes")]
+    result = {"interpreter_ms": round(base, 1), "list_ms": round(cli, 1),
+              "overhead_ms": round(cli - base, 1), "budget_ms": args.budget_ms,
+              "heavy_modules_loaded": loaded}
+    print(json.dumps(result, indent=2))
+    return 0 if cli - base <= args.budget_ms and not loaded else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import os
+import hashlib
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Optional, List, Tuple
+
+COMPRESSED_SUFFIXES = (".zip", ".gz", ".xz", ".bz2", ".zst")
+
+@dataclass
+class BlockMap:
+    image_size: int
+    block_size: int
+    checksum_type: str
+    ranges: List[Tuple[int, int, Optional[str]]] = field(default_factory=list)
+
+    @property
+    def mapped_bytes(self) -> int:
+        return sum(end - start for start, end, _ in self.ranges)
+
+def _text(root, *tags) -> Optional[str]:
+    for tag in tags:
+        el = root.find(tag)
+        if el is not None and el.text:
+            return el.text.strip()
+    return None
+
+def _check_file_digest(raw: bytes, root, ctype: str):
+    stored = _text(root, "BmapFileChecksum", "BmapFileSHA1")
+    if not stored:
+        return
+    blank = raw.replace(stored.encode(), b"0" * len(stored), 1)
+    if hashlib.new(ctype, blank).hexdigest() != stored:
+        raise ValueError("Block map file checksum mismatch.")
+
+def parse_bmap(path: str) -> BlockMap:
+    with open(path, "rb") as f:
+        raw = f.read()
+    root = ET.fromstring(raw)
+    if root.tag != "bmap":
+        raise ValueError("Not a block map file.")
+    major = int((root.get("version") or "1.0").split(".")[0])
+    ctype = (_text(root, "ChecksumType") or ("sha1" if major < 2 else "sha256")).lower()
+    _check_file_digest(raw, root, ctype)
+    image_size = int(_text(root, "ImageSize") or "0")
+    block_size = int(_text(root, "BlockSize") or "0")
+    if image_size <= 0 or block_size <= 0:
+        raise ValueError("Block map is missing ImageSize/BlockSize.")
+    bm = BlockMap(image_size, block_size, ctype)
+    blockmap = root.find("BlockMap")
+    for el in (blockmap if blockmap is not None else []):
+        if el.tag != "Range" or not el.text:
+            continue
+        span = el.text.strip()
+        first, _, last = span.partition("-")
+        a = int(first)
+        b = int(last) if last else a
+        start = a * block_size
+        end = min((b + 1) * block_size, image_size)
+        if start >= end or (bm.ranges and start < bm.ranges[-1][1]):
+            raise ValueError(f"Invalid block map range {span}.")
+        bm.ranges.append((start, end, el.get("chksum") or el.get("sha1")))
+    return bm
+
+def find_bmap(image_path: str) -> Optional[str]:
+    stem = image_path
+    candidates = [image_path + ".bmap"]
+    while stem.lower().endswith(COMPRESSED_SUFFIXES):
+        stem = os.path.splitext(stem)[0]
+        candidates.append(stem + ".bmap")
+    candidates.append(os.path.splitext(stem)[0] + ".bmap")
+    return next((c for c in candidates if os.path.isfile(c)), None)
@@ -0,0 +1,129 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Optional, Dict, List
+
+from core.journal import state_dir
+
+SIDECAR_SUFFIXES = (".sha256", ".sha256sum", ".sha512", ".sha512sum", ".sha1", ".md5")
+SUMS_FILES = ("SHA256SUMS", "SHA512SUMS", "SHA1SUMS", "MD5SUMS", "sha256sum.txt", "sha512sum.txt")
+DIGEST_ALGOS = {32: "md5", 40: "sha1", 64: "sha256", 128: "sha512"}
+CATCHUP_CHUNK = 4 * 1024 * 1024
+CACHE_ENTRIES = 512
+
+_GNU_LINE = re.compile(r"^\\?([0-9a-fA-F]{32,128})\s+[ *]?(.+?)\s*$")
+_BSD_LINE = re.compile(r"^(\w+)\s*\((.+)\)\s*=\s*([0-9a-fA-F]{32,128})\s*$")
+
+@dataclass
+class Checksum:
+    algo: str
+    digest: str
+    sidecar: str
+
+def _same_name(listed: str, image_path: str) -> bool:
+    listed = listed.replace("\\", "/")
+    if listed.startswith("./"):
+        listed = listed[2:]
+    return os.path.basename(listed) == os.path.basename(image_path)
+
+def parse_checksum(sidecar: str, image_path: str) -> Optional[Checksum]:
+    with open(sidecar, "r", encoding="utf-8", errors="replace") as f:
+        lines = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    own = sidecar.lower().endswith(SIDECAR_SUFFIXES)
+    for line in lines:
+        m = _BSD_LINE.match(line)
+        if m:
+            algo = m.group(1).lower().replace("-", "")
+            if algo in hashlib.algorithms_available and _same_name(m.group(2), image_path):
+                return Checksum(algo, m.group(3).lower(), sidecar)
+            continue
+        m = _GNU_LINE.match(line)
+        digest = m.group(1) if m else line.split()[0]
+        algo = DIGEST_ALGOS.get(len(digest))
+        if not algo or not re.fullmatch(r"[0-9a-fA-F]+", digest):
+            continue
+        if (m and _same_name(m.group(2), image_path)) or (own and len(lines) == 1):
+            return Checksum(algo, digest.lower(), sidecar)
+    return None
+
+def find_checksum(image_path: str) -> Optional[Checksum]:
+    folder = os.path.dirname(os.path.abspath(image_path))
+    candidates = [image_path + s for s in SIDECAR_SUFFIXES] + [os.path.join(folder, n) for n in SUMS_FILES]
+    for c in candidates:
+        if os.path.isfile(c):
+            try:
+                found = parse_checksum(c, image_path)
+            except Exception:
+                found = None
+            if found:
+                return found
+    return None
+
+def file_key(path: str) -> str:
+    st = os.stat(path)
+    return f"{os.path.realpath(path)}|{st.st_size}|{st.st_mtime_ns}|{st.st_dev}:{st.st_ino}"
+
+class HashCache:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(state_dir(), "hashes.json")
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, object]]:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    def lookup(self, key: str, algo: str) -> Optional[str]:
+        with self._lock:
+            entry = self._load().get(key) or {}
+        digest = entry.get(algo)
+        return digest if isinstance(digest, str) else None
+
+    def store(self, key: str, algo: str, digest: str):
+        with self._lock:
+            data = self._load()
+            entry = data.pop(key, None) or {}
+            entry[algo] = digest
+            entry["checked"] = int(time.time())
+            data[key] = entry
+            keep: List[str] = sorted(data, key=lambda k: data[k].get("checked", 0))[-CACHE_ENTRIES:]
+            data = {k: data[k] for k in keep}
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp = self.path + ".tmp"
+                with open(tmp, "w") as f:
+                    json.dump(data, f)
+                os.replace(tmp, self.path)
+            except Exception:
+                pass
+
+class SourceHasher:
+    def __init__(self, algo: str):
+        self.algo = algo
+        self.pos = 0
+        self._h = hashlib.new(algo)
+        self._lock = threading.Lock()
+
+    def feed(self, offset: int, data):
+        with self._lock:
+            end = offset + len(data)
+            if offset <= self.pos < end:
+                self._h.update(memoryview(data)[self.pos - offset:])
+                self.pos = end
+
+    def finish(self, raw) -> str:
+        off = raw.seek(self.pos)
+        while True:
+            data = raw.read(CATCHUP_CHUNK)
+            if not data:
+                break
+            self.feed(off, data)
+            off += len(data)
+        return self._h.hexdigest()
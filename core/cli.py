@@ -0,0 +1,297 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from typing import List, Optional
+
+COMMANDS = ("list", "write", "verify", "queue")
+
+def _size_arg(text: str) -> int:
+    units = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+    t = text.strip().lower().rstrip("ib")
+    if t and t[-1] in units:
+        return int(float(t[:-1]) * units[t[-1]])
+    return int(t)
+
+class _Reporter:
+    def __init__(self, as_json: bool, stream=None):
+        self.as_json = as_json
+        self.out = stream or sys.stdout
+        self.lock = threading.Lock()
+
+    def event(self, kind: str, **fields):
+        if not self.as_json:
+            return
+        fields["event"] = kind
+        fields["time"] = round(time.time(), 3)
+        with self.lock:
+            self.out.write(json.dumps(fields) + "\n")
+            self.out.flush()
+
+    def text(self, line: str, end: str = "\n"):
+        if self.as_json:
+            return
+        with self.lock:
+            sys.stderr.write(line + end)
+            sys.stderr.flush()
+
+def cmd_list(args) -> int:
+    from core.device_manager import list_devices
+    from core.utils import human_size
+    from dataclasses import asdict
+    devices = list_devices()
+    if args.json:
+        print(json.dumps([{"path": d.path, "name": d.name, "size": d.size, "protected": d.protected,
+                           "caps": asdict(d.caps) if d.caps else None} for d in devices]))
+        return 0
+    for d in devices:
+        status = "SYSTEM (LOCKED)" if d.protected else "available"
+        print(f"{d.path:<24} {human_size(d.size):>10}  {status:<16} {d.name}")
+    return 0
+
+def _guard_targets(paths: List[str], force: bool) -> Optional[str]:
+    if force:
+        return None
+    try:
+        from core.device_manager import system_disk_path
+        sysdisk = system_disk_path()
+    except Exception:
+        sysdisk = None
+    for p in paths:
+        if sysdisk and os.path.realpath(p).lower() == sysdisk.lower():
+            return f"{p} appears to be the system disk; refusing to touch it (use --force to override)."
+    return None
+
+def _run_writer(args, compare_only: bool) -> int:
+    from core.imaging import ImageWriter
+    from core.telemetry import Telemetry
+    from core.bmap import find_bmap, parse_bmap
+    from core.checksum import find_checksum, parse_checksum
+    rep = _Reporter(args.json)
+    err = _guard_targets(args.devices, args.force)
+    if err:
+        rep.event("error", message=err)
+        rep.text(err)
+        return 2
+    bmap = None
+    if not args.no_bmap:
+        bmap = args.bmap or find_bmap(args.image)
+        if bmap and not args.bmap:
+            try:
+                parse_bmap(bmap)
+            except Exception as e:
+                rep.event("warning", message=f"Ignoring {bmap}: {e}")
+                rep.text(f"Ignoring {bmap}: {e}")
+                bmap = None
+    checksum = None
+    if not args.no_checksum:
+        try:
+            checksum = parse_checksum(args.checksum, args.image) if args.checksum else find_checksum(args.image)
+        except Exception as e:
+            rep.event("error", message=f"Cannot read checksum file: {e}")
+            rep.text(f"Cannot read checksum file: {e}")
+            return 1
+        if args.checksum and not checksum:
+            msg = f"{args.checksum} does not list {os.path.basename(args.image)}."
+            rep.event("error", message=msg)
+            rep.text(msg)
+            return 1
+    w = ImageWriter(chunk_size=args.chunk_size, queue_depth=args.queue_depth,
+                    direct=getattr(args, "direct", None), sync=getattr(args, "sync", None),
+                    sparse=getattr(args, "sparse", False), discard=getattr(args, "discard", None),
+                    verify=getattr(args, "verify", False), delta=getattr(args, "delta", False),
+                    compare_only=compare_only, adaptive=getattr(args, "adaptive", None),
+                    writeback=getattr(args, "writeback", None), resume=getattr(args, "resume", False),
+                    io_depth=getattr(args, "io_depth", None), lag_timeout=getattr(args, "lag_timeout", None),
+                    keep_source_cache=args.keep_source_cache, zero_copy=getattr(args, "zero_copy", None))
+    finished = threading.Event()
+    outcome = {"code": 1}
+    phase_name = "compare" if compare_only else "write"
+    tel = Telemetry(w)
+    reported = set()
+
+    def progress():
+        snap = tel.sample()
+        for d in snap["devices"]:
+            key = (d["path"], d["phase"])
+            if key in reported or not (d["finished"] or d["state"] in ("writing", "verifying")):
+                continue
+            if d["finished"]:
+                reported.add(key)
+            phase = phase_name if d["phase"] == "write" else d["phase"]
+            tuned = w.tuning.get(d["path"], {})
+            rep.event("progress", device=d["path"], phase=phase, ratio=round(d["ratio"], 4), done=d["done"],
+                      total=d["total"], bps=int(d["bps"]), eta=d["eta"], elapsed=d["elapsed"],
+                      chunk=tuned.get("chunk"), depth=tuned.get("depth"))
+        o = snap["verify"] or snap["write"]
+        if o:
+            phase = phase_name if o["phase"] == "write" else o["phase"]
+            eta = o["eta"]
+            rep.text(f"\r{phase}: {o['ratio']*100:5.1f}%  {o['bps']/1048576:8.1f} MiB/s  ETA {eta if eta >= 0 else '?'}s   ", end="")
+
+    def device_error(path, msg):
+        rep.event("device_error", device=path, message=msg)
+        rep.text(f"\n{path}: {msg}")
+
+    def device_finished(path):
+        rep.event("device_finished", device=path)
+
+    def done(code, kind, text=None, **fields):
+        outcome["code"] = code
+        progress()
+        if text:
+            rep.text(text)
+        rep.event(kind, stats=w.stats, results=w.results, checksum=w.source_check, copy=w.copy_method, **fields)
+        finished.set()
+
+    def on_finished():
+        failed = any(e for e in w.results.values())
+        filled = w.stats.get("zero_filled")
+        if filled:
+            msg = (f"{filled / 1048576:.1f} MiB of skipped zero ranges were written out as zeros; "
+                   "the target has no fast zeroing, so --sparse only saved reading them.")
+            rep.event("warning", message=msg)
+            rep.text(f"\n{msg}", end="")
+        text = "\nDone." if not failed else "\nDone with failures."
+        if w.source_check:
+            text += f" Image checksum {'verified' if w.source_check == 'verified' else 'trusted from cache'}."
+        done(1 if failed else 0, "finished", text)
+
+    def on_error(msg):
+        done(1, "error", f"\n{msg}", message=msg)
+
+    w.on_device_error = device_error
+    w.on_device_finished = device_finished
+    w.on_device_tuning = lambda path, entry: rep.event("tuning", device=path, **entry)
+    w.on_finished = on_finished
+    w.on_error = on_error
+    w.on_canceled = lambda: done(130, "canceled", "\nCanceled.")
+    rep.event("start", image=args.image, devices=args.devices, bmap=bmap, mode=phase_name,
+              checksum=checksum.sidecar if checksum else None)
+    w.start(args.image, args.devices if len(args.devices) > 1 else args.devices[0], bmap, checksum)
+    try:
+        while not finished.wait(args.interval):
+            progress()
+    except KeyboardInterrupt:
+        w.cancel()
+        finished.wait()
+    return outcome["code"]
+
+def cmd_write(args) -> int:
+    return _run_writer(args, compare_only=False)
+
+def cmd_verify(args) -> int:
+    return _run_writer(args, compare_only=True)
+
+def cmd_queue(args) -> int:
+    from core.scheduler import JobScheduler
+    from core.imaging import ImageWriter
+    rep = _Reporter(args.json)
+    err = _guard_targets([device for _, device in args.job], args.force)
+    if err:
+        rep.event("error", message=err)
+        rep.text(err)
+        return 2
+    s = JobScheduler(lambda: ImageWriter(verify=args.verify, keep_source_cache=args.keep_source_cache),
+                     per_hub=args.per_hub, per_bus=args.per_bus, max_jobs=args.max_jobs,
+                     bus_bps=args.bus_bandwidth)
+    for image, device in args.job:
+        s.submit(image, device)
+
+    def started(job):
+        t = job.topology
+        rep.event("job_started", image=job.image, device=job.device, bus=t.bus, hub=t.hub, port=t.port)
+        rep.text(f"\n{job.device}: writing {os.path.basename(job.image)} (bus {t.bus}, port {t.port})")
+
+    def finished(job):
+        rep.event("job_finished", **job.snapshot())
+        rep.text(f"\n{job.device}: {job.error or job.state} ({job.average_bps / 1048576:.1f} MiB/s)")
+
+    s.on_job_started = started
+    s.on_job_finished = finished
+    s.start()
+    try:
+        while not s.wait(args.interval):
+            t = s.throughput()
+            rep.event("progress", **{k: v for k, v in t.items() if k != "buses"})
+            rep.text(f"\rqueue: {t['running']} running, {t['queued']} waiting  {t['bps'] / 1048576:8.1f} MiB/s   ", end="")
+    except KeyboardInterrupt:
+        s.cancel()
+        s.wait()
+        return 130
+    t = s.throughput()
+    rep.event("finished", **t)
+    failed = [j for j in s.jobs if j.state != "done"]
+    rep.text(f"\n{len(s.jobs) - len(failed)}/{len(s.jobs)} jobs done, {t['average_bps'] / 1048576:.1f} MiB/s overall.")
+    return 1 if failed else 0
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="bitburner", description="Write disk images to USB/SD devices.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("list", help="list block devices")
+    p.add_argument("--json", action="store_true", help="print devices as JSON")
+    p.set_defaults(func=cmd_list)
+    p = sub.add_parser("queue", help="write several images to several devices, scheduled by USB bus")
+    p.add_argument("-j", "--job", nargs=2, action="append", required=True, metavar=("IMAGE", "DEVICE"),
+                   help="add a job; repeat for each image/device pair")
+    p.add_argument("--per-hub", type=int, default=2, help="concurrent jobs behind one hub (0: unlimited)")
+    p.add_argument("--per-bus", type=int, default=3, help="concurrent jobs on one USB bus (0: unlimited)")
+    p.add_argument("--max-jobs", type=int, help="concurrent jobs overall (default: unlimited)")
+    p.add_argument("--bus-bandwidth", type=_size_arg, help="bytes/s one bus sustains (default: from link speed)")
+    p.add_argument("--verify", action="store_true", help="read each device back after writing")
+    p.add_argument("--keep-source-cache", action="store_true", help="leave images in the page cache")
+    p.add_argument("--force", action="store_true", help="allow targeting the system disk")
+    p.add_argument("--json", action="store_true", help="emit JSON progress events on stdout")
+    p.add_argument("--interval", type=float, default=0.5, help="seconds between progress reports")
+    p.set_defaults(func=cmd_queue)
+    for name, func, helptext in (("write", cmd_write, "write an image to one or more devices"),
+                                 ("verify", cmd_verify, "compare devices against an image without writing")):
+        p = sub.add_parser(name, help=helptext)
+        p.add_argument("image", help="image file or http(s) URL")
+        p.add_argument("devices", nargs="+")
+        p.add_argument("--json", action="store_true", help="emit JSON progress events on stdout")
+        p.add_argument("--bmap", help="block map file (default: auto-detect sidecar)")
+        p.add_argument("--no-bmap", action="store_true", help="ignore any block map sidecar")
+        p.add_argument("--checksum", help="SHA256SUMS-style file to check the image against (default: auto-detect)")
+        p.add_argument("--no-checksum", action="store_true", help="ignore any checksum sidecar")
+        p.add_argument("--chunk-size", type=_size_arg, help="default: tuned to the device")
+        p.add_argument("--queue-depth", type=int, help="default: tuned to the device")
+        p.add_argument("--force", action="store_true", help="allow targeting the system disk")
+        p.add_argument("--keep-source-cache", action="store_true",
+                       help="leave the image in the page cache instead of dropping it behind the reader")
+        p.add_argument("--interval", type=float, default=0.5, help="seconds between progress reports")
+        p.set_defaults(func=func)
+        if name == "write":
+            p.add_argument("--verify", action="store_true", help="read the device back after writing")
+            p.add_argument("--sparse", action="store_true",
+                           help="zero holes and all-zero chunks on the target instead of writing them")
+            p.add_argument("--discard", action=argparse.BooleanOptionalAction,
+                           help="discard the target range before a sparse write (default: if supported)")
+            p.add_argument("--delta", action="store_true", help="only rewrite chunks that differ")
+            p.add_argument("--direct", action=argparse.BooleanOptionalAction,
+                           help="bypass the page cache with O_DIRECT (default: for USB/SD targets)")
+            p.add_argument("--adaptive", action=argparse.BooleanOptionalAction,
+                           help="adjust chunk size, read-ahead and writes in flight while writing "
+                                "(default: unless --chunk-size is given)")
+            p.add_argument("--writeback", type=_size_arg,
+                           help="flush buffered writes behind the cursor every SIZE bytes (default 32M, 0 disables)")
+            p.add_argument("--resume", action="store_true",
+                           help="continue an interrupted write of the same image to the same device")
+            p.add_argument("--io-depth", type=int,
+                           help="positional writes kept in flight per device (default: 4 for NVMe/USB SSD, else 1)")
+            p.add_argument("--lag-timeout", type=float, metavar="SECONDS",
+                           help="with several devices, drop one that stalls the others for this long (default: never)")
+            p.add_argument("--sync", choices=["dsync", "sync"], help="open the target with O_DSYNC/O_SYNC")
+            p.add_argument("--zero-copy", action=argparse.BooleanOptionalAction,
+                           help="copy raw images and stored ZIP members inside the kernel, bypassing --adaptive "
+                                "and --io-depth (default: when possible and neither is in effect)")
+    return ap
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
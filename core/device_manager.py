@@ -1,12 +1,30 @@
 import os
 import sys
 import re
-import platform
-import psutil
-import ctypes
-from ctypes import wintypes
 from dataclasses import dataclass
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
+
+@dataclass
+class Capabilities:
+    logical_block_size: int = 512
+    physical_block_size: int = 512
+    optimal_io_size: int = 0
+    max_sectors_kb: int = 0
+    rotational: bool = False
+    removable: bool = False
+    transport: str = ""
+    discard: bool = False
+    write_zeroes: bool = False
+
+@dataclass
+class UsbPath:
+    controller: str
+    bus: str
+    hub: str
+    port: str
+    speed: float = 0.0
+    hub_speed: float = 0.0
+    bus_speed: float = 0.0
 
 @dataclass
 class Device:
@@ -14,10 +32,23 @@ class Device:
     name: str
     size: Optional[int]
     protected: bool = False
+    caps: Optional[Capabilities] = None
 
 IS_WIN = os.name == "nt"
 IS_MAC = sys.platform == "darwin"
 IS_LIN = sys.platform.startswith("linux")
+SYSFS = "/sys"
+IGNORED_LINUX = ("loop","ram","fd")
+
+def _partitions() -> List[Tuple[str, str]]:
+    if IS_LIN:
+        try:
+            with open("/proc/self/mounts", "r") as f:
+                return [tuple(line.split()[:2]) for line in f if line.strip()]
+        except Exception:
+            pass
+    import psutil
+    return [(p.device, p.mountpoint) for p in psutil.disk_partitions(all=True)]
 
 def _linux_base(dev):
     if not dev or not dev.startswith("/dev/"):
@@ -27,19 +58,112 @@ def _linux_base(dev):
         return re.sub(r"p\d+$", "", b)
     return re.sub(r"\d+$", "", b)
 
-def _linux_size_bytes(base):
+def _linux_block_size(base, sysfs=SYSFS):
+    ssz = 512
+    p2 = f"{sysfs}/block/{base}/queue/logical_block_size"
+    if os.path.exists(p2):
+        with open(p2,"r") as f:
+            ssz = int(f.read().strip() or "512")
+    return ssz
+
+def _linux_size_bytes(base, sysfs=SYSFS):
     try:
-        with open(f"/sys/block/{base}/size","r") as f:
+        with open(f"{sysfs}/block/{base}/size","r") as f:
             sectors = int(f.read().strip() or "0")
-        ssz = 512
-        p2 = f"/sys/block/{base}/queue/logical_block_size"
-        if os.path.exists(p2):
-            with open(p2,"r") as f:
-                ssz = int(f.read().strip() or "512")
-        return sectors * ssz
+        return sectors * _linux_block_size(base, sysfs)
     except Exception:
         return None
 
+def _sysfs_int(path, default=0):
+    try:
+        with open(path, "r") as f:
+            return int(f.read().strip() or default)
+    except Exception:
+        return default
+
+def _linux_transport(base, sysfs):
+    for prefix, kind in (("nvme", "nvme"), ("mmcblk", "mmc"), ("vd", "virtio")):
+        if base.startswith(prefix):
+            return kind
+    real = os.path.realpath(f"{sysfs}/block/{base}")
+    for marker, kind in (("/usb", "usb"), ("/mmc", "mmc"), ("/nvme", "nvme"), ("/virtio", "virtio"), ("/ata", "ata")):
+        if marker in real:
+            return kind
+    return "scsi" if base.startswith("sd") else ""
+
+_USB_BUS = re.compile(r"^usb\d+$")
+_USB_PORT = re.compile(r"^\d+-\d+(\.\d+)*$")
+
+def _sysfs_float(path, default=0.0):
+    try:
+        with open(path, "r") as f:
+            return float(f.read().strip() or default)
+    except Exception:
+        return default
+
+def linux_usb_path(base, sysfs=SYSFS) -> Optional[UsbPath]:
+    parts = os.path.realpath(f"{sysfs}/block/{base}").split("/")
+    bus = next((i for i, p in enumerate(parts) if _USB_BUS.match(p)), None)
+    if bus is None:
+        return None
+    ports = [i for i in range(bus + 1, len(parts)) if _USB_PORT.match(parts[i])]
+    if not ports:
+        return None
+    port = ports[-1]
+    hub = ports[-2] if len(ports) > 1 else bus
+    return UsbPath(
+        controller=parts[bus - 1] if bus > 0 and parts[bus - 1] != "devices" else parts[bus],
+        bus=parts[bus],
+        hub=parts[hub],
+        port=parts[port],
+        speed=_sysfs_float("/".join(parts[:port + 1]) + "/speed"),
+        hub_speed=_sysfs_float("/".join(parts[:hub + 1]) + "/speed"),
+        bus_speed=_sysfs_float("/".join(parts[:bus + 1]) + "/speed"),
+    )
+
+def usb_path(path) -> Optional[UsbPath]:
+    if IS_LIN and path.startswith("/dev/"):
+        base = os.path.basename(os.path.realpath(path))
+        if not os.path.isdir(f"{SYSFS}/block/{base}"):
+            base = _linux_base(f"/dev/{base}")
+        if base and os.path.isdir(f"{SYSFS}/block/{base}"):
+            return linux_usb_path(base)
+    return None
+
+def linux_capabilities(base, sysfs=SYSFS) -> Capabilities:
+    q = f"{sysfs}/block/{base}/queue"
+    logical = _sysfs_int(f"{q}/logical_block_size", 512) or 512
+    return Capabilities(
+        logical_block_size=logical,
+        physical_block_size=_sysfs_int(f"{q}/physical_block_size", logical) or logical,
+        optimal_io_size=_sysfs_int(f"{q}/optimal_io_size"),
+        max_sectors_kb=_sysfs_int(f"{q}/max_sectors_kb"),
+        rotational=_sysfs_int(f"{q}/rotational") == 1,
+        removable=_sysfs_int(f"{sysfs}/block/{base}/removable") == 1,
+        transport=_linux_transport(base, sysfs),
+        discard=_sysfs_int(f"{q}/discard_max_bytes") > 0,
+        write_zeroes=_sysfs_int(f"{q}/write_zeroes_max_bytes") > 0,
+    )
+
+def device_capabilities(path) -> Optional[Capabilities]:
+    if IS_LIN and path.startswith("/dev/"):
+        base = os.path.basename(os.path.realpath(path))
+        if os.path.isdir(f"{SYSFS}/block/{base}"):
+            return linux_capabilities(base)
+    return None
+
+def logical_block_size(path) -> Optional[int]:
+    if IS_LIN and path.startswith("/dev/"):
+        base = os.path.basename(path)
+        if not os.path.isdir(f"/sys/block/{base}"):
+            base = _linux_base(path)
+        if base and os.path.isdir(f"/sys/block/{base}"):
+            try:
+                return _linux_block_size(base)
+            except Exception:
+                return None
+    return None
+
 def _mac_base(dev):
     if not dev or not dev.startswith("/dev/disk"):
         return None
@@ -47,6 +171,8 @@ def _mac_base(dev):
     return f"disk{m.group(1)}" if m else None
 
 def _win_letter_to_phys(letter):
+    import ctypes
+    from ctypes import wintypes
     vol = f"\\\\.\\{letter.strip(':')}:"
     GENERIC_READ = 0x80000000
     FILE_SHARE_READ  = 0x00000001
@@ -79,6 +205,8 @@ def _win_letter_to_phys(letter):
         CloseHandle(h)
 
 def _win_disk_size_bytes(phys_path):
+    import ctypes
+    from ctypes import wintypes
     IOCTL_DISK_GET_LENGTH_INFO = 0x0007405C
     GENERIC_READ = 0x80000000
     FILE_SHARE_READ  = 0x00000001
@@ -106,13 +234,13 @@ def _win_disk_size_bytes(phys_path):
 
 def system_disk_path():
     if IS_LIN:
-        root_dev = next((p.device for p in psutil.disk_partitions(all=True) if p.mountpoint=="/"), None)
+        root_dev = next((dev for dev, mnt in _partitions() if mnt=="/"), None)
         if not root_dev:
             return None
         base = _linux_base(root_dev)
         return f"/dev/{base}" if base else None
     if IS_MAC:
-        root_dev = next((p.device for p in psutil.disk_partitions(all=True) if p.mountpoint=="/"), None)
+        root_dev = next((dev for dev, mnt in _partitions() if mnt=="/"), None)
         if not root_dev:
             return None
         base = _mac_base(root_dev)
@@ -122,26 +250,30 @@ def system_disk_path():
         return _win_letter_to_phys(sys_drive)
     return None
 
-def list_devices() -> List[Device]:
+def linux_device(base, sysfs=SYSFS) -> Optional[Device]:
+    if not base or base.startswith(IGNORED_LINUX) or not os.path.isdir(f"{sysfs}/block/{base}"):
+        return None
+    return Device(f"/dev/{base}", base, _linux_size_bytes(base, sysfs), caps=linux_capabilities(base, sysfs))
+
+def list_devices(sysfs_root: str = SYSFS) -> List[Device]:
     devs: Dict[str, Device] = {}
     if IS_LIN:
-        for p in psutil.disk_partitions(all=True):
-            base = _linux_base(p.device or "")
-            if not base:
-                continue
-            path = f"/dev/{base}"
-            devs.setdefault(path, Device(path, base, _linux_size_bytes(base)))
+        for dev, _ in _partitions():
+            base = _linux_base(dev or "")
+            if base and os.path.isdir(f"{sysfs_root}/block/{base}"):
+                path = f"/dev/{base}"
+                devs.setdefault(path, Device(path, base, _linux_size_bytes(base, sysfs_root),
+                                             caps=linux_capabilities(base, sysfs_root)))
         try:
-            for b in os.listdir("/sys/block"):
-                if b.startswith(("loop","ram","fd")):
-                    continue
-                path = f"/dev/{b}"
-                devs.setdefault(path, Device(path, b, _linux_size_bytes(b)))
+            for b in os.listdir(f"{sysfs_root}/block"):
+                d = linux_device(b, sysfs_root)
+                if d:
+                    devs.setdefault(d.path, d)
         except Exception:
             pass
     elif IS_MAC:
-        for p in psutil.disk_partitions(all=True):
-            base = _mac_base(p.device or "")
+        for dev, _ in _partitions():
+            base = _mac_base(dev or "")
             if not base:
                 continue
             path = f"/dev/{base}"
@@ -152,8 +284,8 @@ def list_devices() -> List[Device]:
                 devs.setdefault(path, Device(path, f"disk{i}", None))
     else:
         seen = {}
-        for p in psutil.disk_partitions(all=True):
-            letter = (p.device or "").strip("\\/").split(":")[0]
+        for dev, _ in _partitions():
+            letter = (dev or "").strip("\\/").split(":")[0]
             if not letter or not letter[0].isalpha():
                 continue
             phys = _win_letter_to_phys(letter + ":")
@@ -162,10 +294,12 @@ def list_devices() -> List[Device]:
             seen.setdefault(phys, set()).add(letter.upper()+":")
         for phys, letters in seen.items():
             devs.setdefault(phys, Device(phys, f"{phys} ({', '.join(sorted(letters))})", _win_disk_size_bytes(phys)))
-    sysdisk = system_disk_path()
-    for d in devs.values():
-        if sysdisk and d.path.lower() == sysdisk.lower():
-            d.protected = True
-    lst = list(devs.values())
-    lst.sort(key=lambda x: (x.protected, x.name))
-    return lst
+    mark_protected(devs.values(), system_disk_path())
+    return sort_devices(devs.values())
+
+def mark_protected(devices, sysdisk: Optional[str]):
+    for d in devices:
+        d.protected = bool(sysdisk) and d.path.lower() == sysdisk.lower()
+
+def sort_devices(devices) -> List[Device]:
+    return sorted(devices, key=lambda x: (x.protected, x.name))
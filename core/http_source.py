@@ -0,0 +1,246 @@
+import io
+import re
+import ssl
+import time
+import threading
+import http.client
+from urllib.parse import urlsplit, urljoin
+from typing import Optional, Dict, Union, Tuple
+
+HTTP_CONNECTIONS = 4
+HTTP_SEGMENT = 4 * 1024 * 1024
+HTTP_WINDOW = 8
+HTTP_RETRIES = 5
+HTTP_TIMEOUT = 30.0
+RETRY_BACKOFF = 0.5
+READ_CHUNK = 256 * 1024
+MAX_REDIRECTS = 5
+USER_AGENT = "BitBurner"
+
+_CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+
+def _connect(url: str, timeout: float) -> http.client.HTTPConnection:
+    u = urlsplit(url)
+    if u.scheme == "https":
+        return http.client.HTTPSConnection(u.hostname, u.port, timeout=timeout, context=ssl.create_default_context())
+    return http.client.HTTPConnection(u.hostname, u.port, timeout=timeout)
+
+def _target(url: str) -> str:
+    u = urlsplit(url)
+    return (u.path or "/") + (f"?{u.query}" if u.query else "")
+
+class HttpReader(io.RawIOBase):
+    def __init__(self, url: str, connections: int = HTTP_CONNECTIONS, segment: int = HTTP_SEGMENT,
+                 window: int = HTTP_WINDOW, retries: int = HTTP_RETRIES, timeout: float = HTTP_TIMEOUT, tap=None):
+        super().__init__()
+        self.url = url
+        self.segment = segment
+        self.window = max(window, connections)
+        self.retries = retries
+        self.timeout = timeout
+        self.tap = tap
+        self.length: Optional[int] = None
+        self.ranged = False
+        self.retried = 0
+        self._pos = 0
+        self._cond = threading.Condition()
+        self._ready: Dict[int, Union[bytes, Exception]] = {}
+        self._index = 0
+        self._next = 0
+        self._gen = 0
+        self._stream: Optional[http.client.HTTPResponse] = None
+        self._pending = memoryview(b"")
+        self._threads = []
+        conn = self._open()
+        if self.ranged:
+            count = min(connections, max(0, self._segments - 1))
+            for k in range(count):
+                t = threading.Thread(target=self._worker, args=(conn if k == 0 else None,),
+                                     name="bitburner-http", daemon=True)
+                self._threads.append(t)
+                t.start()
+            if not count:
+                conn.close()
+
+    @property
+    def head(self) -> bytes:
+        if self.ranged:
+            return bytes(self._ready.get(0, b""))[:8]
+        return bytes(self._pending[:8])
+
+    @property
+    def _segments(self) -> int:
+        return -(-self.length // self.segment)
+
+    def _open(self) -> http.client.HTTPConnection:
+        for _ in range(MAX_REDIRECTS + 1):
+            conn = _connect(self.url, self.timeout)
+            conn.request("GET", _target(self.url), headers={"Range": f"bytes=0-{self.segment - 1}",
+                                                            "User-Agent": USER_AGENT})
+            resp = conn.getresponse()
+            if resp.status in (301, 302, 303, 307, 308) and resp.getheader("Location"):
+                resp.read()
+                conn.close()
+                self.url = urljoin(self.url, resp.getheader("Location"))
+                continue
+            if resp.status == 206:
+                m = _CONTENT_RANGE.match(resp.getheader("Content-Range") or "")
+                if m and m.group(3) != "*":
+                    self.length = int(m.group(3))
+                    self.ranged = True
+                    self._next = 1
+                    try:
+                        self._ready[0] = resp.read()
+                    except Exception:
+                        conn.close()
+                        self._ready[0], conn = self._fetch(0, None)
+                    return conn
+            if resp.status in (200, 206):
+                length = resp.getheader("Content-Length")
+                self.length = int(length) if length and resp.status == 200 else None
+                self._stream = resp
+                self._pending = memoryview(resp.read(READ_CHUNK))
+                return conn
+            resp.read()
+            conn.close()
+            raise OSError(f"HTTP {resp.status} {resp.reason} for {self.url}")
+        raise OSError(f"Too many redirects for {self.url}")
+
+    def _span(self, i: int) -> Tuple[int, int]:
+        start = i * self.segment
+        return start, min(start + self.segment, self.length)
+
+    def _fetch(self, i: int, conn) -> Tuple[bytes, Optional[http.client.HTTPConnection]]:
+        start, end = self._span(i)
+        buf = bytearray()
+        attempt = 0
+        while len(buf) < end - start:
+            try:
+                if conn is None:
+                    conn = _connect(self.url, self.timeout)
+                conn.request("GET", _target(self.url), headers={"Range": f"bytes={start + len(buf)}-{end - 1}",
+                                                                "User-Agent": USER_AGENT})
+                resp = conn.getresponse()
+                if resp.status != 206:
+                    resp.read()
+                    raise OSError(f"HTTP {resp.status} {resp.reason}")
+                while len(buf) < end - start:
+                    data = resp.read(min(READ_CHUNK, end - start - len(buf)))
+                    if not data:
+                        raise OSError("connection closed mid-range")
+                    buf += data
+                resp.read()
+                if resp.will_close:
+                    conn.close()
+                    conn = None
+            except Exception as e:
+                if conn is not None:
+                    conn.close()
+                    conn = None
+                attempt += 1
+                if attempt > self.retries or self.closed:
+                    raise OSError(f"Download failed at offset {start + len(buf)}: {e}")
+                self.retried += 1
+                time.sleep(min(RETRY_BACKOFF * 2 ** (attempt - 1), 5.0))
+        return bytes(buf), conn
+
+    def _worker(self, conn):
+        try:
+            while True:
+                with self._cond:
+                    while not self.closed and (self._next >= self._segments or self._next >= self._index + self.window):
+                        self._cond.wait()
+                    if self.closed:
+                        return
+                    i, gen = self._next, self._gen
+                    self._next += 1
+                try:
+                    data, conn = self._fetch(i, conn)
+                except Exception as e:
+                    data = e
+                with self._cond:
+                    if gen == self._gen and i >= self._index:
+                        self._ready[i] = data
+                    self._cond.notify_all()
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _move(self, i: int):
+        if not self._index <= i < max(self._next, self._index + 1):
+            self._gen += 1
+            self._ready.clear()
+            self._next = i
+        self._index = i
+        for k in [k for k in self._ready if k < i]:
+            del self._ready[k]
+        self._cond.notify_all()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return self.ranged
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        pos = {io.SEEK_SET: offset, io.SEEK_CUR: self._pos + offset}.get(whence)
+        if pos is None:
+            if self.length is None:
+                raise io.UnsupportedOperation("seek from end on a stream of unknown length")
+            pos = self.length + offset
+        if pos == self._pos:
+            return pos
+        if not self.ranged:
+            raise io.UnsupportedOperation("server does not support range requests")
+        self._pos = max(0, pos)
+        if self._pos < self.length:
+            with self._cond:
+                self._move(self._pos // self.segment)
+        return self._pos
+
+    def readinto(self, b) -> int:
+        mv = memoryview(b).cast("B")
+        if not len(mv):
+            return 0
+        if self.ranged:
+            if self._pos >= self.length:
+                return 0
+            i = self._pos // self.segment
+            with self._cond:
+                if i != self._index:
+                    self._move(i)
+                while i not in self._ready:
+                    if self.closed:
+                        raise ValueError("read from closed HTTP source")
+                    self._cond.wait()
+                data = self._ready[i]
+            if isinstance(data, Exception):
+                raise data
+            off = self._pos - i * self.segment
+            n = min(len(mv), len(data) - off)
+            mv[:n] = data[off:off + n]
+        elif len(self._pending):
+            n = min(len(mv), len(self._pending))
+            mv[:n] = self._pending[:n]
+            self._pending = self._pending[n:]
+        else:
+            n = self._stream.readinto(mv) or 0
+        if n and self.tap:
+            self.tap(self._pos, mv[:n])
+        self._pos += n
+        return n
+
+    def close(self):
+        if self.closed:
+            return
+        with self._cond:
+            super().close()
+            self._ready.clear()
+            self._cond.notify_all()
+        if self._stream is not None:
+            self._stream.close()
+        for t in self._threads:
+            t.join(timeout=1)
@@ -1,26 +1,716 @@
 import os
+import mmap
+import stat
 import time
+import queue
+import struct
+import hashlib
 import threading
-from typing import Optional, Callable
+from typing import Optional, Callable, List, Tuple, Dict, Union
+from core.bmap import BlockMap, parse_bmap
+from core.sources import is_url, open_source
+from core.telemetry import Telemetry
+from core.journal import Journal
+from core.checksum import Checksum, HashCache, SourceHasher, file_key
+from core.zerocopy import KernelCopy
 
 WRITE_CHUNK = 8 * 1024 * 1024
+QUEUE_DEPTH = 4
+DECODE_WORKERS = os.cpu_count() or 1
+FANOUT_WINDOW = 8
+SYNC_MODES = (None, "dsync", "sync")
+BLKDISCARD = 0x1277
+BLKZEROOUT = 0x127f
+BLKFLSBUF = 0x1261
+VERIFY_HASH = "blake2b"
+VERIFY_BLOCK = 64 * 1024
+FALLOC_FL_KEEP_SIZE = 0x01
+FALLOC_FL_PUNCH_HOLE = 0x02
+MAX_CHUNK = 64 * 1024 * 1024
+MAX_POOL_BYTES = 256 * 1024 * 1024
+SPARSE_BLOCK = 256 * 1024
+TRANSPORT_CHUNK = {"usb": 4 * 1024 * 1024, "mmc": 4 * 1024 * 1024, "nvme": 16 * 1024 * 1024}
+FAST_IO_DEPTH = 4
+FAST_QUEUE_DEPTH = 8
+ADAPT_WINDOW = 0.5
+ADAPT_TOLERANCE = 0.15
+ADAPT_LATENCY = 1.0
+ADAPT_STEP = 1024 * 1024
+PROGRESS_INTERVAL = 0.12
+WRITEBACK_WINDOW = 32 * 1024 * 1024
+SYNC_FILE_RANGE_WAIT_BEFORE = 1
+SYNC_FILE_RANGE_WRITE = 2
+SYNC_FILE_RANGE_WAIT_AFTER = 4
+
+class BufferPool:
+    def __init__(self, count: int, size: int, aligned: bool = False):
+        self.size = size
+        self.chunk = size
+        self.count = max(2, count)
+        self.limit = self.count
+        self._cond = threading.Condition()
+        self._out = 0
+        self._free: List[memoryview] = [memoryview(mmap.mmap(-1, size) if aligned else bytearray(size))
+                                        for _ in range(self.count)]
+
+    def take(self, timeout: float) -> Optional[memoryview]:
+        with self._cond:
+            if not (self._free and self._out < self.limit):
+                self._cond.wait(timeout)
+            if self._free and self._out < self.limit:
+                self._out += 1
+                return self._free.pop()
+        return None
+
+    def acquire(self, stop: threading.Event) -> Optional[memoryview]:
+        while not stop.is_set():
+            mv = self.take(0.1)
+            if mv is not None:
+                return mv
+        return None
+
+    def release(self, mv: memoryview):
+        with self._cond:
+            self._free.append(mv)
+            self._out -= 1
+            self._cond.notify()
+
+    def resize(self, chunk: int, limit: int):
+        with self._cond:
+            self.chunk = min(chunk, self.size)
+            self.limit = max(2, min(limit, self.count))
+            self._cond.notify_all()
+
+def _fill(src, mv: memoryview) -> int:
+    got = 0
+    want = len(mv)
+    while got < want:
+        n = src.readinto(mv[got:])
+        if not n:
+            break
+        got += n
+    return got
+
+def target_block_size(device_path: str) -> int:
+    try:
+        from core.device_manager import logical_block_size
+        bs = logical_block_size(device_path)
+        if bs:
+            return bs
+    except Exception:
+        pass
+    try:
+        return max(512, os.stat(device_path).st_blksize or 4096)
+    except Exception:
+        return 4096
+
+def tune_io(caps, chunk_size: Optional[int] = None, queue_depth: Optional[int] = None,
+            direct: Optional[bool] = None, discard: Optional[bool] = None,
+            io_depth: Optional[int] = None) -> Dict[str, object]:
+    if caps is None:
+        return {"chunk_size": chunk_size or WRITE_CHUNK, "queue_depth": queue_depth or QUEUE_DEPTH,
+                "direct": bool(direct), "discard": bool(discard), "align": 1, "io_depth": io_depth or 1,
+                "zeroout": False}
+    slow = caps.transport in ("usb", "mmc") or caps.removable
+    if chunk_size is None:
+        chunk_size = TRANSPORT_CHUNK.get(caps.transport, 2 * WRITE_CHUNK if caps.rotational else WRITE_CHUNK)
+        if caps.max_sectors_kb:
+            chunk_size = min(MAX_CHUNK, max(chunk_size, 4 * caps.max_sectors_kb * 1024))
+    align = max(caps.logical_block_size, caps.physical_block_size)
+    if caps.optimal_io_size and caps.optimal_io_size % align == 0 and caps.optimal_io_size <= chunk_size:
+        align = caps.optimal_io_size
+    if io_depth is None:
+        fast = caps.transport == "nvme" or (caps.transport == "usb" and not (caps.removable or caps.rotational))
+        io_depth = FAST_IO_DEPTH if fast else 1
+    if queue_depth is None:
+        queue_depth = QUEUE_DEPTH if slow or caps.rotational else FAST_QUEUE_DEPTH
+        queue_depth = max(queue_depth, io_depth + 2)
+    return {"chunk_size": max(align, chunk_size - chunk_size % align), "queue_depth": queue_depth,
+            "direct": slow if direct is None else direct,
+            "discard": caps.discard if discard is None else (discard and caps.discard), "align": align,
+            "io_depth": max(1, io_depth), "zeroout": caps.write_zeroes}
+
+def _plan_for(path: str, chunk_size, queue_depth, direct, discard, io_depth=None) -> Dict[str, object]:
+    try:
+        from core.device_manager import device_capabilities
+        caps = device_capabilities(path)
+    except Exception:
+        caps = None
+    return tune_io(caps, chunk_size, queue_depth, direct, discard, io_depth)
+
+def _digest(mv: memoryview) -> bytes:
+    return b"".join(hashlib.new(VERIFY_HASH, mv[i:i + VERIFY_BLOCK], digest_size=16).digest()
+                    for i in range(0, len(mv), VERIFY_BLOCK))
+
+def _mismatch(mv: memoryview, expected: Optional[bytes]) -> Tuple[int, int]:
+    if expected is None:
+        data = bytes(mv)
+        return len(data) - len(data.lstrip(b"\0")), 1
+    actual = _digest(mv)
+    for i in range(0, len(expected), 16):
+        if actual[i:i + 16] != expected[i:i + 16]:
+            start = i // 16 * VERIFY_BLOCK
+            return min(start, len(mv)), VERIFY_BLOCK
+    return len(mv), 1
+
+def _first_difference(a: memoryview, b: memoryview) -> int:
+    n = min(len(a), len(b))
+    pos = 0
+    while pos < n and a[pos:pos + 4096] == b[pos:pos + 4096]:
+        pos += 4096
+    return next((i for i in range(pos, min(n, pos + 4096)) if a[i] != b[i]), n)
+
+def _drop_cache(fd: int):
+    try:
+        if stat.S_ISBLK(os.fstat(fd).st_mode):
+            import fcntl
+            fcntl.ioctl(fd, BLKFLSBUF)
+    except Exception:
+        pass
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except Exception:
+        pass
+
+class _Tuner:
+    def __init__(self, pool: BufferPool, depth: int, align: int):
+        self.pool = pool
+        self.inflight: Optional["_Inflight"] = None
+        self.align = align
+        self.step = max(align, ADAPT_STEP - ADAPT_STEP % align)
+        self.max_chunk = pool.size - pool.size % align
+        self.min_chunk = max(align, self.max_chunk // 8 - (self.max_chunk // 8) % align)
+        self.chunk = max(self.min_chunk, min(self.max_chunk, (self.max_chunk // 2) - (self.max_chunk // 2) % align))
+        self.min_depth, self.max_depth = 2, pool.count
+        self.depth = max(2, min(depth, pool.count))
+        self.history: List[Dict[str, float]] = []
+        self.t0 = time.monotonic()
+        self._since = self.t0
+        self._bytes = 0
+        self._busy = 0.0
+        self._worst = 0.0
+        self._prev: Optional[float] = None
+        self._apply()
+
+    def attach(self, inflight: "_Inflight"):
+        self.inflight = inflight
+        self.min_depth, self.max_depth = 1, inflight.depth
+        self.depth = inflight.depth
+        self._apply()
+
+    def _apply(self):
+        if self.inflight:
+            self.inflight.resize(self.depth)
+            self.pool.resize(self.chunk, self.depth + 2)
+        else:
+            self.pool.resize(self.chunk, self.depth)
+
+    def observe(self, n: int, seconds: float) -> Optional[Dict[str, float]]:
+        self._bytes += n
+        self._busy += seconds
+        self._worst = max(self._worst, seconds)
+        elapsed = time.monotonic() - self._since if self.inflight else self._busy
+        if elapsed < ADAPT_WINDOW:
+            return None
+        rate = self._bytes / elapsed
+        if self._worst > ADAPT_LATENCY or (self._prev and rate < self._prev * (1 - ADAPT_TOLERANCE)):
+            half = self.chunk // 2
+            chunk = max(self.min_chunk, half - half % self.align)
+            depth = max(self.min_depth, self.depth // 2)
+        else:
+            chunk = min(self.max_chunk, self.chunk + self.step)
+            depth = min(self.max_depth, self.depth + 1)
+        entry = {"t": round(time.monotonic() - self.t0, 3), "chunk": chunk, "depth": depth,
+                 "rate": int(rate), "latency": round(self._worst, 4)}
+        self._prev = rate
+        self._bytes, self._busy, self._worst = 0, 0.0, 0.0
+        self._since = time.monotonic()
+        self.history.append(entry)
+        if (chunk, depth) == (self.chunk, self.depth):
+            return None
+        self.chunk, self.depth = chunk, depth
+        self._apply()
+        return entry
+
+def _punch_hole(fd: int, offset: int, length: int) -> bool:
+    import ctypes
+    libc = ctypes.CDLL(None, use_errno=True)
+    fallocate = libc.fallocate
+    fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong]
+    return fallocate(fd, FALLOC_FL_PUNCH_HOLE | FALLOC_FL_KEEP_SIZE, offset, length) == 0
+
+class _Writeback:
+    def __init__(self, fd: int, window: int):
+        self.fd = fd
+        self.window = window
+        self.lo = self.hi = 0
+        self.pending: Optional[Tuple[int, int]] = None
+        self.durable = 0
+        self._sfr = None
+        try:
+            import ctypes
+            sfr = ctypes.CDLL(None, use_errno=True).sync_file_range
+            sfr.argtypes = [ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong, ctypes.c_uint]
+            self._sfr = sfr
+        except Exception:
+            pass
+
+    def _range(self, offset: int, length: int, flags: int):
+        if self._sfr is not None and self._sfr(self.fd, offset, length, flags) == 0:
+            return
+        self._sfr = None
+        getattr(os, "fdatasync", os.fsync)(self.fd)
+
+    def _settle(self, lo: int, hi: int):
+        self._range(lo, hi - lo, SYNC_FILE_RANGE_WAIT_BEFORE | SYNC_FILE_RANGE_WRITE | SYNC_FILE_RANGE_WAIT_AFTER)
+        try:
+            os.posix_fadvise(self.fd, lo, hi - lo, os.POSIX_FADV_DONTNEED)
+        except Exception:
+            pass
+        self.durable = hi
+
+    def wrote(self, offset: int, n: int):
+        if self.hi <= self.lo:
+            self.lo = offset
+        self.hi = max(self.hi, offset + n)
+        if self.hi - self.lo >= self.window:
+            self.flush()
+
+    def flush(self, wait: bool = False):
+        lo, hi = self.lo, self.hi
+        if hi > lo:
+            self._range(lo, hi - lo, SYNC_FILE_RANGE_WRITE)
+        if self.pending:
+            self._settle(*self.pending)
+        self.pending = (lo, hi) if hi > lo else None
+        self.lo = self.hi = hi
+        if wait and self.pending:
+            self._settle(*self.pending)
+            self.pending = None
+
+class _Inflight:
+    def __init__(self, target: "_Target", depth: int, start: int = 0):
+        from concurrent.futures import ThreadPoolExecutor
+        self.target = target
+        self.depth = depth
+        self.pool = ThreadPoolExecutor(max_workers=depth, thread_name_prefix="bitburner-pwrite")
+        self.limit = depth
+        self.busy = 0
+        self.cond = threading.Condition()
+        self.lock = threading.Lock()
+        self.ends: Dict[int, int] = {}
+        self.prefix = start
+        self.error: Optional[BaseException] = None
+
+    def mark(self, offset: int, n: int):
+        with self.lock:
+            self.ends[offset] = offset + n
+            while self.prefix in self.ends:
+                self.prefix = self.ends.pop(self.prefix)
+
+    def resize(self, depth: int):
+        with self.cond:
+            self.limit = max(1, min(depth, self.depth))
+            self.cond.notify_all()
+
+    def submit(self, mv: memoryview, n: int, offset: int, release, observe=None):
+        with self.cond:
+            while self.busy >= self.limit:
+                self.cond.wait()
+            self.busy += 1
+        def job():
+            try:
+                t0 = time.perf_counter()
+                if self.target.pwrite(mv[:n], offset) != n:
+                    raise OSError("Partial write encountered.")
+                if observe:
+                    observe(n, time.perf_counter() - t0)
+                self.mark(offset, n)
+            except BaseException as e:
+                self.error = self.error or e
+            finally:
+                release(mv)
+                with self.cond:
+                    self.busy -= 1
+                    self.cond.notify_all()
+        self.pool.submit(job)
+
+    def drain(self):
+        with self.cond:
+            while self.busy:
+                self.cond.wait()
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+class _Target:
+    def __init__(self, device_path: str, direct: bool = False, sync: Optional[str] = None,
+                 readonly: bool = False, writeback: int = 0):
+        flags = (os.O_RDONLY if readonly else os.O_RDWR) | getattr(os, "O_BINARY", 0)
+        if sync == "dsync":
+            flags |= getattr(os, "O_DSYNC", 0)
+        elif sync == "sync":
+            flags |= getattr(os, "O_SYNC", 0)
+        self.block_size = target_block_size(device_path) if direct else 1
+        self.direct = False
+        self.tail_fd: Optional[int] = None
+        o_direct = getattr(os, "O_DIRECT", 0)
+        fd = None
+        if direct and o_direct:
+            try:
+                fd = os.open(device_path, flags | o_direct)
+                self.direct = True
+            except OSError:
+                fd = None
+        if fd is None:
+            fd = os.open(device_path, flags)
+        self.f = os.fdopen(fd, "rb+", buffering=0)
+        self.pos = 0
+        self.regular = stat.S_ISREG(os.fstat(fd).st_mode)
+        if self.direct:
+            self.tail_fd = os.open(device_path, flags)
+        self.wb = _Writeback(fd, writeback) if writeback > 0 and not (self.direct or sync or readonly) else None
+        self.synchronous = self.direct or bool(sync)
+        self.inflight: Optional[_Inflight] = None
+        self.completed = 0
+        self._zeros: Optional[mmap.mmap] = None
+
+    @property
+    def durable(self) -> int:
+        if self.wb:
+            return self.wb.durable
+        return self.completed if self.synchronous else 0
+
+    def start_inflight(self, depth: int, start: int = 0) -> _Inflight:
+        self.inflight = _Inflight(self, depth, start)
+        self.completed = start
+        return self.inflight
+
+    def settle(self) -> int:
+        if self.inflight:
+            done = self.inflight.prefix
+            if self.wb and done > self.completed:
+                self.wb.wrote(self.completed, done - self.completed)
+            self.completed = done
+        return self.completed
+
+    def pwrite(self, mv: memoryview, offset: int) -> int:
+        fd = self.f.fileno()
+        n = len(mv)
+        if not self.direct:
+            return os.pwrite(fd, mv, offset)
+        head = n - n % self.block_size
+        w = os.pwrite(fd, mv[:head], offset) if head else 0
+        if w == head and head < n:
+            w += os.pwrite(self.tail_fd, mv[head:], offset + head)
+        return w
+
+    def write(self, mv: memoryview, offset: int) -> int:
+        if offset != self.pos:
+            self.f.seek(offset)
+            self.pos = offset
+        n = len(mv)
+        if not self.direct:
+            w = self.f.write(mv)
+            self.pos += w
+            self.completed = self.pos
+            if self.wb and w:
+                self.wb.wrote(offset, w)
+            return w
+        head = n - n % self.block_size
+        w = self.f.write(mv[:head]) if head else 0
+        self.pos += w
+        self.completed = self.pos
+        if w != head:
+            return w
+        if head < n:
+            w += os.pwrite(self.tail_fd, mv[head:], offset + head)
+            self.completed = offset + w
+        return w
+
+    def discard(self, offset: int, length: int) -> bool:
+        fd = self.f.fileno()
+        try:
+            mode = os.fstat(fd).st_mode
+            if stat.S_ISBLK(mode):
+                import fcntl
+                fcntl.ioctl(fd, BLKDISCARD, struct.pack("QQ", offset, length))
+                return True
+            if stat.S_ISREG(mode):
+                return _punch_hole(fd, offset, length)
+        except Exception:
+            pass
+        return False
+
+    def zero(self, offset: int, length: int, chunk: int) -> bool:
+        fd = self.f.fileno()
+        try:
+            mode = os.fstat(fd).st_mode
+            if stat.S_ISBLK(mode):
+                import fcntl
+                fcntl.ioctl(fd, BLKZEROOUT, struct.pack("QQ", offset, length))
+                return True
+            if stat.S_ISREG(mode) and _punch_hole(fd, offset, length):
+                return True
+        except Exception:
+            pass
+        if self._zeros is None:
+            self._zeros = mmap.mmap(-1, chunk)
+        zeros = memoryview(self._zeros)
+        try:
+            end = offset + length
+            while offset < end:
+                n = min(len(zeros), end - offset)
+                if self.pwrite(zeros[:n], offset) != n:
+                    raise OSError("Partial write encountered.")
+                offset += n
+        finally:
+            zeros.release()
+        return False
+
+    def finish(self, length: int):
+        if self.regular and os.fstat(self.f.fileno()).st_size < length:
+            self.f.truncate(length)
+
+    def sync(self):
+        if self.inflight:
+            self.inflight.drain()
+            self.settle()
+        self.f.flush()
+        if self.wb:
+            self.wb.flush(wait=True)
+        os.fsync(self.f.fileno())
+        if self.tail_fd is not None:
+            os.fsync(self.tail_fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.inflight:
+            self.inflight.close()
+            self.inflight = None
+        if self._zeros is not None:
+            self._zeros.close()
+            self._zeros = None
+        try:
+            self.f.close()
+        finally:
+            if self.tail_fd is not None:
+                os.close(self.tail_fd)
+                self.tail_fd = None
+
+def _new_stats() -> Dict[str, int]:
+    return {"written": 0, "skipped": 0, "resumed": 0, "identical": 0, "identical_chunks": 0, "verified": 0,
+            "discarded": False, "zero_filled": 0}
+
+class _DeviceRun:
+    def __init__(self, path: str):
+        self.path = path
+        self.inbox: queue.Queue = queue.Queue()
+        self.cancel = threading.Event()
+        self.stats = _new_stats()
+        self.done = 0
+        self.est = 0
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self.attached = True
+        self.lagged = 0.0
+        self.plan: Dict[str, object] = {}
+        self.tuner: Optional[_Tuner] = None
+        self.times: Dict[str, List[Optional[float]]] = {}
+        self.verify_total = 0
+        self.durable: Optional[int] = None
+        self.mismatch: Optional[int] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def counters(self, phase: str) -> Tuple[int, int]:
+        if phase == "verify":
+            return self.stats["verified"], self.verify_total
+        done = self.done if self.durable is None else self.durable
+        return done, self.est or self.done
+
+    def begin(self, phase: str):
+        self.times[phase] = [time.monotonic(), None]
+
+    def end(self, phase: str):
+        self.times[phase][1] = time.monotonic()
+
+class _Fanout:
+    def __init__(self, pool: BufferPool, runs: List[_DeviceRun], stop: threading.Event,
+                 lag_timeout: Optional[float] = None):
+        self.pool = pool
+        self.size = pool.size
+        self.runs = runs
+        self.stop = stop
+        self.lag_timeout = lag_timeout
+        self._lock = threading.Lock()
+        self._refs: Dict[int, int] = {}
+
+    def acquire(self, stop: threading.Event) -> Optional[memoryview]:
+        while not stop.is_set():
+            t0 = time.monotonic()
+            mv = self.pool.take(0.1)
+            if mv is not None:
+                for r in self.runs:
+                    r.lagged = 0.0
+                return mv
+            with self._lock:
+                live = [r for r in self.runs if r.attached]
+            if not self.lag_timeout or len(live) < 2:
+                continue
+            slow = max(live, key=lambda r: r.inbox.qsize())
+            for r in live:
+                if r is not slow:
+                    r.lagged = 0.0
+            slow.lagged += time.monotonic() - t0
+            if slow.lagged >= self.lag_timeout:
+                slow.error = f"Device held back the other targets for more than {self.lag_timeout:g}s."
+                self.detach(slow)
+        return None
+
+    def release(self, mv: memoryview):
+        key = id(mv)
+        with self._lock:
+            left = self._refs.get(key)
+            if left is not None:
+                if left > 1:
+                    self._refs[key] = left - 1
+                    return
+                del self._refs[key]
+        self.pool.release(mv)
+
+    @property
+    def chunk(self) -> int:
+        return self.pool.chunk
+
+    def put(self, item):
+        if not isinstance(item, tuple):
+            for r in self.runs:
+                r.inbox.put(item)
+            return
+        with self._lock:
+            live = [r for r in self.runs if r.attached]
+            if item[0] is not None and live:
+                self._refs[id(item[0])] = len(live)
+        if item[0] is not None and not live:
+            self.pool.release(item[0])
+        for r in live:
+            r.inbox.put(item)
+
+    def detach(self, run: _DeviceRun):
+        with self._lock:
+            run.attached = False
+            if not any(r.attached for r in self.runs):
+                self.stop.set()
 
 class ImageWriter:
-    def __init__(self):
+    def __init__(self, chunk_size: Optional[int] = None, queue_depth: Optional[int] = None,
+                 direct: Optional[bool] = None, sync: Optional[str] = None,
+                 decode_workers: int = DECODE_WORKERS, decode_inflight: Optional[int] = None,
+                 sparse: bool = False, discard: Optional[bool] = None, verify: bool = False,
+                 delta: bool = False, fanout_window: int = FANOUT_WINDOW,
+                 lag_timeout: Optional[float] = None, compare_only: bool = False,
+                 adaptive: Optional[bool] = None, writeback: Optional[int] = None,
+                 resume: bool = False, journal: Optional[bool] = None, io_depth: Optional[int] = None,
+                 keep_source_cache: bool = False, zero_copy: Optional[bool] = None):
+        if sync not in SYNC_MODES:
+            raise ValueError(f"sync must be one of {SYNC_MODES}")
+        self.chunk_size = chunk_size
+        self.queue_depth = queue_depth
+        self._depth = queue_depth or QUEUE_DEPTH
+        self.direct = direct
+        self.sync = sync
+        self.decode_workers = decode_workers
+        self.decode_inflight = decode_inflight
+        self.sparse = sparse
+        self.discard = discard
+        self.verify = verify
+        self.delta = delta
+        self.compare_only = compare_only
+        self.adaptive = adaptive
+        self.writeback = WRITEBACK_WINDOW if writeback is None else writeback
+        self.resume = resume
+        self.journal = journal
+        self.io_depth = io_depth
+        self.keep_source_cache = keep_source_cache
+        self.zero_copy = zero_copy
+        self.copy_method: Optional[str] = None
+        self.fanout_window = fanout_window
+        self.lag_timeout = lag_timeout
+        self.runs: List[_DeviceRun] = []
+        self._src_stats = {"read": 0, "bmap_checked": 0}
+        self._digests: List[Tuple[int, int, bytes]] = []
+        self._journal: Optional[Journal] = None
+        self._resume_at = 0
+        self._zero_block = SPARSE_BLOCK
+        self._checksum: Optional[Checksum] = None
+        self._hasher: Optional[SourceHasher] = None
+        self.hash_cache = HashCache()
+        self.source_check: Optional[str] = None
         self._cancel = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
         self._thread: Optional[threading.Thread] = None
         self.on_progress: Optional[Callable[[float,int,int,float,int], None]] = None
+        self.on_verify_progress: Optional[Callable[[float,int,int,float,int], None]] = None
         self.on_error: Optional[Callable[[str], None]] = None
         self.on_finished: Optional[Callable[[], None]] = None
         self.on_canceled: Optional[Callable[[], None]] = None
+        self.on_device_progress: Optional[Callable[[str,str,float,int,int,float,int], None]] = None
+        self.on_device_error: Optional[Callable[[str,str], None]] = None
+        self.on_device_finished: Optional[Callable[[str], None]] = None
+        self.on_device_tuning: Optional[Callable[[str, Dict[str, float]], None]] = None
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        out = _new_stats()
+        for r in self.runs:
+            for k, v in r.stats.items():
+                out[k] = (out[k] or v) if k == "discarded" else out[k] + v
+        out.update(self._src_stats)
+        return out
 
-    def start(self, image_path: str, device_path: str):
+    @property
+    def tuning(self) -> Dict[str, Dict[str, object]]:
+        return {r.path: {"chunk": r.tuner.chunk, "depth": r.tuner.depth, "history": list(r.tuner.history)}
+                for r in self.runs if r.tuner}
+
+    @property
+    def results(self) -> Dict[str, Optional[str]]:
+        return {r.path: r.error or ("Canceled." if r.state == "canceled" else None) for r in self.runs}
+
+    def start(self, image_path: str, device_path: Union[str, List[str]], bmap_path: Optional[str] = None,
+              checksum: Optional[Checksum] = None):
         self._cancel.clear()
-        self._thread = threading.Thread(target=self._run, args=(image_path, device_path), daemon=True)
+        self._running.set()
+        paths = [device_path] if isinstance(device_path, str) else list(device_path)
+        self.runs = [_DeviceRun(p) for p in paths]
+        self._checksum = checksum
+        self._thread = threading.Thread(target=self._run, args=(image_path, bmap_path), daemon=True)
         self._thread.start()
 
-    def cancel(self):
-        self._cancel.set()
+    def cancel(self, device_path: Optional[str] = None):
+        if device_path is None:
+            self._cancel.set()
+            self._running.set()
+            return
+        for r in self.runs:
+            if r.path == device_path:
+                r.cancel.set()
+
+    def pause(self):
+        self._running.clear()
+
+    def unpause(self):
+        self._running.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
 
     def _emit(self, cb, *args):
         try:
@@ -29,59 +719,692 @@ class ImageWriter:
         except Exception:
             pass
 
-    def _run(self, image_path: str, device_path: str):
+    def _publish(self, tel: Telemetry, reported: set):
+        snap = tel.sample()
+        for d in snap["devices"]:
+            key = (d["path"], d["phase"])
+            if key in reported or not (d["finished"] or d["state"] in ("writing", "verifying")):
+                continue
+            if d["finished"]:
+                reported.add(key)
+            self._emit(self.on_device_progress, d["path"], d["phase"], d["ratio"], d["done"],
+                       d["total"], d["bps"], d["eta"])
+        for phase, cb in (("write", self.on_progress), ("verify", self.on_verify_progress)):
+            o = snap[phase]
+            if o and (None, phase) not in reported:
+                if o["finished"]:
+                    reported.add((None, phase))
+                self._emit(cb, o["ratio"], o["done"], o["total"], o["bps"], o["eta"])
+
+    def _record(self, pos: int, mv: memoryview, n: int):
+        if self.verify:
+            self._digests.append((pos, n, _digest(mv[:n])))
+        if self._journal:
+            self._journal.feed(pos, mv[:n])
+
+    def _record_gap(self, pos: int, n: int, step: int):
+        if self.verify:
+            self._digests.extend((off, min(step, pos + n - off), None) for off in range(pos, pos + n, step))
+
+    def _reader(self, fin, pool: BufferPool, filled: queue.Queue, stop: threading.Event,
+                bmap: Optional[BlockMap] = None):
         try:
-            if not os.path.exists(image_path):
-                self._emit(self.on_error, "Source file not found.")
+            if bmap:
+                self._read_mapped(fin, bmap, pool, filled, stop)
+            else:
+                self._read_stream(fin, pool, filled, stop)
+            if self._hasher and not stop.is_set():
+                self._check_source(fin)
+        except Exception as e:
+            filled.put(e)
+        finally:
+            filled.put(None)
+
+    def _check_source(self, fin):
+        key = None if is_url(fin.path) else file_key(fin.path)
+        digest = self._hasher.finish(fin.raw)
+        if key and file_key(fin.path) == key:
+            self.hash_cache.store(key, self._checksum.algo, digest)
+        self._check_digest(digest)
+
+    def _check_digest(self, digest: str):
+        c = self._checksum
+        if digest != c.digest:
+            self.source_check = "failed"
+            raise ValueError(f"Image {c.algo.upper()} checksum does not match {os.path.basename(c.sidecar)}.")
+        self.source_check = "verified"
+
+    def _read_stream(self, fin, pool: BufferPool, filled: queue.Queue, stop: threading.Event):
+        skip = not (self.delta or self.compare_only)
+        zeros = bytes(self._zero_block) if self.sparse and skip else b""
+        holes = (self.sparse or fin.sparse) and fin.size and skip
+        pos = run = 0
+        mv: Optional[memoryview] = None
+        n = 0
+
+        def flush_gap():
+            nonlocal pos, run
+            if run:
+                self._record_gap(pos, run, pool.chunk)
+                filled.put((None, run, fin.consumed()))
+                pos += run
+                run = 0
+
+        def flush_data():
+            nonlocal pos, mv, n
+            self._record(pos, mv, n)
+            filled.put((mv, n, fin.consumed()))
+            pos += n
+            mv, n = None, 0
+
+        if self._resume_at:
+            buf = pool.acquire(stop)
+            if buf is None:
                 return
-            total = os.path.getsize(image_path)
-            done = 0
-            t_prev = time.time()
-            prev_done = 0
             try:
-                ftest = open(device_path, "rb+")
-                ftest.close()
-            except PermissionError:
-                self._emit(self.on_error, "Access denied. Try running as administrator/root.")
+                pos = fin.skip(self._resume_at, buf)
+            finally:
+                pool.release(buf)
+            if pos != self._resume_at:
+                raise ValueError("Image is shorter than the resume point.")
+            filled.put((None, pos, fin.consumed()))
+        try:
+            while not stop.is_set():
+                self._running.wait()
+                if not n:
+                    want = pool.chunk
+                    step = len(zeros) or want
+                    if holes:
+                        nxt = fin.next_data(pos + run)
+                        gap = (fin.size if nxt is None else nxt) - pos - run
+                        if gap >= want:
+                            run += gap - gap % want
+                            fin.seek(pos + run)
+                            continue
+                if mv is None:
+                    mv = pool.acquire(stop)
+                    if mv is None:
+                        break
+                size = min(step, want - n)
+                k = _fill(fin, mv[n:n + size])
+                self._src_stats["read"] += k
+                if k and zeros.startswith(mv[n:n + k]):
+                    if n:
+                        flush_data()
+                    run += k
+                    if run >= MAX_CHUNK:
+                        flush_gap()
+                elif k:
+                    flush_gap()
+                    n += k
+                    if n == want:
+                        flush_data()
+                if k < size:
+                    if n:
+                        flush_data()
+                    if not stop.is_set():
+                        flush_gap()
+                    break
+        finally:
+            if mv is not None:
+                pool.release(mv)
+
+    def _read_mapped(self, fin, bmap: BlockMap, pool: BufferPool, filled: queue.Queue, stop: threading.Event):
+        pos = 0
+        for start, end, digest in bmap.ranges:
+            if start > pos:
+                mv = pool.acquire(stop)
+                if mv is None:
+                    return
+                try:
+                    if fin.skip(start - pos, mv) != start - pos:
+                        raise ValueError("Image is shorter than its block map.")
+                finally:
+                    pool.release(mv)
+                filled.put((None, start - pos, fin.consumed()))
+                pos = start
+            h = hashlib.new(bmap.checksum_type) if digest else None
+            while pos < end:
+                self._running.wait()
+                mv = pool.acquire(stop)
+                if mv is None:
+                    return
+                n = _fill(fin, mv[:min(pool.chunk, end - pos)])
+                if not n:
+                    pool.release(mv)
+                    raise ValueError("Image is shorter than its block map.")
+                self._src_stats["read"] += n
+                if h:
+                    h.update(mv[:n])
+                    if pos + n == end and h.hexdigest() != digest:
+                        pool.release(mv)
+                        raise ValueError(f"Checksum mismatch in block map range at offset {start}.")
+                self._record(pos, mv, n)
+                filled.put((mv, n, fin.consumed()))
+                pos += n
+            if h:
+                self._src_stats["bmap_checked"] += end - start
+        if bmap.image_size > pos:
+            filled.put((None, bmap.image_size - pos, fin.consumed()))
+
+    def _compare(self, run: _DeviceRun, size: int, pool, filled: queue.Queue, out: queue.Queue):
+        pos = 0
+        try:
+            scratch = bytearray(size)
+            view = memoryview(scratch)
+            fd = os.open(run.path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+            _drop_cache(fd)
+            with os.fdopen(fd, "rb", buffering=0) as f:
+                while True:
+                    item = filled.get()
+                    if item is None or isinstance(item, Exception):
+                        out.put(item)
+                        if item is None:
+                            return
+                        continue
+                    mv, n, consumed = item
+                    if mv is not None and run.attached:
+                        f.seek(pos)
+                        got = _fill(f, view[:n])
+                        try:
+                            os.posix_fadvise(f.fileno(), pos, n, os.POSIX_FADV_DONTNEED)
+                        except Exception:
+                            pass
+                        if got == n and scratch.startswith(mv[:n]):
+                            pool.release(mv)
+                            run.stats["identical"] += n
+                            run.stats["identical_chunks"] += 1
+                            item = (None, n, consumed)
+                        elif self.compare_only and run.mismatch is None:
+                            run.mismatch = pos + _first_difference(view[:got], mv[:n])
+                    out.put(item)
+                    pos += n
+        except Exception as e:
+            out.put(e)
+            out.put(None)
+
+    def _readback(self, f, block_size: int, pool: BufferPool, filled: queue.Queue, stop: threading.Event):
+        try:
+            for off, n, expected in self._digests:
+                self._running.wait()
+                mv = pool.acquire(stop)
+                if mv is None:
+                    break
+                want = n + (-n % block_size)
+                f.seek(off)
+                got = _fill(f, mv[:want])
+                filled.put((mv, off, min(n, got), n, expected))
+        except Exception as e:
+            filled.put(e)
+        finally:
+            filled.put(None)
+
+    def _verify(self, run: _DeviceRun, chunk: int) -> Optional[Tuple[int, int]]:
+        device_path = run.path
+        o_direct = getattr(os, "O_DIRECT", 0)
+        flags = os.O_RDONLY | getattr(os, "O_BINARY", 0)
+        bs = target_block_size(device_path)
+        fd = None
+        if o_direct and all(off % bs == 0 for off, _, _ in self._digests):
+            try:
+                fd = os.open(device_path, flags | o_direct)
+            except OSError:
+                fd = None
+        if fd is None:
+            bs = 1
+            fd = os.open(device_path, flags)
+            _drop_cache(fd)
+        total = sum(n for _, n, _ in self._digests)
+        run.verify_total = total
+        run.begin("verify")
+        pool = BufferPool(self._depth, chunk + (-chunk % bs), aligned=bs > 1)
+        zeros = bytes(pool.size) if any(e is None for _, _, e in self._digests) else b""
+        filled: queue.Queue = queue.Queue()
+        stop = threading.Event()
+        done = 0
+        with os.fdopen(fd, "rb", buffering=0) as f:
+            reader = threading.Thread(target=self._readback, args=(f, bs, pool, filled, stop), daemon=True)
+            reader.start()
+            try:
+                while not (self._cancel.is_set() or run.cancel.is_set()):
+                    item = filled.get()
+                    if item is None:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    mv, off, got, n, expected = item
+                    try:
+                        ok = got == n and (zeros.startswith(mv[:n]) if expected is None
+                                           else _digest(mv[:n]) == expected)
+                        if not ok:
+                            at, size = _mismatch(mv[:got], expected)
+                    finally:
+                        pool.release(mv)
+                    if not ok:
+                        return off + at, max(1, min(size, n - at))
+                    done += n
+                    run.stats["verified"] = done
+            finally:
+                stop.set()
+                reader.join()
+        if not (self._cancel.is_set() or run.cancel.is_set()):
+            run.end("verify")
+        return None
+
+    def _open_journal(self, image_path: str, run: _DeviceRun):
+        try:
+            journal = Journal(image_path, run.path)
+        except Exception:
+            return
+        if self.resume and journal.load():
+            if journal.check_tail(run.path):
+                self._resume_at = journal.durable
+            else:
+                journal = Journal(image_path, run.path)
+        self._journal = journal
+
+    def _open_check(self, device_path: str) -> Optional[str]:
+        try:
+            ftest = open(device_path, "rb" if self.compare_only else "rb+")
+            ftest.close()
+        except PermissionError:
+            return "Access denied. Try running as administrator/root."
+        except FileNotFoundError:
+            return "Target device not found."
+        except Exception as e:
+            return f"Cannot open target: {e}"
+        return None
+
+    def _fail(self, run: _DeviceRun, fanout: _Fanout, msg: str):
+        if run.error is None:
+            run.error = msg
+        run.state = "failed"
+        fanout.detach(run)
+
+    def _drain(self, inbox: queue.Queue, fanout: _Fanout):
+        while True:
+            item = inbox.get()
+            if item is None:
                 return
-            except FileNotFoundError:
-                self._emit(self.on_error, "Target device not found.")
+            if isinstance(item, tuple) and item[0] is not None:
+                fanout.release(item[0])
+
+    def _complete(self, run: _DeviceRun, chunk: int):
+        if run.state != "writing":
+            return
+        run.est = run.done
+        run.end("write")
+        if self.verify and not self.compare_only:
+            run.state = "verifying"
+            bad = self._verify(run, chunk)
+            if self._cancel.is_set() or run.cancel.is_set():
+                run.state = "canceled"
                 return
-            except Exception as e:
-                self._emit(self.on_error, f"Cannot open target: {e}")
+            if bad is not None:
+                at, size = bad
+                where = f"at offset {at}" if size == 1 else f"in the {size}-byte block at offset {at}"
+                run.error = f"Verification failed: device data differs from the image {where}."
+                run.state = "failed"
+                if self._journal:
+                    self._journal.clear()
                 return
-            with open(image_path, "rb", buffering=0) as fin, open(device_path, "rb+", buffering=0) as fout:
+        run.state = "done"
+        if self._journal:
+            self._journal.clear()
+
+    def _write_device(self, run: _DeviceRun, target: _Target, fanout: _Fanout, chunk: int,
+                      total: Optional[int], raw_size: int, mapped: bool, fill: bool):
+        inbox = run.inbox
+        stages = []
+        ended = False
+        try:
+            with target:
+                run.state = "writing"
+                run.begin("write")
                 try:
-                    fout.seek(0)
+                    target.f.seek(0)
                 except Exception:
                     pass
-                while not self._cancel.is_set():
-                    buf = fin.read(WRITE_CHUNK)
-                    if not buf:
+                if (self.sparse or mapped) and run.plan.get("discard") and total and not self.compare_only:
+                    run.stats["discarded"] = target.discard(0, total)
+                fill = fill and not (self.compare_only or self.delta or (run.stats["discarded"] and target.regular))
+                depth = int(run.plan.get("io_depth") or 1)
+                if depth > 1 and not self.compare_only:
+                    target.start_inflight(depth, run.done)
+                    if run.tuner:
+                        run.tuner.attach(target.inflight)
+                tune_lock = threading.Lock()
+                def observe(n, seconds):
+                    if run.tuner:
+                        with tune_lock:
+                            change = run.tuner.observe(n, seconds)
+                        if change:
+                            self._emit(self.on_device_tuning, run.path, change)
+                if self.delta or self.compare_only:
+                    compared: queue.Queue = queue.Queue()
+                    stages.append(threading.Thread(target=self._compare, args=(run, chunk, fanout, inbox, compared), daemon=True))
+                    stages[-1].start()
+                    inbox = compared
+                while True:
+                    item = inbox.get()
+                    if item is None:
                         break
-                    w = fout.write(buf)
-                    if w != len(buf):
-                        self._emit(self.on_error, "Partial write encountered.")
-                        return
-                    done += w
-                    now = time.time()
-                    if now - t_prev >= 0.12:
-                        span = max(now - t_prev, 1e-6)
-                        bps = (done - prev_done) / span
-                        eta = int((total - done)/bps) if bps > 1 else -1
-                        ratio = min(done/total, 0.99)
-                        self._emit(self.on_progress, ratio, done, total, bps, eta)
-                        t_prev = now
-                        prev_done = done
+                    if isinstance(item, Exception):
+                        if run.attached:
+                            self._fail(run, fanout, f"Error: {item}")
+                        continue
+                    mv, n, consumed = item
+                    if not run.attached or run.cancel.is_set() or self._cancel.is_set():
+                        if run.attached:
+                            run.state = "canceled"
+                            fanout.detach(run)
+                        elif run.state == "writing":
+                            run.state = "failed" if run.error else "canceled"
+                        if mv is not None:
+                            fanout.release(mv)
+                        continue
+                    if mv is None:
+                        w = n
+                        if run.done < self._resume_at:
+                            run.stats["resumed"] += n
+                        else:
+                            run.stats["skipped"] += n
+                            if fill and not (target.zero(run.done, n, chunk)
+                                             and (target.regular or run.plan.get("zeroout"))):
+                                run.stats["zero_filled"] += n
+                        if target.inflight:
+                            target.inflight.mark(run.done, n)
+                    elif self.compare_only:
+                        fanout.release(mv)
+                        bad = run.done if run.mismatch is None else run.mismatch
+                        self._fail(run, fanout, f"Device differs from the image at offset {bad}.")
+                        continue
+                    elif target.inflight:
+                        target.inflight.submit(mv, n, run.done, fanout.release, observe)
+                        if target.inflight.error:
+                            self._fail(run, fanout, f"Error: {target.inflight.error}")
+                            continue
+                        w = n
+                        run.stats["written"] += w
+                    else:
+                        t0 = time.perf_counter()
+                        try:
+                            w = target.write(mv[:n], run.done)
+                        finally:
+                            fanout.release(mv)
+                        observe(w, time.perf_counter() - t0)
+                        if w != n:
+                            self._fail(run, fanout, "Partial write encountered.")
+                            continue
+                        run.stats["written"] += w
+                    run.done += w
+                    target.settle()
+                    if target.wb:
+                        run.durable = target.wb.durable
+                    elif target.inflight:
+                        run.durable = target.completed
+                    if self._journal:
+                        self._journal.advance(target.durable)
+                    if total:
+                        run.est = total
+                    else:
+                        part = consumed / raw_size if raw_size else 0.0
+                        run.est = int(run.done / part) if part > 0 else run.done
+                ended = True
+                for t in stages:
+                    t.join()
+                try:
+                    if not self.compare_only:
+                        if run.state == "writing":
+                            target.finish(run.done)
+                        run.begin("sync")
+                        target.sync()
+                        run.end("sync")
+                        if self._journal:
+                            self._journal.advance(target.completed)
+                except Exception:
+                    pass
+                if target.inflight and target.inflight.error and run.state == "writing":
+                    self._fail(run, fanout, f"Error: {target.inflight.error}")
+                run.durable = None
+            self._complete(run, chunk)
+        except Exception as e:
+            run.error = run.error or f"Error: {e}"
+            run.state = "failed"
+            fanout.detach(run)
+            if not ended:
+                self._drain(inbox, fanout)
+        finally:
+            for t in stages:
+                t.join()
+            if run.state == "failed":
+                self._emit(self.on_device_error, run.path, run.error)
+            elif run.state == "done":
+                self._emit(self.on_device_finished, run.path)
+
+    def _zero_copy_engine(self, src, bmap, targets: Dict[str, _Target], chunk: int,
+                          adaptive: bool) -> Optional[KernelCopy]:
+        if self.zero_copy is False or src.region is None or bmap or len(self.runs) != 1 or len(targets) != 1:
+            return None
+        if self.compare_only or self.delta or self.sparse:
+            return None
+        run = self.runs[0]
+        if self.zero_copy is None and (adaptive or int(run.plan.get("io_depth") or 1) > 1):
+            return None
+        target = targets[run.path]
+        return KernelCopy(src.raw.fileno(), target.f.fileno(), target.pwrite, chunk=chunk)
+
+    def _observe_copy(self, src, start: int, pos: int, n: int):
+        if not (self.verify or self._journal or self._hasher):
+            return
+        base = start + pos - (start + pos) % mmap.ALLOCATIONGRANULARITY
+        m = mmap.mmap(src.raw.fileno(), start + pos + n - base, access=mmap.ACCESS_READ, offset=base)
+        try:
+            mv = memoryview(m)[start + pos - base:]
+            try:
+                if self._hasher:
+                    self._hasher.feed(start + pos, mv)
+                self._record(pos, mv, n)
+            finally:
+                mv.release()
+        finally:
+            m.close()
+
+    def _copy_device(self, run: _DeviceRun, target: _Target, src, engine: KernelCopy, chunk: int):
+        start, length = src.region
+        pos = min(self._resume_at, length)
+        try:
+            n = engine.copy(start + pos, pos, min(engine.chunk, length - pos)) if pos < length else 0
+            if n is None:
+                return
+            self.copy_method = engine.method or "none"
+            src.raw.seek(start + pos)
+            with target:
+                run.state = "writing"
+                run.begin("write")
+                run.est = length
+                run.done = target.completed = pos
+                run.stats["resumed"] = pos
+                while n:
+                    self._observe_copy(src, start, run.done, n)
+                    src.raw.advance(n)
+                    self._src_stats["read"] += n
+                    run.stats["written"] += n
+                    run.done += n
+                    target.completed = run.done
+                    if target.wb:
+                        target.wb.wrote(run.done - n, n)
+                        run.durable = target.wb.durable
+                    if self._journal:
+                        self._journal.advance(target.durable)
+                    if run.done >= length:
+                        break
+                    self._running.wait()
+                    if run.cancel.is_set() or self._cancel.is_set():
+                        run.state = "canceled"
+                        break
+                    n = engine.copy(start + run.done, run.done, min(engine.chunk, length - run.done))
+                    if not n:
+                        raise ValueError(f"Image ended early at offset {run.done}.")
+                if self._hasher and run.state == "writing":
+                    self._check_source(src)
                 try:
-                    fout.flush()
-                    os.fsync(fout.fileno())
+                    if run.state == "writing":
+                        target.finish(run.done)
+                    run.begin("sync")
+                    target.sync()
+                    run.end("sync")
+                    if self._journal:
+                        self._journal.advance(target.completed)
                 except Exception:
                     pass
-            if self._cancel.is_set():
-                self._emit(self.on_canceled)
+                run.durable = None
+            self._complete(run, chunk)
+        except Exception as e:
+            run.error = run.error or f"Error: {e}"
+            run.state = "failed"
+        finally:
+            engine.close()
+            if run.state == "failed":
+                self._emit(self.on_device_error, run.path, run.error)
+            elif run.state == "done":
+                self._emit(self.on_device_finished, run.path)
+
+    def _watch(self, live: List[_DeviceRun]):
+        tel = Telemetry(self)
+        reported: set = set()
+        alive = live
+        while alive:
+            alive[0].thread.join(PROGRESS_INTERVAL)
+            self._publish(tel, reported)
+            alive = [r for r in live if r.thread.is_alive()]
+
+    def _run(self, image_path: str, bmap_path: Optional[str] = None):
+        self._src_stats = {"read": 0, "bmap_checked": 0}
+        self.copy_method = None
+        self._digests = []
+        self._journal = None
+        self._resume_at = 0
+        self._hasher = None
+        self.source_check = None
+        try:
+            url = is_url(image_path)
+            if not url and not os.path.exists(image_path):
+                self._emit(self.on_error, "Source file not found.")
                 return
-            self._emit(self.on_progress, 1.0, total, total, 0.0, 0)
-            self._emit(self.on_finished)
+            if self._checksum:
+                known = None if url else self.hash_cache.lookup(file_key(image_path), self._checksum.algo)
+                if known is None:
+                    self._hasher = SourceHasher(self._checksum.algo)
+                else:
+                    try:
+                        self._check_digest(known)
+                    except ValueError as e:
+                        self._emit(self.on_error, str(e))
+                        return
+                    self.source_check = "cached"
+            bmap = None
+            if bmap_path:
+                try:
+                    bmap = parse_bmap(bmap_path)
+                except Exception as e:
+                    self._emit(self.on_error, f"Cannot read block map: {e}")
+                    return
+            try:
+                src = open_source(image_path, self.decode_workers, self.decode_inflight,
+                                  self._hasher.feed if self._hasher else None, self.keep_source_cache)
+            except Exception as e:
+                self._emit(self.on_error, f"Cannot read source: {e}")
+                return
+            total = bmap.image_size if bmap else src.size
+            targets: Dict[str, _Target] = {}
+            for run in self.runs:
+                err = self._open_check(run.path)
+                if err is None:
+                    run.plan = _plan_for(run.path, self.chunk_size, self.queue_depth, self.direct, self.discard,
+                                         self.io_depth)
+                    try:
+                        targets[run.path] = _Target(run.path, run.plan["direct"], self.sync, self.compare_only,
+                                                    self.writeback)
+                    except Exception as e:
+                        err = f"Cannot open target: {e}"
+                if err is not None:
+                    run.error = err
+                    run.state = "failed"
+                    run.attached = False
+                    self._emit(self.on_device_error, run.path, err)
+            if not targets:
+                src.close()
+                self._finish()
+                return
+            if self.journal is not False and len(self.runs) == 1 and targets and not (
+                    self.compare_only or self.sparse or bmap or src.sparse):
+                self._open_journal(image_path, self.runs[0])
+            plans = [r.plan for r in self.runs if r.path in targets]
+            bs = max([t.block_size for t in targets.values()] + [p["align"] for p in plans])
+            chunk = max(p["chunk_size"] for p in plans)
+            chunk = max(bs, chunk - chunk % bs)
+            self._depth = max(p["queue_depth"] for p in plans)
+            self._zero_block = max(bs, SPARSE_BLOCK - SPARSE_BLOCK % bs)
+            adaptive = self.adaptive if self.adaptive is not None else self.chunk_size is None
+            adaptive = adaptive and len(self.runs) == 1 and not self.compare_only
+            engine = self._zero_copy_engine(src, bmap, targets, chunk, adaptive)
+            if engine is not None:
+                run = self.runs[0]
+                origin = src.raw.tell()
+                run.thread = threading.Thread(target=self._copy_device,
+                                              args=(run, targets[run.path], src, engine, chunk), daemon=True)
+                run.thread.start()
+                self._watch([run])
+                if self.copy_method:
+                    src.close()
+                    self._finish()
+                    return
+                run.thread = None
+                run.state, run.error, run.done, run.durable = "pending", None, 0, None
+                run.stats, run.times = _new_stats(), {}
+                src.raw.seek(origin)
+            count = self._depth if len(self.runs) == 1 else max(self._depth, self.fanout_window)
+            if adaptive:
+                count = 2 * self._depth
+                chunk = min(MAX_CHUNK, 2 * chunk, max(bs, MAX_POOL_BYTES // count))
+                chunk = max(bs, chunk - chunk % bs)
+            count = max(2, min(count, MAX_POOL_BYTES // chunk))
+            pool = BufferPool(count, chunk, aligned=any(t.direct for t in targets.values()))
+            if adaptive:
+                self.runs[0].tuner = _Tuner(pool, self._depth, bs)
+            stop = threading.Event()
+            fanout = _Fanout(pool, self.runs, stop, self.lag_timeout)
+            with src as fin:
+                for run in self.runs:
+                    if run.path in targets:
+                        run.thread = threading.Thread(target=self._write_device,
+                                                      args=(run, targets[run.path], fanout, chunk, total, src.raw_size,
+                                                            bool(bmap) or src.sparse, not bmap),
+                                                      daemon=True)
+                        run.thread.start()
+                reader = threading.Thread(target=self._reader, args=(fin, fanout, fanout, stop, bmap), daemon=True)
+                reader.start()
+                self._watch([r for r in self.runs if r.thread])
+                stop.set()
+                reader.join()
+            self._finish()
         except Exception as e:
             self._emit(self.on_error, f"Error: {e}")
+
+    def _finish(self):
+        if self._cancel.is_set() or all(r.state == "canceled" for r in self.runs):
+            self._emit(self.on_canceled)
+            return
+        failed = [r for r in self.runs if r.error is not None]
+        if len(self.runs) == 1:
+            if failed:
+                self._emit(self.on_error, failed[0].error)
+                return
+        elif len(failed) == len(self.runs):
+            self._emit(self.on_error, "All targets failed: " + "; ".join(f"{r.path}: {r.error}" for r in failed))
+            return
+        if len(self.runs) > 1:
+            done = sum(r.done for r in self.runs)
+            self._emit(self.on_progress, 1.0, done, done, 0.0, 0)
+        self._emit(self.on_finished)
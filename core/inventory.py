@@ -0,0 +1,198 @@
+import os
+import queue
+import socket
+import threading
+from typing import Optional, Callable, Dict, List, Iterator
+
+from core.device_manager import (Device, IS_LIN, SYSFS, linux_device, list_devices,
+                                 mark_protected, sort_devices, system_disk_path)
+
+NETLINK_KOBJECT_UEVENT = 15
+UEVENT_KERNEL_GROUP = 1
+POLL_INTERVAL = 2.0
+
+Event = Dict[str, object]
+
+def parse_uevent(data: bytes) -> Event:
+    parts = data.split(b"\0")
+    head = parts[0].decode("utf-8", "replace")
+    if head.startswith("libudev"):
+        return {}
+    ev: Event = {}
+    action, sep, devpath = head.partition("@")
+    if sep:
+        ev["ACTION"], ev["DEVPATH"] = action, devpath
+    for p in parts[1:]:
+        k, sep, v = p.decode("utf-8", "replace").partition("=")
+        if sep:
+            ev[k] = v
+    return ev
+
+class NetlinkEvents:
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+        try:
+            self.sock.bind((0, UEVENT_KERNEL_GROUP))
+            self.sock.settimeout(0.5)
+        except Exception:
+            self.sock.close()
+            raise
+
+    def events(self, stop: threading.Event) -> Iterator[Event]:
+        while not stop.is_set():
+            try:
+                data = self.sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                if stop.is_set():
+                    return
+                raise
+            ev = parse_uevent(data)
+            if ev.get("SUBSYSTEM") == "block":
+                yield ev
+
+    def close(self):
+        self.sock.close()
+
+class QueueEvents:
+    def __init__(self, events=()):
+        self.q: queue.Queue = queue.Queue()
+        for ev in events:
+            self.q.put(ev)
+
+    def push(self, ev: Event):
+        self.q.put(ev)
+
+    def events(self, stop: threading.Event) -> Iterator[Event]:
+        while not stop.is_set():
+            try:
+                yield self.q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def close(self):
+        pass
+
+class PollingEvents:
+    def __init__(self, scan: Callable[[], List[Device]] = list_devices, interval: float = POLL_INTERVAL):
+        self.scan = scan
+        self.interval = interval
+
+    def events(self, stop: threading.Event) -> Iterator[Event]:
+        while not stop.wait(self.interval):
+            yield {"ACTION": "rescan", "devices": self.scan()}
+
+    def close(self):
+        pass
+
+def default_events():
+    if IS_LIN and hasattr(socket, "AF_NETLINK"):
+        try:
+            return NetlinkEvents()
+        except Exception:
+            pass
+    return PollingEvents()
+
+class DeviceInventory:
+    def __init__(self, events=None, sysfs_root: str = SYSFS):
+        self.sysfs_root = sysfs_root
+        self.on_added: Optional[Callable[[Device], None]] = None
+        self.on_removed: Optional[Callable[[Device], None]] = None
+        self.on_changed: Optional[Callable[[Device], None]] = None
+        self.on_error: Optional[Callable[[str], None]] = None
+        self._events = events
+        self._lock = threading.Lock()
+        self._devices: Dict[str, Device] = {}
+        self._sysdisk: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _emit(self, cb, *args):
+        try:
+            if cb:
+                cb(*args)
+        except Exception:
+            pass
+
+    def devices(self) -> List[Device]:
+        with self._lock:
+            return sort_devices(self._devices.values())
+
+    def get(self, path: str) -> Optional[Device]:
+        with self._lock:
+            return self._devices.get(path)
+
+    def start(self):
+        if self._thread:
+            return
+        if self._events is None:
+            self._events = default_events()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._events:
+            self._events.close()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def _run(self):
+        try:
+            self.rescan()
+            for ev in self._events.events(self._stop):
+                self.apply(ev)
+        except Exception as e:
+            if not self._stop.is_set():
+                self._emit(self.on_error, f"Device monitor stopped: {e}")
+
+    def rescan(self):
+        self._sysdisk = system_disk_path()
+        self._replace(list_devices(self.sysfs_root))
+
+    def _replace(self, fresh: List[Device]):
+        mark_protected(fresh, self._sysdisk)
+        new = {d.path: d for d in fresh}
+        with self._lock:
+            old = self._devices
+            self._devices = new
+        for path, d in old.items():
+            if path not in new:
+                self._emit(self.on_removed, d)
+        for path, d in new.items():
+            if path not in old:
+                self._emit(self.on_added, d)
+            elif old[path] != d:
+                self._emit(self.on_changed, d)
+
+    def apply(self, ev: Event):
+        action = ev.get("ACTION")
+        if action == "rescan":
+            self._replace(list(ev.get("devices") or []))
+            return
+        if ev.get("DEVTYPE") not in (None, "disk"):
+            return
+        base = os.path.basename(str(ev.get("DEVNAME") or ev.get("DEVPATH") or ""))
+        path = f"/dev/{base}"
+        if action == "remove":
+            with self._lock:
+                d = self._devices.pop(path, None)
+            if d:
+                self._emit(self.on_removed, d)
+            return
+        if action not in ("add", "change", "online", "move"):
+            return
+        d = linux_device(base, self.sysfs_root)
+        if d is None:
+            return
+        mark_protected([d], self._sysdisk)
+        with self._lock:
+            old = self._devices.get(path)
+            self._devices[path] = d
+        if old is None:
+            self._emit(self.on_added, d)
+        elif old != d:
+            self._emit(self.on_changed, d)
@@ -0,0 +1,144 @@
+import os
+import json
+import stat
+import hashlib
+import threading
+from typing import Optional, Dict, List
+
+SEGMENT = 64 * 1024 * 1024
+EDGE = 1024 * 1024
+TAIL_SEGMENTS = 2
+JOURNAL_HASH = "blake2b"
+VERSION = 1
+
+def state_dir() -> str:
+    base = os.environ.get("BITBURNER_STATE_DIR")
+    if not base:
+        cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        base = os.path.join(cache, "bitburner")
+    return base
+
+def journal_dir() -> str:
+    return os.path.join(state_dir(), "journal")
+
+def _hash() -> "hashlib._Hash":
+    return hashlib.new(JOURNAL_HASH, digest_size=16)
+
+def image_identity(path: str) -> Dict[str, object]:
+    st = os.stat(path)
+    h = _hash()
+    with open(path, "rb") as f:
+        h.update(f.read(EDGE))
+        if st.st_size > EDGE:
+            f.seek(max(EDGE, st.st_size - EDGE))
+            h.update(f.read(EDGE))
+    return {"path": os.path.realpath(path), "size": st.st_size, "mtime": int(st.st_mtime), "edges": h.hexdigest()}
+
+def device_identity(path: str) -> Dict[str, object]:
+    real = os.path.realpath(path)
+    st = os.stat(real)
+    if not stat.S_ISBLK(st.st_mode):
+        return {"path": real, "inode": [st.st_dev, st.st_ino]}
+    ident: Dict[str, object] = {"path": real, "rdev": st.st_rdev}
+    with open(real, "rb") as f:
+        ident["size"] = f.seek(0, os.SEEK_END)
+    base = os.path.basename(real)
+    for key in ("wwid", "serial", "model", "vendor"):
+        try:
+            with open(f"/sys/block/{base}/device/{key}", "r") as f:
+                ident[key] = f.read().strip()
+        except Exception:
+            pass
+    return ident
+
+def segment_hash(f, index: int) -> Optional[str]:
+    h = _hash()
+    f.seek(index * SEGMENT)
+    left = SEGMENT
+    while left:
+        data = f.read(min(left, 4 * 1024 * 1024))
+        if not data:
+            return None
+        h.update(data)
+        left -= len(data)
+    return h.hexdigest()
+
+class Journal:
+    def __init__(self, image_path: str, device_path: str):
+        self.image = image_identity(image_path)
+        self.device = device_identity(device_path)
+        key = hashlib.sha1(f"{self.image['path']}|{self.device['path']}".encode()).hexdigest()
+        self.path = os.path.join(journal_dir(), key + ".json")
+        self.segments: List[str] = []
+        self.durable = 0
+        self._saved = 0
+        self._lock = threading.Lock()
+        self._h = _hash()
+        self._pos = 0
+
+    def load(self) -> int:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except Exception:
+            return 0
+        if (data.get("version") != VERSION or data.get("image") != self.image
+                or data.get("device") != self.device):
+            return 0
+        segments = list(data.get("segments") or [])
+        durable = min(int(data.get("durable") or 0), len(segments) * SEGMENT)
+        durable -= durable % SEGMENT
+        self.segments = segments[:durable // SEGMENT]
+        self.durable = self._saved = self._pos = durable
+        return durable
+
+    def check_tail(self, device_path: str) -> bool:
+        first = max(0, len(self.segments) - TAIL_SEGMENTS)
+        try:
+            with open(device_path, "rb", buffering=0) as f:
+                return all(segment_hash(f, i) == self.segments[i] for i in range(first, len(self.segments)))
+        except Exception:
+            return False
+
+    def feed(self, offset: int, mv: memoryview):
+        if offset != self._pos:
+            return
+        while len(mv):
+            room = SEGMENT - self._pos % SEGMENT
+            part = mv[:room]
+            self._h.update(part)
+            self._pos += len(part)
+            mv = mv[len(part):]
+            if self._pos % SEGMENT == 0:
+                with self._lock:
+                    self.segments.append(self._h.hexdigest())
+                self._h = _hash()
+
+    def advance(self, durable: int):
+        with self._lock:
+            done = min(durable, len(self.segments) * SEGMENT)
+        done -= done % SEGMENT
+        if done > self._saved:
+            self.durable = done
+            self.save()
+
+    def save(self):
+        with self._lock:
+            data = {"version": VERSION, "image": self.image, "device": self.device,
+                    "segment_size": SEGMENT, "durable": self.durable,
+                    "segments": self.segments[:self.durable // SEGMENT]}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+            self._saved = self.durable
+        except Exception:
+            pass
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except Exception:
+            pass
@@ -0,0 +1,213 @@
+import os
+import lzma
+import zlib
+import queue
+import shutil
+import struct
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Tuple, Callable, Iterator
+
+from core.sources import Source, Tap, open_raw, xz_blocks
+
+BGZF_BATCH = 4 * 1024 * 1024
+ZSTD_SEEKABLE_MAGIC = 0x8F92EAB1
+ZSTD_SKIPPABLE_MAGIC = 0x184D2A5E
+
+Job = Tuple[Callable[[bytes], bytes], bytes, int]
+
+def _put_varint(v: int) -> bytes:
+    out = bytearray()
+    while True:
+        b = v & 0x7F
+        v >>= 7
+        if v:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+def _xz_wrap(block: bytes, unpadded: int, usize: int, flags: bytes) -> bytes:
+    header = b"\xfd7zXZ\x00" + flags + struct.pack("<I", zlib.crc32(flags))
+    index = b"\x00" + _put_varint(1) + _put_varint(unpadded) + _put_varint(usize)
+    index += b"\x00" * (-len(index) % 4)
+    index += struct.pack("<I", zlib.crc32(index))
+    tail = struct.pack("<I", len(index) // 4 - 1) + flags
+    footer = struct.pack("<I", zlib.crc32(tail)) + tail + b"YZ"
+    return header + block + index + footer
+
+def _xz_decode(payload: bytes) -> bytes:
+    return lzma.decompress(payload, format=lzma.FORMAT_XZ)
+
+def _xz_jobs(raw, blocks) -> Iterator[Job]:
+    for off, unpadded, usize, flags in blocks:
+        raw.seek(off)
+        span = (unpadded + 3) & ~3
+        yield _xz_decode, _xz_wrap(raw.read(span), unpadded, usize, flags), off + span
+
+def zstd_seek_table(path: str) -> Optional[List[Tuple[int, int]]]:
+    try:
+        with open(path, "rb") as f:
+            end = f.seek(0, os.SEEK_END)
+            f.seek(end - 9)
+            count, desc, magic = struct.unpack("<IBI", f.read(9))
+            if magic != ZSTD_SEEKABLE_MAGIC:
+                return None
+            esize = 12 if desc & 0x80 else 8
+            table_len = count * esize + 9
+            f.seek(end - table_len - 8)
+            smagic, fsize = struct.unpack("<II", f.read(8))
+            if smagic != ZSTD_SKIPPABLE_MAGIC or fsize != table_len:
+                return None
+            table = f.read(count * esize)
+        return [struct.unpack_from("<II", table, i * esize) for i in range(count)]
+    except Exception:
+        return None
+
+def _zstd_decoder() -> Optional[Callable[[bytes], bytes]]:
+    try:
+        import zstandard
+        return lambda payload: zstandard.ZstdDecompressor().decompressobj().decompress(payload)
+    except ImportError:
+        pass
+    exe = shutil.which("zstd")
+    if not exe:
+        return None
+    return lambda payload: subprocess.run([exe, "-d", "-c", "-q"], input=payload,
+                                          stdout=subprocess.PIPE, check=True).stdout
+
+def _zstd_jobs(raw, frames, decode) -> Iterator[Job]:
+    off = 0
+    raw.seek(0)
+    for csize, _ in frames:
+        payload = raw.read(csize)
+        off += csize
+        yield decode, payload, off
+
+def _is_bgzf(head: bytes) -> bool:
+    return len(head) >= 18 and head[:4] == b"\x1f\x8b\x08\x04" and head[12:14] == b"BC"
+
+def _gz_decode(payload: bytes) -> bytes:
+    out = []
+    d = zlib.decompressobj(31)
+    while payload:
+        out.append(d.decompress(payload))
+        payload = d.unused_data
+        d = zlib.decompressobj(31)
+    return b"".join(out)
+
+def _bgzf_jobs(raw) -> Iterator[Job]:
+    raw.seek(0)
+    off = 0
+    batch = []
+    size = 0
+    while True:
+        head = raw.read(18)
+        if not head:
+            break
+        if not _is_bgzf(head):
+            raise ValueError("Corrupt BGZF block.")
+        bsize = struct.unpack_from("<H", head, 16)[0] + 1
+        batch.append(head + raw.read(bsize - 18))
+        size += bsize
+        off += bsize
+        if size >= BGZF_BATCH:
+            yield _gz_decode, b"".join(batch), off
+            batch, size = [], 0
+    if batch:
+        yield _gz_decode, b"".join(batch), off
+
+class ParallelSource(Source):
+    def __init__(self, path: str, kind: str, jobs: Callable[[object], Iterator[Job]],
+                 size: Optional[int], workers: int, inflight: int, tap: Optional[Tap] = None,
+                 keep_cache: bool = False):
+        raw = open_raw(path, tap, keep_cache)
+        super().__init__(path, raw, size)
+        self.kind = kind
+        self._jobs = jobs(raw)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bitburner-decode")
+        self._pending: queue.Queue = queue.Queue(maxsize=max(1, inflight))
+        self._stop = threading.Event()
+        self._cur = memoryview(b"")
+        self._pos = 0
+        self._consumed = 0
+        self._eof = False
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    def _offer(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._pending.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _dispatch(self):
+        try:
+            for decode, payload, end in self._jobs:
+                if not self._offer((self._pool.submit(decode, payload), end)):
+                    return
+        except Exception as e:
+            self._offer(e)
+        self._offer(None)
+
+    def readinto(self, mv: memoryview) -> int:
+        while self._pos >= len(self._cur):
+            if self._eof:
+                return 0
+            item = self._pending.get()
+            if item is None:
+                self._eof = True
+                return 0
+            if isinstance(item, Exception):
+                raise item
+            fut, end = item
+            self._cur = memoryview(fut.result())
+            self._pos = 0
+            self._consumed = end
+        n = min(len(mv), len(self._cur) - self._pos)
+        mv[:n] = self._cur[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def consumed(self) -> int:
+        return self._consumed
+
+    def close(self):
+        self._stop.set()
+        try:
+            while True:
+                item = self._pending.get_nowait()
+                if isinstance(item, tuple):
+                    item[0].cancel()
+        except queue.Empty:
+            pass
+        self._dispatcher.join()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self.raw.close()
+
+def open_parallel(path: str, kind: str, workers: int, inflight: int, tap: Optional[Tap] = None,
+                  keep_cache: bool = False) -> Optional[Source]:
+    if kind == "xz":
+        blocks = xz_blocks(path)
+        if not blocks or len(blocks) < 2:
+            return None
+        size = sum(b[2] for b in blocks)
+        return ParallelSource(path, kind, lambda raw: _xz_jobs(raw, blocks), size, workers, inflight, tap, keep_cache)
+    if kind == "zst":
+        frames = zstd_seek_table(path)
+        decode = _zstd_decoder() if frames and len(frames) > 1 else None
+        if not decode:
+            return None
+        size = sum(d for _, d in frames)
+        return ParallelSource(path, kind, lambda raw: _zstd_jobs(raw, frames, decode), size, workers, inflight,
+                              tap, keep_cache)
+    if kind == "gz":
+        with open(path, "rb") as f:
+            if not _is_bgzf(f.read(18)):
+                return None
+        return ParallelSource(path, kind, _bgzf_jobs, None, workers, inflight, tap, keep_cache)
+    return None
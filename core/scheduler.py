@@ -0,0 +1,242 @@
+import time
+import threading
+from typing import Optional, Callable, Dict, List, Tuple
+
+from core.checksum import Checksum
+from core.device_manager import UsbPath, usb_path
+
+PER_HUB = 2
+PER_BUS = 3
+JOB_BPS = 30 * 1024 * 1024
+LINK_EFFICIENCY = 0.6
+WARMUP = 3.0
+POLL_INTERVAL = 0.2
+FINAL_STATES = ("done", "failed", "canceled")
+
+def link_bps(mbit: float) -> float:
+    return mbit * 125000 * LINK_EFFICIENCY
+
+class Job:
+    def __init__(self, image: str, device: str, bmap: Optional[str] = None, checksum: Optional[Checksum] = None):
+        self.image = image
+        self.device = device
+        self.bmap = bmap
+        self.checksum = checksum
+        self.topology: Optional[UsbPath] = None
+        self.state = "queued"
+        self.error: Optional[str] = None
+        self.writer = None
+        self.done = 0
+        self.total = 0
+        self.bps = 0.0
+        self.started: Optional[float] = None
+        self.ended: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.ended or time.monotonic()) - self.started
+
+    @property
+    def average_bps(self) -> float:
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    def snapshot(self) -> Dict[str, object]:
+        t = self.topology
+        return {"image": self.image, "device": self.device, "state": self.state, "error": self.error,
+                "done": self.done, "total": self.total, "bps": 0.0 if self.ended else self.bps,
+                "average_bps": self.average_bps, "elapsed": round(self.elapsed, 3),
+                "controller": t.controller if t else None, "bus": t.bus if t else None,
+                "hub": t.hub if t else None, "port": t.port if t else None}
+
+class JobScheduler:
+    def __init__(self, writer_factory: Optional[Callable[[], object]] = None,
+                 topology: Optional[Callable[[str], Optional[UsbPath]]] = None,
+                 per_hub: int = PER_HUB, per_bus: int = PER_BUS, max_jobs: Optional[int] = None,
+                 bus_bps: Optional[float] = None, job_bps: float = JOB_BPS, interval: float = POLL_INTERVAL):
+        if writer_factory is None:
+            from core.imaging import ImageWriter
+            writer_factory = ImageWriter
+        self.writer_factory = writer_factory
+        self.topology = topology or usb_path
+        self.per_hub = per_hub
+        self.per_bus = per_bus
+        self.max_jobs = max_jobs
+        self.bus_bps = bus_bps
+        self.job_bps = job_bps
+        self.interval = interval
+        self.jobs: List[Job] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started: Optional[float] = None
+        self.on_job_started: Optional[Callable[[Job], None]] = None
+        self.on_job_progress: Optional[Callable[[Job], None]] = None
+        self.on_job_finished: Optional[Callable[[Job], None]] = None
+        self.on_finished: Optional[Callable[[], None]] = None
+
+    def _emit(self, cb, *args):
+        try:
+            if cb:
+                cb(*args)
+        except Exception:
+            pass
+
+    def submit(self, image: str, device: str, bmap: Optional[str] = None,
+               checksum: Optional[Checksum] = None) -> Job:
+        job = Job(image, device, bmap, checksum)
+        try:
+            job.topology = self.topology(device)
+        except Exception:
+            job.topology = None
+        if job.topology is None:
+            job.topology = UsbPath(controller=device, bus=device, hub=device, port=device)
+        with self._lock:
+            self.jobs.append(job)
+        self._wake.set()
+        return job
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._cancel.clear()
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def cancel(self, job: Optional[Job] = None):
+        writers = []
+        with self._lock:
+            jobs = list(self.jobs) if job is None else [job]
+            if job is None:
+                self._cancel.set()
+            for j in jobs:
+                if j.state == "queued":
+                    j.state = "canceled"
+                elif j.state == "running" and j.writer is not None:
+                    writers.append(j.writer)
+                elif j.state == "running":
+                    j.state = "canceled"
+                    j.ended = time.monotonic()
+        for w in writers:
+            w.cancel()
+        self._wake.set()
+
+    def _links(self, job: Job) -> List[Tuple[str, int, float]]:
+        t = job.topology
+        links = [(f"bus:{t.bus}", self.per_bus, self.bus_bps or link_bps(t.bus_speed))]
+        if t.hub != t.bus:
+            links.append((f"hub:{t.hub}", self.per_hub, link_bps(t.hub_speed)))
+        return links
+
+    def _expected(self, job: Job) -> float:
+        if job.state == "running" and job.elapsed >= WARMUP and job.bps > 0:
+            return job.bps
+        own = link_bps(job.topology.speed)
+        return min(self.job_bps, own) if own else self.job_bps
+
+    def _admissible(self, job: Job, running: List[Job]) -> bool:
+        if any(r.device == job.device for r in running):
+            return False
+        if self.max_jobs and len(running) >= self.max_jobs:
+            return False
+        for key, limit, cap in self._links(job):
+            sharing = [r for r in running if key in (k for k, _, _ in self._links(r))]
+            if not sharing:
+                continue
+            if limit and len(sharing) >= limit:
+                return False
+            if cap and sum(self._expected(r) for r in sharing) + self._expected(job) > cap:
+                return False
+        return True
+
+    def _admit(self) -> List[Job]:
+        started = []
+        while not self._cancel.is_set():
+            running = [j for j in self.jobs if j.state == "running"]
+            queued = [(i, j) for i, j in enumerate(self.jobs) if j.state == "queued" and self._admissible(j, running)]
+            if not queued:
+                break
+
+            def load(item):
+                i, j = item
+                return (sum(r.topology.controller == j.topology.controller for r in running),
+                        sum(r.topology.bus == j.topology.bus for r in running), i)
+
+            _, job = min(queued, key=load)
+            job.state = "running"
+            job.started = time.monotonic()
+            started.append(job)
+        return started
+
+    def _launch(self, job: Job):
+        def progress(ratio, done, total, bps, eta):
+            job.done, job.total, job.bps = done, total, bps
+
+        def end(state, error=None):
+            with self._lock:
+                if job.state != "running":
+                    return
+                job.state = state
+                job.error = error
+                job.ended = time.monotonic()
+                job.bps = 0.0
+            self._wake.set()
+
+        try:
+            w = self.writer_factory()
+            w.on_progress = progress
+            w.on_finished = lambda: end("done")
+            w.on_error = lambda msg: end("failed", msg)
+            w.on_canceled = lambda: end("canceled")
+            with self._lock:
+                if job.state != "running":
+                    return
+                job.writer = w
+            w.start(job.image, job.device, job.bmap, job.checksum)
+        except Exception as e:
+            end("failed", f"Error: {e}")
+
+    def _run(self):
+        reported = set()
+        while True:
+            with self._lock:
+                started = self._admit()
+            for j in started:
+                self._launch(j)
+                self._emit(self.on_job_started, j)
+            with self._lock:
+                jobs = list(self.jobs)
+            for j in jobs:
+                if j.state in FINAL_STATES and id(j) not in reported:
+                    reported.add(id(j))
+                    self._emit(self.on_job_finished, j)
+                elif j.state == "running":
+                    self._emit(self.on_job_progress, j)
+            if all(j.state in FINAL_STATES for j in jobs):
+                break
+            self._wake.wait(self.interval)
+            self._wake.clear()
+        self._emit(self.on_finished)
+
+    def throughput(self) -> Dict[str, object]:
+        with self._lock:
+            jobs = list(self.jobs)
+        running = [j for j in jobs if j.state == "running"]
+        buses: Dict[str, float] = {}
+        for j in running:
+            buses[j.topology.bus] = buses.get(j.topology.bus, 0.0) + j.bps
+        done = sum(j.done for j in jobs)
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        return {"bps": sum(j.bps for j in running), "average_bps": done / elapsed if elapsed > 0 else 0.0,
+                "done": done, "total": sum(j.total for j in jobs), "elapsed": round(elapsed, 3),
+                "running": len(running), "queued": sum(j.state == "queued" for j in jobs),
+                "buses": buses, "jobs": [j.snapshot() for j in jobs]}
@@ -0,0 +1,414 @@
+import io
+import os
+import bz2
+import errno
+import gzip
+import lzma
+import shutil
+import struct
+import zipfile
+import threading
+import subprocess
+from typing import Optional, List, Tuple, Callable
+
+Tap = Callable[[int, object], None]
+
+IMAGE_EXTENSIONS = (".img", ".iso", ".bin", ".raw", ".zip", ".gz", ".xz", ".bz2", ".zst",
+                    ".qcow2", ".qcow", ".vhd", ".vmdk")
+
+MAGIC = [
+    (b"PK\x03\x04", "zip"),
+    (b"\x1f\x8b", "gz"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"BZh", "bz2"),
+    (b"\x28\xb5\x2f\xfd", "zst"),
+    (b"QFI\xfb", "qcow2"),
+    (b"KDMV", "vmdk"),
+    (b"# Disk D", "vmdk"),
+    (b"conectix", "vhd"),
+]
+
+VDISK_KINDS = ("qcow2", "vhd", "vmdk")
+
+PIPE_CHUNK = 1024 * 1024
+READAHEAD = 32 * 1024 * 1024
+DROP_BEHIND = 8 * 1024 * 1024
+
+class SourceFile(io.FileIO):
+    def __init__(self, path: str, tap: Optional[Tap] = None, keep_cache: bool = False,
+                 readahead: int = READAHEAD):
+        super().__init__(path, "rb")
+        self.tap = tap
+        self.readahead = readahead
+        self._off = 0
+        self._ahead = 0
+        self._dropped = 0
+        self._advise = not keep_cache and hasattr(os, "posix_fadvise")
+        if self._advise:
+            try:
+                os.posix_fadvise(self.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except OSError:
+                self._advise = False
+
+    def _drop(self, start: int, end: int):
+        try:
+            if end > start:
+                os.posix_fadvise(self.fileno(), start, end - start, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            self._advise = False
+
+    def _hygiene(self, end: int):
+        try:
+            if end + self.readahead // 2 > self._ahead:
+                start = max(end, self._ahead)
+                self._ahead = end + self.readahead
+                os.posix_fadvise(self.fileno(), start, self._ahead - start, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            self._advise = False
+        edge = end - end % DROP_BEHIND
+        if edge > self._dropped:
+            self._drop(self._dropped, edge)
+            self._dropped = edge
+
+    def _done(self, data) -> None:
+        off = self._off
+        self._off += len(data)
+        if self.tap:
+            self.tap(off, data)
+        if self._advise:
+            self._hygiene(self._off)
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        old = self._off
+        self._off = super().seek(pos, whence)
+        if self._off != old:
+            if self._advise:
+                self._drop(self._dropped, old)
+            self._ahead = self._off
+            self._dropped = self._off - self._off % DROP_BEHIND
+        return self._off
+
+    def tell(self) -> int:
+        return self._off
+
+    def advance(self, n: int) -> int:
+        self._off = super().seek(self._off + n)
+        if self._advise:
+            self._hygiene(self._off)
+        return self._off
+
+    def readinto(self, b) -> int:
+        n = super().readinto(b)
+        if n:
+            self._done(memoryview(b)[:n])
+        return n
+
+    def read(self, size: int = -1) -> bytes:
+        data = super().read(size)
+        if data:
+            self._done(data)
+        return data
+
+    def readall(self) -> bytes:
+        return self.read(-1)
+
+    def close(self):
+        if self._advise and not self.closed:
+            self._drop(self._dropped, max(self._off, self._ahead))
+        super().close()
+
+def open_raw(path: str, tap: Optional[Tap] = None, keep_cache: bool = False):
+    return SourceFile(path, tap, keep_cache)
+
+def is_url(path: str) -> bool:
+    return path.lower().startswith(("http://", "https://"))
+
+def _sniff(head: bytes) -> str:
+    for magic, kind in MAGIC:
+        if head.startswith(magic):
+            return kind
+    return "raw"
+
+def detect_format(path: str) -> str:
+    with open(path, "rb") as f:
+        kind = _sniff(f.read(8))
+        if kind == "raw" and f.seek(0, os.SEEK_END) >= 512:
+            f.seek(-512, os.SEEK_END)
+            if f.read(8) == b"conectix":
+                kind = "vhd"
+    return kind
+
+class Source:
+    kind = "raw"
+    sparse = False
+    region: Optional[Tuple[int, int]] = None
+
+    def __init__(self, path: str, raw, size: Optional[int], name: Optional[str] = None):
+        self.path = path
+        self.raw = raw
+        self.size = size
+        try:
+            self.raw_size = os.fstat(raw.fileno()).st_size
+        except Exception:
+            self.raw_size = getattr(raw, "length", None) or 0
+        self.name = name or os.path.basename(path.split("?", 1)[0])
+
+    def readinto(self, mv: memoryview) -> int:
+        return self.raw.readinto(mv)
+
+    def consumed(self) -> int:
+        try:
+            return self.raw.tell()
+        except Exception:
+            return 0
+
+    def next_data(self, pos: int) -> Optional[int]:
+        return pos
+
+    def skip(self, n: int, scratch: memoryview) -> int:
+        left = n
+        while left:
+            got = self.readinto(scratch[:min(left, len(scratch))])
+            if not got:
+                break
+            left -= got
+        return n - left
+
+    def close(self):
+        self.raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class RawSource(Source):
+    def __init__(self, path: str, tap: Optional[Tap] = None, keep_cache: bool = False):
+        raw = open_raw(path, tap, keep_cache)
+        super().__init__(path, raw, os.fstat(raw.fileno()).st_size)
+        self.region = (0, self.size)
+
+    def next_data(self, pos: int) -> Optional[int]:
+        seek_data = getattr(os, "SEEK_DATA", None)
+        if seek_data is None:
+            return pos
+        fd = self.raw.fileno()
+        try:
+            return os.lseek(fd, pos, seek_data)
+        except OSError as e:
+            return None if e.errno == errno.ENXIO else pos
+        finally:
+            os.lseek(fd, pos, os.SEEK_SET)
+
+    def seek(self, pos: int):
+        self.raw.seek(pos)
+
+    def skip(self, n: int, scratch: memoryview) -> int:
+        self.raw.seek(n, os.SEEK_CUR)
+        return n
+
+class StreamSource(Source):
+    def __init__(self, path: str, raw, stream, kind: str, size: Optional[int], name: Optional[str] = None):
+        super().__init__(path, raw, size, name)
+        self.stream = stream
+        self.kind = kind
+
+    def readinto(self, mv: memoryview) -> int:
+        return self.stream.readinto(mv)
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            self.raw.close()
+
+class ProcessSource(Source):
+    def __init__(self, path: str, raw, argv: List[str], kind: str, size: Optional[int]):
+        super().__init__(path, raw, size)
+        self.kind = kind
+        self._fed = 0
+        self.proc = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self._feeder = threading.Thread(target=self._feed, daemon=True)
+        self._feeder.start()
+
+    def _feed(self):
+        try:
+            while True:
+                b = self.raw.read(PIPE_CHUNK)
+                if not b:
+                    break
+                self.proc.stdin.write(b)
+                self._fed += len(b)
+        except Exception:
+            pass
+        finally:
+            try:
+                self.proc.stdin.close()
+            except Exception:
+                pass
+
+    def readinto(self, mv: memoryview) -> int:
+        n = self.proc.stdout.readinto(mv)
+        if not n and self.proc.wait() != 0:
+            raise IOError(f"{self.kind} decoder exited with status {self.proc.returncode}")
+        return n
+
+    def consumed(self) -> int:
+        return self._fed
+
+    def close(self):
+        try:
+            if self.proc.poll() is None:
+                self.proc.kill()
+            self.proc.wait()
+            self.proc.stdout.close()
+        finally:
+            self.raw.close()
+
+def _varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    v = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        v |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return v, pos
+        shift += 7
+
+def xz_blocks(path: str) -> Optional[List[Tuple[int, int, int, bytes]]]:
+    try:
+        blocks: List[Tuple[int, int, int, bytes]] = []
+        with open(path, "rb") as f:
+            end = f.seek(0, os.SEEK_END)
+            while end > 0:
+                f.seek(end - 4)
+                if f.read(4) == b"\x00\x00\x00\x00":
+                    end -= 4
+                    continue
+                f.seek(end - 12)
+                footer = f.read(12)
+                if footer[10:12] != b"YZ":
+                    return None
+                index_size = (struct.unpack("<I", footer[4:8])[0] + 1) * 4
+                index_start = end - 12 - index_size
+                f.seek(index_start)
+                index = f.read(index_size)
+                if index[0] != 0:
+                    return None
+                count, pos = _varint(index, 1)
+                records = []
+                for _ in range(count):
+                    unpadded, pos = _varint(index, pos)
+                    usize, pos = _varint(index, pos)
+                    records.append((unpadded, usize))
+                stream_start = index_start - sum((u + 3) & ~3 for u, _ in records) - 12
+                if stream_start < 0:
+                    return None
+                off = stream_start + 12
+                stream_blocks = []
+                for unpadded, usize in records:
+                    stream_blocks.append((off, unpadded, usize, footer[8:10]))
+                    off += (unpadded + 3) & ~3
+                blocks[:0] = stream_blocks
+                end = stream_start
+        return blocks
+    except Exception:
+        return None
+
+def zstd_frame_size(path: str) -> Optional[int]:
+    try:
+        with open(path, "rb") as f:
+            h = f.read(18)
+        fhd = h[4]
+        fcs_flag = fhd >> 6
+        single = (fhd >> 5) & 1
+        pos = 5 + (0 if single else 1) + (0, 1, 2, 4)[fhd & 3]
+        width = (1 if single else 0, 2, 4, 8)[fcs_flag]
+        if not width:
+            return None
+        v = int.from_bytes(h[pos:pos + width], "little")
+        return v + 256 if width == 2 else v
+    except Exception:
+        return None
+
+def _zip_member(zf: zipfile.ZipFile) -> Optional[zipfile.ZipInfo]:
+    return next((m for m in zf.infolist() if not m.is_dir()), None)
+
+def _stored_region(raw, member: zipfile.ZipInfo) -> Optional[Tuple[int, int]]:
+    if member.compress_type != zipfile.ZIP_STORED or member.flag_bits & 1 or not isinstance(raw, SourceFile):
+        return None
+    head = bytearray(30)
+    raw.seek(member.header_offset)
+    if raw.readinto(head) != 30 or head[:4] != b"PK\x03\x04":
+        return None
+    name_len, extra_len = struct.unpack_from("<HH", head, 26)
+    return member.header_offset + 30 + name_len + extra_len, member.file_size
+
+def _open_zstd(path: str, raw) -> Source:
+    size = zstd_frame_size(path)
+    try:
+        import zstandard
+    except ImportError:
+        zstandard = None
+    if zstandard is not None:
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        return StreamSource(path, raw, stream, "zst", size)
+    exe = shutil.which("zstd")
+    if not exe:
+        raise RuntimeError("Reading .zst images requires the 'zstandard' module or the zstd tool.")
+    return ProcessSource(path, raw, [exe, "-d", "-c", "-q"], "zst", size)
+
+def open_source(path: str, workers: int = 1, inflight: Optional[int] = None, tap: Optional[Tap] = None,
+                keep_cache: bool = False) -> Source:
+    if is_url(path):
+        from core.http_source import HttpReader
+        raw = HttpReader(path, tap=tap)
+        kind = _sniff(raw.head)
+        if kind == "raw":
+            return Source(path, raw, raw.length)
+    else:
+        kind = detect_format(path)
+        if kind == "raw":
+            return RawSource(path, tap, keep_cache)
+        if workers > 1:
+            from core.parallel_decode import open_parallel
+            src = open_parallel(path, kind, workers, inflight or 2 * workers, tap, keep_cache)
+            if src is not None:
+                return src
+        raw = open_raw(path, tap, keep_cache)
+    try:
+        if kind in VDISK_KINDS:
+            if not raw.seekable():
+                raise ValueError(f"{kind} images need random access; the server does not support range requests.")
+            from core.vdisk import open_vdisk
+            return open_vdisk(path, raw, kind)
+        if kind == "zst":
+            return _open_zstd(path, raw)
+        if kind == "zip":
+            if not raw.seekable():
+                raise ValueError("ZIP images need random access; the server does not support range requests.")
+            zf = zipfile.ZipFile(raw)
+            member = _zip_member(zf)
+            if not member:
+                raise ValueError("ZIP archive contains no files.")
+            src = StreamSource(path, raw, zf.open(member, "r"), kind, member.file_size, member.filename)
+            src.region = _stored_region(raw, member)
+            return src
+        if kind == "gz":
+            return StreamSource(path, raw, gzip.GzipFile(fileobj=raw, mode="rb"), kind, None)
+        if kind == "xz":
+            blocks = xz_blocks(path)
+            size = sum(b[2] for b in blocks) if blocks else None
+            return StreamSource(path, raw, lzma.LZMAFile(raw), kind, size)
+        return StreamSource(path, raw, bz2.BZ2File(raw), kind, None)
+    except Exception:
+        raw.close()
+        raise
+
+def probe(path: str) -> Tuple[str, Optional[int], str]:
+    if not is_url(path) and detect_format(path) == "zst":
+        return "zst", zstd_frame_size(path), os.path.basename(path)
+    with open_source(path) as src:
+        return src.kind, src.size, src.name
@@ -0,0 +1,74 @@
+import math
+import time
+import threading
+from typing import Optional, Dict, Tuple
+
+SMOOTHING = 3.0
+PHASES = ("write", "verify")
+
+class _Rate:
+    def __init__(self, tau: float):
+        self.tau = tau
+        self.t: Optional[float] = None
+        self.done = 0
+        self.bps = 0.0
+
+    def update(self, done: int, now: float) -> float:
+        if self.t is None:
+            self.t, self.done = now, done
+            return self.bps
+        dt = now - self.t
+        if dt <= 0:
+            return self.bps
+        inst = max(0.0, (done - self.done) / dt)
+        a = 1.0 - math.exp(-dt / self.tau)
+        self.bps = inst if self.bps == 0 else self.bps + a * (inst - self.bps)
+        self.t, self.done = now, done
+        return self.bps
+
+def _snapshot(path, phase, done, total, started, ended, bps, now) -> Dict[str, object]:
+    finished = ended is not None
+    if finished:
+        total = done
+    ratio = 1.0 if finished else (min(done / total, 0.99) if total else 0.0)
+    eta = 0 if finished else (int((total - done) / bps) if bps > 1 and total else -1)
+    return {"path": path, "phase": phase, "ratio": ratio, "done": done, "total": total,
+            "bps": 0.0 if finished else bps, "eta": eta, "finished": finished,
+            "elapsed": round((ended if finished else now) - started, 3)}
+
+class Telemetry:
+    def __init__(self, writer, smoothing: float = SMOOTHING):
+        self.writer = writer
+        self.smoothing = smoothing
+        self._rates: Dict[Tuple[Optional[str], str], _Rate] = {}
+        self._lock = threading.Lock()
+
+    def _rate(self, key, done: int, now: float) -> float:
+        r = self._rates.get(key)
+        if r is None:
+            r = self._rates[key] = _Rate(self.smoothing)
+        return r.update(done, now)
+
+    def sample(self) -> Dict[str, object]:
+        now = time.monotonic()
+        out: Dict[str, object] = {"devices": [], "write": None, "verify": None}
+        with self._lock:
+            for phase in PHASES:
+                runs = [r for r in self.writer.runs if phase in r.times]
+                for r in runs:
+                    done, total = r.counters(phase)
+                    started, ended = r.times[phase]
+                    bps = self._rate((r.path, phase), done, now)
+                    snap = _snapshot(r.path, phase, done, total, started, ended, bps, now)
+                    snap["state"] = r.state
+                    out["devices"].append(snap)
+                if not runs:
+                    continue
+                done = sum(r.counters(phase)[0] for r in runs)
+                total = sum(r.counters(phase)[1] for r in runs)
+                started = min(r.times[phase][0] for r in runs)
+                ends = [r.times[phase][1] for r in runs]
+                ended = max(ends) if all(e is not None for e in ends) else None
+                bps = self._rate((None, phase), done, now)
+                out[phase] = _snapshot(None, phase, done, total, started, ended, bps, now)
+        return out
@@ -0,0 +1,289 @@
+import os
+import zlib
+import struct
+from array import array
+from bisect import bisect_left
+from typing import Optional
+
+from core.sources import Source
+
+HOLE = -1
+SPECIAL = -2
+
+QCOW2_MAGIC = b"QFI\xfb"
+QCOW2_OFFSET_MASK = 0x00FFFFFFFFFFFE00
+QCOW2_COMPRESSED = 1 << 62
+QCOW2_ZERO = 1
+QCOW2_KNOWN_INCOMPATIBLE = 0b01001
+
+VHD_COOKIE = b"conectix"
+VHD_SPARSE_COOKIE = b"cxsparse"
+VHD_FIXED, VHD_DYNAMIC, VHD_DIFFERENCING = 2, 3, 4
+VHD_UNALLOCATED = 0xFFFFFFFF
+
+VMDK_MAGIC = b"KDMV"
+VMDK_GD_AT_END = 0xFFFFFFFFFFFFFFFF
+VMDK_ZEROED_GTE = 1 << 2
+VMDK_COMPRESSED = 1 << 16
+SECTOR = 512
+
+class ClusterSource(Source):
+    sparse = True
+
+    def __init__(self, path: str, raw, size: int, cluster: int, kind: str):
+        super().__init__(path, raw, size)
+        self.kind = kind
+        self.cluster = cluster
+        self.allocated = array("Q")
+        self._pos = 0
+        self._zeros = bytes(cluster)
+        self._buf = bytearray(cluster)
+        self._buf_index = -1
+
+    def _host(self, i: int) -> int:
+        raise NotImplementedError
+
+    def _load(self, i: int, out: memoryview):
+        raise NotImplementedError
+
+    def _pread(self, offset: int, mv: memoryview) -> int:
+        if self.raw.tell() != offset:
+            self.raw.seek(offset)
+        got = 0
+        while got < len(mv):
+            n = self.raw.readinto(mv[got:])
+            if not n:
+                break
+            got += n
+        return got
+
+    def _read(self, offset: int, n: int) -> bytes:
+        buf = bytearray(n)
+        return bytes(buf[:self._pread(offset, memoryview(buf))])
+
+    def readinto(self, mv: memoryview) -> int:
+        end = min(self._pos + len(mv), self.size)
+        done = 0
+        while self._pos < end:
+            i, off = divmod(self._pos, self.cluster)
+            n = min(self.cluster - off, end - self._pos)
+            host = self._host(i)
+            if host == HOLE:
+                mv[done:done + n] = self._zeros[:n]
+            elif host == SPECIAL:
+                if self._buf_index != i:
+                    self._load(i, memoryview(self._buf))
+                    self._buf_index = i
+                mv[done:done + n] = self._buf[off:off + n]
+            else:
+                k = 1
+                while self._pos + n < end and self._host(i + k) == host + k * self.cluster:
+                    n = min(n + self.cluster, end - self._pos)
+                    k += 1
+                if self._pread(host + off, mv[done:done + n]) != n:
+                    raise ValueError(f"{self.kind} image is truncated at cluster {i}.")
+            self._pos += n
+            done += n
+        return done
+
+    def next_data(self, pos: int) -> Optional[int]:
+        k = bisect_left(self.allocated, pos // self.cluster)
+        if k == len(self.allocated):
+            return None
+        return max(pos, self.allocated[k] * self.cluster)
+
+    def seek(self, pos: int):
+        self._pos = min(pos, self.size)
+
+    def skip(self, n: int, scratch: memoryview) -> int:
+        start = self._pos
+        self.seek(start + n)
+        return self._pos - start
+
+    def consumed(self) -> int:
+        return int(self.raw_size * self._pos / self.size) if self.size else 0
+
+    @property
+    def mapped_bytes(self) -> int:
+        return len(self.allocated) * self.cluster
+
+class Qcow2Source(ClusterSource):
+    def __init__(self, path: str, raw):
+        hdr = bytearray(112)
+        raw.seek(0)
+        raw.readinto(hdr)
+        (magic, version, backing, _, bits, size, crypt, l1_size, l1_offset) = struct.unpack_from(">4sIQIIQIIQ", hdr)
+        if magic != QCOW2_MAGIC or version not in (2, 3):
+            raise ValueError("Not a qcow2 image.")
+        if backing:
+            raise ValueError("qcow2 images with a backing file are not supported.")
+        if crypt:
+            raise ValueError("Encrypted qcow2 images are not supported.")
+        self.compression = 0
+        if version >= 3:
+            incompatible = struct.unpack_from(">Q", hdr, 72)[0]
+            if incompatible & ~QCOW2_KNOWN_INCOMPATIBLE:
+                raise ValueError(f"Unsupported qcow2 features (0x{incompatible:x}).")
+            if struct.unpack_from(">I", hdr, 100)[0] > 104:
+                self.compression = hdr[104]
+        super().__init__(path, raw, size, 1 << bits, "qcow2")
+        self.bits = bits
+        count = -(-size // self.cluster)
+        self.entries = array("Q", bytes(8 * count))
+        per_l2 = self.cluster // 8
+        l1 = struct.unpack(f">{l1_size}Q", self._read(l1_offset, 8 * l1_size))
+        for a, e in enumerate(l1):
+            l2_offset = e & QCOW2_OFFSET_MASK
+            first = a * per_l2
+            if not l2_offset or first >= count:
+                continue
+            n = min(per_l2, count - first)
+            for j, x in enumerate(struct.unpack(f">{n}Q", self._read(l2_offset, 8 * n))):
+                x &= ~(1 << 63)
+                if x & QCOW2_COMPRESSED or (x & QCOW2_OFFSET_MASK and not x & QCOW2_ZERO):
+                    self.entries[first + j] = x
+                    self.allocated.append(first + j)
+
+    def _host(self, i: int) -> int:
+        e = self.entries[i] if i < len(self.entries) else 0
+        if not e:
+            return HOLE
+        return SPECIAL if e & QCOW2_COMPRESSED else e & QCOW2_OFFSET_MASK
+
+    def _load(self, i: int, out: memoryview):
+        e = self.entries[i] & (QCOW2_COMPRESSED - 1)
+        x = 62 - (self.bits - 8)
+        host = e & ((1 << x) - 1)
+        length = ((e >> x) + 1) * SECTOR - (host & (SECTOR - 1))
+        data = self._read(host, length)
+        if self.compression == 0:
+            plain = zlib.decompressobj(-12).decompress(data, self.cluster)
+        elif self.compression == 1:
+            import zstandard
+            plain = zstandard.ZstdDecompressor().decompressobj().decompress(data)[:self.cluster]
+        else:
+            raise ValueError(f"Unknown qcow2 compression type {self.compression}.")
+        if len(plain) != self.cluster:
+            raise ValueError(f"Corrupt compressed qcow2 cluster {i}.")
+        out[:] = plain
+
+class VhdSource(ClusterSource):
+    def __init__(self, path: str, raw, footer: bytes):
+        size = struct.unpack_from(">Q", footer, 48)[0]
+        disk_type = struct.unpack_from(">I", footer, 60)[0]
+        self.disk_type = disk_type
+        if disk_type == VHD_FIXED:
+            super().__init__(path, raw, size, 2 * 1024 * 1024, "vhd")
+            self.bat = None
+            self.sparse = False
+            self.region = (0, size)
+            self.allocated.extend(range(-(-size // self.cluster)))
+            return
+        if disk_type == VHD_DIFFERENCING:
+            raise ValueError("Differencing VHD images are not supported.")
+        if disk_type != VHD_DYNAMIC:
+            raise ValueError(f"Unknown VHD disk type {disk_type}.")
+        header_offset = struct.unpack_from(">Q", footer, 16)[0]
+        hdr = bytearray(1024)
+        raw.seek(header_offset)
+        raw.readinto(hdr)
+        if not hdr.startswith(VHD_SPARSE_COOKIE):
+            raise ValueError("VHD dynamic disk header is missing.")
+        table_offset = struct.unpack_from(">Q", hdr, 16)[0]
+        entries, block = struct.unpack_from(">II", hdr, 28)
+        super().__init__(path, raw, size, block, "vhd")
+        self.bitmap_size = -(-block // SECTOR // 8 // SECTOR) * SECTOR
+        self.bat = array("q", [HOLE]) * entries
+        self.partial = set()
+        full = b"\xff" * (block // SECTOR // 8)
+        for i, sector in enumerate(struct.unpack(f">{entries}I", self._read(table_offset, 4 * entries))):
+            if sector == VHD_UNALLOCATED:
+                continue
+            start = sector * SECTOR
+            bitmap = self._read(start, len(full))
+            if not any(bitmap):
+                continue
+            self.bat[i] = start + self.bitmap_size
+            if bitmap != full:
+                self.partial.add(i)
+            self.allocated.append(i)
+
+    def _host(self, i: int) -> int:
+        if self.bat is None:
+            return i * self.cluster
+        if i >= len(self.bat) or self.bat[i] == HOLE:
+            return HOLE
+        return SPECIAL if i in self.partial else self.bat[i]
+
+    def _load(self, i: int, out: memoryview):
+        host = self.bat[i]
+        bitmap = self._read(host - self.bitmap_size, self.cluster // SECTOR // 8)
+        if self._pread(host, out) != len(out):
+            raise ValueError(f"VHD image is truncated at block {i}.")
+        for s in range(self.cluster // SECTOR):
+            if not bitmap[s >> 3] & (0x80 >> (s & 7)):
+                out[s * SECTOR:(s + 1) * SECTOR] = self._zeros[:SECTOR]
+
+class VmdkSource(ClusterSource):
+    def __init__(self, path: str, raw, file_size: int):
+        hdr = bytearray(SECTOR)
+        raw.seek(0)
+        raw.readinto(hdr)
+        gd = struct.unpack_from("<Q", hdr, 56)[0]
+        if gd == VMDK_GD_AT_END:
+            raw.seek(file_size - 2 * SECTOR)
+            raw.readinto(hdr)
+        (magic, _, flags, capacity, grain, _, _, per_gt, _, gd) = struct.unpack_from("<4sIIQQQQIQQ", hdr)
+        if magic != VMDK_MAGIC or not grain or not per_gt:
+            raise ValueError("Only monolithic sparse VMDK images are supported.")
+        super().__init__(path, raw, capacity * SECTOR, grain * SECTOR, "vmdk")
+        self.compressed = bool(flags & VMDK_COMPRESSED)
+        count = -(-capacity // grain)
+        self.grains = array("Q", bytes(8 * count))
+        tables = -(-count // per_gt)
+        for t, gt in enumerate(struct.unpack(f"<{tables}I", self._read(gd * SECTOR, 4 * tables))):
+            first = t * per_gt
+            if not gt:
+                continue
+            n = min(per_gt, count - first)
+            for j, sector in enumerate(struct.unpack(f"<{n}I", self._read(gt * SECTOR, 4 * n))):
+                if sector > 1 or (sector == 1 and not flags & VMDK_ZEROED_GTE):
+                    self.grains[first + j] = sector
+                    self.allocated.append(first + j)
+
+    def _host(self, i: int) -> int:
+        sector = self.grains[i] if i < len(self.grains) else 0
+        if not sector:
+            return HOLE
+        return SPECIAL if self.compressed else sector * SECTOR
+
+    def _load(self, i: int, out: memoryview):
+        host = self.grains[i] * SECTOR
+        lba, size = struct.unpack("<QI", self._read(host, 12))
+        plain = zlib.decompress(self._read(host + 12, size))
+        if len(plain) > self.cluster:
+            raise ValueError(f"Corrupt compressed VMDK grain {i}.")
+        out[:len(plain)] = plain
+        out[len(plain):] = self._zeros[len(plain):]
+
+def vhd_footer(raw, file_size: int) -> Optional[bytes]:
+    if file_size < SECTOR:
+        return None
+    footer = bytearray(SECTOR)
+    raw.seek(file_size - SECTOR)
+    raw.readinto(footer)
+    return bytes(footer) if footer.startswith(VHD_COOKIE) else None
+
+def open_vdisk(path: str, raw, kind: str) -> ClusterSource:
+    size = raw.seek(0, os.SEEK_END)
+    if kind == "qcow2":
+        src: ClusterSource = Qcow2Source(path, raw)
+    elif kind == "vmdk":
+        src = VmdkSource(path, raw, size)
+    else:
+        footer = vhd_footer(raw, size)
+        if footer is None:
+            raise ValueError("VHD footer is missing.")
+        src = VhdSource(path, raw, footer)
+    raw.seek(0)
+    return src
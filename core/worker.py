@@ -0,0 +1,326 @@
+import os
+import sys
+import json
+import math
+import time
+import struct
+import threading
+import subprocess
+from dataclasses import asdict
+from typing import Optional, Callable, Dict, List, Tuple, Union
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if __name__ == "__main__":
+    sys.path[0] = ROOT
+
+from multiprocessing import shared_memory
+
+from core.checksum import Checksum
+
+PUBLISH_INTERVAL = 0.1
+READ_RETRIES = 100
+STATES = ("pending", "writing", "verifying", "done", "failed", "canceled")
+COUNTERS = ("done", "est", "durable", "verify_total")
+STATS = ("written", "skipped", "resumed", "identical", "identical_chunks", "verified", "discarded", "zero_filled")
+PHASES = ("write", "verify", "sync")
+HEADER = struct.Struct("<QIIqq")
+SLOT = struct.Struct(f"<B7x{len(COUNTERS) + len(STATS)}q{2 * len(PHASES)}d")
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+class ProgressBlock:
+    def __init__(self, shm: shared_memory.SharedMemory, count: int, owner: bool = False):
+        self.shm = shm
+        self.count = count
+        self.owner = owner
+        self._seq = 0
+        self._last: Tuple[Dict[str, int], List[tuple]] = ({}, [])
+
+    @classmethod
+    def create(cls, count: int) -> "ProgressBlock":
+        return cls(shared_memory.SharedMemory(create=True, size=HEADER.size + count * SLOT.size), count, True)
+
+    @classmethod
+    def attach(cls, name: str, count: int) -> "ProgressBlock":
+        return cls(_attach(name), count)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def publish(self, writer):
+        buf = self.shm.buf
+        src = writer._src_stats
+        self._seq += 1
+        struct.pack_into("<Q", buf, 0, self._seq)
+        for i, r in enumerate(writer.runs[:self.count]):
+            counters = [-1 if getattr(r, k) is None else int(getattr(r, k)) for k in COUNTERS]
+            times = []
+            for phase in PHASES:
+                t = r.times.get(phase) or [None, None]
+                times += [math.nan if v is None else v for v in t]
+            SLOT.pack_into(buf, HEADER.size + i * SLOT.size, STATES.index(r.state), *counters,
+                           *(int(r.stats[k]) for k in STATS), *times)
+        self._seq += 1
+        HEADER.pack_into(buf, 0, self._seq, len(writer.runs), int(writer.paused), src["read"], src["bmap_checked"])
+
+    def read(self) -> Tuple[Dict[str, int], List[tuple]]:
+        buf = self.shm.buf
+        for _ in range(READ_RETRIES):
+            seq, count, paused, read, checked = HEADER.unpack_from(buf, 0)
+            slots = [SLOT.unpack_from(buf, HEADER.size + i * SLOT.size) for i in range(min(count, self.count))]
+            if not seq % 2 and struct.unpack_from("<Q", buf, 0)[0] == seq:
+                self._last = {"seq": seq, "paused": paused, "read": read, "bmap_checked": checked}, slots
+                break
+            time.sleep(0)
+        return self._last
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except Exception:
+                pass
+
+class _RunView:
+    def __init__(self, path: str):
+        self.path = path
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self.done = 0
+        self.est = 0
+        self.durable: Optional[int] = None
+        self.verify_total = 0
+        self.stats: Dict[str, int] = {k: 0 for k in STATS}
+        self.stats["discarded"] = False
+        self.times: Dict[str, List[Optional[float]]] = {}
+
+    def load(self, slot: tuple):
+        self.state = STATES[slot[0]]
+        values = slot[1:]
+        for k, v in zip(COUNTERS, values):
+            setattr(self, k, None if v < 0 and k == "durable" else v)
+        values = values[len(COUNTERS):]
+        for k, v in zip(STATS, values):
+            self.stats[k] = bool(v) if k == "discarded" else v
+        values = values[len(STATS):]
+        for i, phase in enumerate(PHASES):
+            start, end = values[2 * i:2 * i + 2]
+            if not math.isnan(start):
+                self.times[phase] = [start, None if math.isnan(end) else end]
+
+    def counters(self, phase: str) -> Tuple[int, int]:
+        if phase == "verify":
+            return self.stats["verified"], self.verify_total
+        done = self.done if self.durable is None else self.durable
+        return done, self.est or self.done
+
+class ProcessWriter:
+    def __init__(self, launcher: Optional[List[str]] = None, **options):
+        self.launcher = list(launcher or [])
+        self.options = options
+        self.verify = bool(options.get("verify"))
+        self.proc: Optional[subprocess.Popen] = None
+        self.source_check: Optional[str] = None
+        self.copy_method: Optional[str] = None
+        self._views: List[_RunView] = []
+        self._block: Optional[ProgressBlock] = None
+        self._header: Dict[str, int] = {}
+        self._summary: Optional[Dict[str, object]] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.on_error: Optional[Callable[[str], None]] = None
+        self.on_finished: Optional[Callable[[], None]] = None
+        self.on_canceled: Optional[Callable[[], None]] = None
+        self.on_device_error: Optional[Callable[[str, str], None]] = None
+        self.on_device_finished: Optional[Callable[[str], None]] = None
+        self.on_device_tuning: Optional[Callable[[str, Dict[str, float]], None]] = None
+
+    def _refresh(self, final: bool = False):
+        with self._lock:
+            if self._block is None or not (final or self.proc is None or self.proc.poll() is None):
+                return
+            self._header, slots = self._block.read()
+        for view, slot in zip(self._views, slots):
+            view.load(slot)
+
+    @property
+    def runs(self) -> List[_RunView]:
+        self._refresh()
+        return self._views
+
+    @property
+    def paused(self) -> bool:
+        self._refresh()
+        return bool(self._header.get("paused"))
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        if self._summary:
+            return dict(self._summary["stats"])
+        out: Dict[str, int] = {k: 0 for k in STATS}
+        out["discarded"] = False
+        for r in self.runs:
+            for k, v in r.stats.items():
+                out[k] = (out[k] or v) if k == "discarded" else out[k] + v
+        out["read"] = self._header.get("read", 0)
+        out["bmap_checked"] = self._header.get("bmap_checked", 0)
+        return out
+
+    @property
+    def results(self) -> Dict[str, Optional[str]]:
+        if self._summary:
+            return dict(self._summary["results"])
+        return {r.path: r.error or ("Canceled." if r.state == "canceled" else None) for r in self.runs}
+
+    def start(self, image_path: str, device_path: Union[str, List[str]], bmap_path: Optional[str] = None,
+              checksum: Optional[Checksum] = None):
+        paths = [device_path] if isinstance(device_path, str) else list(device_path)
+        self._views = [_RunView(p) for p in paths]
+        self._summary = None
+        self._block = ProgressBlock.create(len(paths))
+        argv = self.launcher + [sys.executable, os.path.join(ROOT, "core", "worker.py")]
+        self.proc = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+        self._send({"shm": self._block.name, "options": self.options, "image": image_path, "devices": paths,
+                    "bmap": bmap_path, "checksum": asdict(checksum) if checksum else None, "cwd": os.getcwd()})
+        self._thread = threading.Thread(target=self._listen, daemon=True)
+        self._thread.start()
+
+    def _send(self, msg):
+        try:
+            self.proc.stdin.write(json.dumps(msg) + "\n")
+            self.proc.stdin.flush()
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def cancel(self, device_path: Optional[str] = None):
+        self._send({"cmd": "cancel", "device": device_path})
+
+    def pause(self):
+        self._send({"cmd": "pause"})
+
+    def unpause(self):
+        self._send({"cmd": "unpause"})
+
+    def _emit(self, cb, *args):
+        try:
+            if cb:
+                cb(*args)
+        except Exception:
+            pass
+
+    def _listen(self):
+        ended = False
+        try:
+            for line in self.proc.stdout:
+                try:
+                    kind, *args = json.loads(line)
+                except ValueError:
+                    continue
+                if kind == "device_error":
+                    view = next((v for v in self._views if v.path == args[0]), None)
+                    if view:
+                        view.error = args[1]
+                    self._emit(self.on_device_error, *args)
+                elif kind == "device_finished":
+                    self._emit(self.on_device_finished, *args)
+                elif kind == "tuning":
+                    self._emit(self.on_device_tuning, *args)
+                elif kind in ("finished", "error", "canceled"):
+                    summary = args[-1]
+                    self._refresh(final=True)
+                    self._summary = summary
+                    self.source_check = summary.get("source_check")
+                    self.copy_method = summary.get("copy_method")
+                    ended = True
+                    if kind == "error":
+                        self._emit(self.on_error, args[0])
+                    elif kind == "canceled":
+                        self._emit(self.on_canceled)
+                    else:
+                        self._emit(self.on_finished)
+        finally:
+            code = self.proc.wait()
+            try:
+                self.proc.stdin.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._block.close()
+                self._block = None
+            if not ended:
+                msg = f"Write engine exited unexpectedly (status {code})."
+                for v in self._views:
+                    if v.state not in ("done", "canceled"):
+                        v.state = "failed"
+                        v.error = v.error or msg
+                self._emit(self.on_error, msg)
+
+def serve(stdin=None, stdout=None):
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    msg = json.loads(stdin.readline())
+    os.chdir(msg.get("cwd") or os.getcwd())
+    from core.imaging import ImageWriter
+    block = ProgressBlock.attach(msg["shm"], len(msg["devices"]))
+    w = ImageWriter(**msg["options"])
+    lock = threading.Lock()
+    outcome: List[list] = []
+
+    def send(*event):
+        with lock:
+            stdout.write(json.dumps(list(event)) + "\n")
+            stdout.flush()
+
+    def summary():
+        return {"stats": w.stats, "results": w.results, "source_check": w.source_check,
+                "copy_method": getattr(w, "copy_method", None)}
+
+    w.on_device_error = lambda path, m: send("device_error", path, m)
+    w.on_device_finished = lambda path: send("device_finished", path)
+    w.on_device_tuning = lambda path, entry: send("tuning", path, entry)
+    w.on_error = lambda m: outcome.append(["error", m])
+    w.on_finished = lambda: outcome.append(["finished"])
+    w.on_canceled = lambda: outcome.append(["canceled"])
+
+    def commands():
+        for line in stdin:
+            try:
+                cmd = json.loads(line)
+            except ValueError:
+                continue
+            if cmd.get("cmd") == "cancel":
+                w.cancel(cmd.get("device"))
+            elif cmd.get("cmd") == "pause":
+                w.pause()
+            elif cmd.get("cmd") == "unpause":
+                w.unpause()
+        w.cancel()
+
+    checksum = Checksum(**msg["checksum"]) if msg.get("checksum") else None
+    w.start(msg["image"], msg["devices"] if len(msg["devices"]) > 1 else msg["devices"][0], msg.get("bmap"), checksum)
+    threading.Thread(target=commands, daemon=True).start()
+    try:
+        while w._thread.is_alive():
+            block.publish(w)
+            w._thread.join(PUBLISH_INTERVAL)
+        block.publish(w)
+        event = outcome[0] if outcome else ["error", "Write engine stopped without a result."]
+        send(*event, summary())
+    finally:
+        block.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(serve())
@@ -0,0 +1,99 @@
+import os
+import mmap
+import errno
+from typing import Optional, Callable, List
+
+ZERO_COPY_CHUNK = 8 * 1024 * 1024
+PIPE_SIZE = 1024 * 1024
+F_SETPIPE_SZ = 1031
+METHODS = ("copy_file_range", "sendfile", "splice")
+REFUSED = {errno.EINVAL, errno.ENOSYS, errno.EXDEV, errno.EOPNOTSUPP, errno.EBADF, errno.ESPIPE,
+           errno.ENOTSOCK, getattr(errno, "ENOTSUP", errno.EOPNOTSUPP)}
+
+def available_methods() -> List[str]:
+    return [m for m in METHODS if hasattr(os, m)]
+
+class KernelCopy:
+    def __init__(self, in_fd: int, out_fd: int, write: Callable[[memoryview, int], int],
+                 methods: Optional[List[str]] = None, chunk: int = ZERO_COPY_CHUNK):
+        self.in_fd = in_fd
+        self.out_fd = out_fd
+        self.write = write
+        self.chunk = chunk
+        self.methods = [m for m in (methods or METHODS) if m in available_methods()]
+        self.method: Optional[str] = None
+        self._pipe = None
+        self._buf: Optional[mmap.mmap] = None
+
+    def _copy_file_range(self, src: int, dst: int, n: int) -> int:
+        return os.copy_file_range(self.in_fd, self.out_fd, n, src, dst)
+
+    def _sendfile(self, src: int, dst: int, n: int) -> int:
+        os.lseek(self.out_fd, dst, os.SEEK_SET)
+        return os.sendfile(self.out_fd, self.in_fd, src, n)
+
+    def _splice(self, src: int, dst: int, n: int) -> int:
+        if self._pipe is None:
+            self._pipe = os.pipe()
+            try:
+                import fcntl
+                fcntl.fcntl(self._pipe[1], F_SETPIPE_SZ, PIPE_SIZE)
+            except Exception:
+                pass
+        r, w = self._pipe
+        done = 0
+        try:
+            while done < n:
+                got = os.splice(self.in_fd, w, n - done, offset_src=src + done)
+                if not got:
+                    break
+                left = got
+                while left:
+                    left -= os.splice(r, self.out_fd, left, offset_dst=dst + done + got - left)
+                done += got
+        except OSError:
+            self._close_pipe()
+            if done:
+                return done
+            raise
+        return done
+
+    def _user(self, src: int, dst: int, n: int) -> int:
+        if self._buf is None:
+            self._buf = mmap.mmap(-1, self.chunk)
+        mv = memoryview(self._buf)[:min(n, self.chunk)]
+        try:
+            got = os.preadv(self.in_fd, [mv], src)
+            return self.write(mv[:got], dst) if got else 0
+        finally:
+            mv.release()
+
+    def copy(self, src: int, dst: int, n: int) -> Optional[int]:
+        while self.methods:
+            m = self.methods[0]
+            try:
+                got = getattr(self, "_" + m)(src, dst, n)
+            except OSError as e:
+                if e.errno not in REFUSED and self.method is not None:
+                    raise
+                got = 0
+            if got:
+                self.method = m
+                return got
+            self.methods.pop(0)
+        if self.method is None:
+            return None
+        self.method = "read"
+        return self._user(src, dst, n)
+
+    def _close_pipe(self):
+        if self._pipe is not None:
+            for fd in self._pipe:
+                os.close(fd)
+            self._pipe = None
+
+    def close(self):
+        self._close_pipe()
+        if self._buf is not None:
+            self._buf.close()
+            self._buf = None
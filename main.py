@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 import sys
 import os
-from PySide6 import QtCore, QtGui, QtWidgets
-from ui.main_window import MainWindow
-def main():
+
+CLI_COMMANDS = ("list", "write", "verify", "queue", "-h", "--help")
+
+def run_gui():
+    from PySide6 import QtCore, QtGui, QtWidgets
+    from ui.main_window import MainWindow
     QtWidgets.QApplication.setAttribute(QtCore.Qt.AA_EnableHighDpiScaling)
     app = QtWidgets.QApplication(sys.argv)
     icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "icon.png")
@@ -12,5 +15,12 @@ def main():
     w = MainWindow()
     w.show()
     sys.exit(app.exec())
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] in CLI_COMMANDS:
+        from core.cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+    run_gui()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,124 @@
+import os
+import re
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+import core.http_source as http_source
+from core.http_source import HttpReader
+from core.imaging import ImageWriter
+
+SEGMENT = 64 * 1024
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    data = b""
+    ranges = True
+    drop_at = None
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        size = len(self.data)
+        m = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+        if m and self.ranges:
+            a, b = int(m.group(1)), min(int(m.group(2) or size - 1), size - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {a}-{b}/{size}")
+        else:
+            a, b = 0, size - 1
+            self.send_response(200)
+        self.requests.append((a, b))
+        self.send_header("Content-Length", str(b - a + 1))
+        self.end_headers()
+        body = self.data[a:b + 1]
+        drop = type(self).drop_at
+        if drop is not None and a <= drop < b:
+            type(self).drop_at = None
+            self.wfile.write(body[:drop - a])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(http_source, "RETRY_BACKOFF", 0.01)
+    data = os.urandom(10 * SEGMENT + 1234)
+    handler = type("Handler", (_Handler,), {"data": data, "requests": []})
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}/disk.img", handler
+    srv.shutdown()
+    srv.server_close()
+
+def read_all(r) -> bytes:
+    out = bytearray()
+    buf = bytearray(50000)
+    while True:
+        n = r.readinto(buf)
+        if not n:
+            return bytes(out)
+        out += buf[:n]
+
+def test_ranged_read(server):
+    url, handler = server
+    r = HttpReader(url, connections=3, segment=SEGMENT)
+    try:
+        assert r.ranged and r.seekable() and r.length == len(handler.data)
+        assert read_all(r) == handler.data
+    finally:
+        r.close()
+    assert all(a % SEGMENT == 0 for a, _ in handler.requests)
+
+def test_dropped_range_resumes_where_it_stopped(server):
+    url, handler = server
+    drop = 4 * SEGMENT + 1000
+    handler.drop_at = drop
+    r = HttpReader(url, connections=2, segment=SEGMENT)
+    try:
+        assert read_all(r) == handler.data
+        assert r.retried == 1
+    finally:
+        r.close()
+    assert (drop, 5 * SEGMENT - 1) in handler.requests
+
+def test_seek_refetches_segment(server):
+    url, handler = server
+    r = HttpReader(url, connections=2, segment=SEGMENT)
+    try:
+        read_all(r)
+        r.seek(3 * SEGMENT + 7)
+        buf = bytearray(100)
+        assert r.readinto(buf) == 100
+        assert bytes(buf) == handler.data[3 * SEGMENT + 7:3 * SEGMENT + 107]
+    finally:
+        r.close()
+
+def test_server_without_ranges_streams(server):
+    url, handler = server
+    handler.ranges = False
+    r = HttpReader(url, connections=3, segment=SEGMENT)
+    try:
+        assert not r.ranged and not r.seekable()
+        assert read_all(r) == handler.data
+    finally:
+        r.close()
+    assert len(handler.requests) == 1
+
+def test_write_from_url_survives_drop(server, tmp_path):
+    url, handler = server
+    handler.drop_at = 7 * SEGMENT + 10
+    target = tmp_path / "out.img"
+    target.write_bytes(b"")
+    w = ImageWriter(chunk_size=SEGMENT, adaptive=False)
+    errors = []
+    w.on_error = errors.append
+    w.start(url, str(target))
+    w._thread.join()
+    assert errors == [] and w.results == {str(target): None}
+    assert target.read_bytes() == handler.data
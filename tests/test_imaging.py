@@ -0,0 +1,293 @@
+import os
+import errno
+import threading
+
+import pytest
+
+import core.imaging as imaging
+from core.imaging import ImageWriter
+
+CHUNK = 1024 * 1024
+
+def run(w, image, target):
+    errors = []
+    w.on_error = errors.append
+    w.start(str(image), str(target))
+    w._thread.join()
+    return errors
+
+@pytest.fixture
+def sparse_image(tmp_path):
+    data = bytearray(os.urandom(16 * CHUNK))
+    for i in (2, 3, 7, 11, 12, 15):
+        data[i * CHUNK:(i + 1) * CHUNK] = bytes(CHUNK)
+    path = tmp_path / "sparse.img"
+    path.write_bytes(data)
+    return path, bytes(data)
+
+@pytest.mark.parametrize("options", [{}, {"verify": True}, {"discard": True, "verify": True},
+                                     {"io_depth": 4, "verify": True}])
+def test_sparse_overwrites_stale_data(sparse_image, tmp_path, options):
+    image, data = sparse_image
+    target = tmp_path / "out.img"
+    target.write_bytes(os.urandom(len(data)))
+    w = ImageWriter(sparse=True, chunk_size=CHUNK, adaptive=False, **options)
+    assert run(w, image, target) == []
+    assert w.results == {str(target): None}
+    assert w.stats["skipped"] == 6 * CHUNK
+    assert target.read_bytes() == data
+    if options.get("verify"):
+        assert w.stats["verified"] == len(data)
+
+def test_sparse_falls_back_to_writing_zeros(sparse_image, tmp_path, monkeypatch):
+    image, data = sparse_image
+    monkeypatch.setattr(imaging, "_punch_hole", lambda *a: False)
+    target = tmp_path / "out.img"
+    target.write_bytes(os.urandom(len(data)))
+    w = ImageWriter(sparse=True, chunk_size=CHUNK, adaptive=False, direct=False)
+    assert run(w, image, target) == []
+    assert w.stats["zero_filled"] == 6 * CHUNK
+    assert target.read_bytes() == data
+
+def test_sparse_verify_checks_skipped_ranges(sparse_image, tmp_path, monkeypatch):
+    image, data = sparse_image
+    monkeypatch.setattr(imaging._Target, "zero", lambda *a: None)
+    target = tmp_path / "out.img"
+    target.write_bytes(b"\1" * len(data))
+    w = ImageWriter(sparse=True, chunk_size=CHUNK, adaptive=False, verify=True)
+    run(w, image, target)
+    assert w.results[str(target)].endswith("differs from the image at offset 2097152.")
+
+def test_sparse_delta_compares_zero_chunks(sparse_image, tmp_path):
+    image, data = sparse_image
+    target = tmp_path / "out.img"
+    stale = bytearray(data)
+    stale[7 * CHUNK:7 * CHUNK + 10] = b"x" * 10
+    target.write_bytes(stale)
+    w = ImageWriter(sparse=True, delta=True, chunk_size=CHUNK, adaptive=False)
+    assert run(w, image, target) == []
+    assert w.stats["written"] == CHUNK
+    assert target.read_bytes() == data
+
+@pytest.mark.parametrize("options", [{}, {"direct": True}])
+def test_sparse_finds_zero_runs_inside_chunks(tmp_path, options):
+    block = imaging.SPARSE_BLOCK
+    data = bytearray(os.urandom(40 * CHUNK))
+    data[5 * CHUNK + block:11 * CHUNK + block] = bytes(6 * CHUNK)
+    data[-block:] = bytes(block)
+    image = tmp_path / "disk.img"
+    image.write_bytes(data)
+    target = tmp_path / "out.img"
+    target.write_bytes(os.urandom(len(data)))
+    w = ImageWriter(sparse=True, verify=True, **options)
+    assert run(w, image, target) == []
+    assert w.stats["skipped"] == 6 * CHUNK + block
+    assert w.stats["zero_filled"] == 0
+    assert target.read_bytes() == bytes(data)
+
+def test_verify_narrows_mismatch_inside_chunk(image, tmp_path, monkeypatch):
+    path, data = image
+    bad = 3 * CHUNK + 5 * imaging.VERIFY_BLOCK + 123
+    real = imaging._Target.sync
+
+    def corrupting(self):
+        real(self)
+        os.pwrite(self.f.fileno(), bytes([data[bad] ^ 1]), bad)
+
+    monkeypatch.setattr(imaging._Target, "sync", corrupting)
+    target = tmp_path / "out.img"
+    target.write_bytes(b"")
+    w = ImageWriter(chunk_size=8 * CHUNK, adaptive=False, zero_copy=False, verify=True)
+    run(w, path, target)
+    assert w.results[str(target)].endswith(
+        f"in the {imaging.VERIFY_BLOCK}-byte block at offset {bad - bad % imaging.VERIFY_BLOCK}.")
+
+def test_compare_reports_first_differing_byte(image, tmp_path):
+    path, data = image
+    bad = 5 * CHUNK + 4321
+    target = tmp_path / "out.img"
+    target.write_bytes(data[:bad] + bytes([data[bad] ^ 1]) + data[bad + 1:])
+    w = ImageWriter(chunk_size=8 * CHUNK, adaptive=False, compare_only=True)
+    run(w, path, target)
+    assert w.results[str(target)] == f"Device differs from the image at offset {bad}."
+
+def test_lag_timeout_counts_one_continuous_stall():
+    pool = imaging.BufferPool(2, 4096)
+    runs = [imaging._DeviceRun("/dev/fast"), imaging._DeviceRun("/dev/slow")]
+    runs[1].inbox.put("backlog")
+    stop = threading.Event()
+    fanout = imaging._Fanout(pool, runs, stop, lag_timeout=0.5)
+    assert fanout.acquire(stop) is not None
+    for _ in range(4):
+        mv = fanout.acquire(stop)
+        threading.Timer(0.3, fanout.release, (mv,)).start()
+    assert runs[1].attached and runs[1].error is None
+    mv = fanout.acquire(stop)
+    threading.Timer(1.0, fanout.release, (mv,)).start()
+    assert fanout.acquire(stop) is not None
+    assert not runs[1].attached and "held back" in runs[1].error
+    assert runs[0].attached
+
+@pytest.fixture
+def small_segments(monkeypatch):
+    import core.journal as journal
+    monkeypatch.setattr(journal, "SEGMENT", CHUNK)
+
+@pytest.fixture
+def image(tmp_path):
+    data = os.urandom(12 * CHUNK + 4321)
+    path = tmp_path / "disk.img"
+    path.write_bytes(data)
+    return path, data
+
+def interrupted_write(monkeypatch, image, target, at, **options):
+    real = imaging._Target.write
+
+    def failing(self, mv, offset):
+        if offset >= at:
+            raise OSError("device went away")
+        return real(self, mv, offset)
+
+    with monkeypatch.context() as m:
+        m.setattr(imaging._Target, "write", failing)
+        w = ImageWriter(chunk_size=CHUNK, adaptive=False, writeback=CHUNK, zero_copy=False, **options)
+        run(w, image, target)
+    assert "device went away" in w.results[str(target)]
+    return w
+
+def test_resume_continues_after_checkpoint(small_segments, image, tmp_path, monkeypatch):
+    path, data = image
+    target = tmp_path / "out.img"
+    target.write_bytes(b"")
+    interrupted_write(monkeypatch, path, target, 6 * CHUNK)
+    w = ImageWriter(chunk_size=CHUNK, adaptive=False, zero_copy=False, resume=True, verify=True)
+    assert run(w, path, target) == []
+    assert 0 < w.stats["resumed"] <= 6 * CHUNK
+    assert w.stats["resumed"] + w.stats["written"] == len(data)
+    assert target.read_bytes() == data
+
+def test_resume_starts_over_when_device_changed(small_segments, image, tmp_path, monkeypatch):
+    path, data = image
+    target = tmp_path / "out.img"
+    target.write_bytes(b"")
+    interrupted_write(monkeypatch, path, target, 6 * CHUNK)
+    with open(target, "r+b") as f:
+        f.write(os.urandom(6 * CHUNK))
+    w = ImageWriter(chunk_size=CHUNK, adaptive=False, zero_copy=False, resume=True)
+    assert run(w, path, target) == []
+    assert w.stats["resumed"] == 0
+    assert target.read_bytes() == data
+
+def test_finished_write_clears_journal(small_segments, image, tmp_path, monkeypatch):
+    path, data = image
+    target = tmp_path / "out.img"
+    target.write_bytes(b"")
+    interrupted_write(monkeypatch, path, target, 6 * CHUNK)
+    w = ImageWriter(chunk_size=CHUNK, adaptive=False, zero_copy=False, resume=True)
+    assert run(w, path, target) == []
+    w = ImageWriter(chunk_size=CHUNK, adaptive=False, zero_copy=False, resume=True)
+    assert run(w, path, target) == []
+    assert w.stats["resumed"] == 0
+
+def interrupted_copy(monkeypatch, image, target, calls):
+    import core.zerocopy as zerocopy
+    real = zerocopy.KernelCopy.copy
+    count = [0]
+
+    def failing(self, src, dst, n):
+        count[0] += 1
+        if count[0] > calls:
+            raise OSError(errno.EIO, "device went away")
+        return real(self, src, dst, n)
+
+    with monkeypatch.context() as m:
+        m.setattr(zerocopy.KernelCopy, "copy", failing)
+        w = ImageWriter(chunk_size=CHUNK, adaptive=False, writeback=CHUNK)
+        run(w, image, target)
+    assert w.copy_method is not None
+    assert "device went away" in w.results[str(target)]
+
+@pytest.mark.skipif(not hasattr(os, "copy_file_range") and not hasattr(os, "sendfile"),
+                    reason="no kernel copy on this platform")
+def test_zero_copy_round_trip(image, tmp_path):
+    path, data = image
+    target = tmp_path / "out.img"
+    target.write_bytes(b"x" * 100)
+    w = ImageWriter(chunk_size=CHUNK, adaptive=False, verify=True)
+    assert run(w, path, target) == []
+    assert w.copy_method is not None
+    assert w.stats["verified"] == len(data)
+    assert target.read_bytes() == data
+
+def test_zero_copy_refused_falls_back(image, tmp_path, monkeypatch):
+    import core.zerocopy as zerocopy
+    path, data = image
+    monkeypatch.setattr(zerocopy, "available_methods", lambda: [])
+    target = tmp_path / "out.img"
+    target.write_bytes(b"")
+    w = ImageWriter(chunk_size=CHUNK, adaptive=False)
+    assert run(w, path, target) == []
+    assert w.copy_method is None
+    assert target.read_bytes() == data
+
+def test_zero_copy_first_call_error_is_a_refusal(image, tmp_path, monkeypatch):
+    import core.zerocopy as zerocopy
+    path, data = image
+
+    def notsock(self, *a):
+        raise OSError(errno.ENOTSOCK, os.strerror(errno.ENOTSOCK))
+
+    for method in zerocopy.METHODS:
+        monkeypatch.setattr(zerocopy.KernelCopy, "_" + method, notsock)
+    target = tmp_path / "out.img"
+    target.write_bytes(b"")
+    w = ImageWriter(chunk_size=CHUNK, adaptive=False)
+    assert run(w, path, target) == []
+    assert w.results == {str(target): None}
+    assert target.read_bytes() == data
+
+@pytest.mark.skipif(not hasattr(os, "copy_file_range") and not hasattr(os, "sendfile"),
+                    reason="no kernel copy on this platform")
+@pytest.mark.parametrize("refuse", [False, True])
+def test_zero_copy_resume(small_segments, image, tmp_path, monkeypatch, refuse):
+    import core.zerocopy as zerocopy
+    path, data = image
+    target = tmp_path / "out.img"
+    target.write_bytes(b"")
+    interrupted_copy(monkeypatch, path, target, 6)
+    if refuse:
+        monkeypatch.setattr(zerocopy, "available_methods", lambda: [])
+    w = ImageWriter(chunk_size=CHUNK, adaptive=False, resume=True, verify=True)
+    assert run(w, path, target) == []
+    assert (w.copy_method is None) == refuse
+    assert w.stats["resumed"] > 0
+    assert w.stats["resumed"] + w.stats["written"] == len(data)
+    assert target.read_bytes() == data
+
+@pytest.mark.parametrize("options", [{"chunk_size": CHUNK, "adaptive": False, "io_depth": 4},
+                                     {"chunk_size": CHUNK, "adaptive": False, "tuned_depth": 4}, {}])
+def test_zero_copy_yields_to_the_plan(image, tmp_path, monkeypatch, options):
+    path, data = image
+    depth = options.pop("tuned_depth", None)
+    if depth:
+        real = imaging._plan_for
+        monkeypatch.setattr(imaging, "_plan_for", lambda *a: dict(real(*a), io_depth=depth))
+    target = tmp_path / "out.img"
+    target.write_bytes(b"")
+    w = ImageWriter(**options)
+    assert run(w, path, target) == []
+    assert w.copy_method is None
+    assert target.read_bytes() == data
+
+@pytest.mark.parametrize("options", [{"compare_only": True}, {"delta": True}])
+def test_compare_drops_cached_pages(image, tmp_path, monkeypatch, options):
+    path, data = image
+    target = tmp_path / "out.img"
+    target.write_bytes(data)
+    dropped = []
+    real = imaging._drop_cache
+    monkeypatch.setattr(imaging, "_drop_cache", lambda fd: (dropped.append(os.fstat(fd).st_ino), real(fd)))
+    w = ImageWriter(chunk_size=CHUNK, adaptive=False, zero_copy=False, **options)
+    assert run(w, path, target) == []
+    assert os.stat(target).st_ino in dropped
+    assert w.stats["identical"] == len(data)
@@ -0,0 +1,89 @@
+import sys
+
+import pytest
+
+from core.inventory import DeviceInventory, QueueEvents, parse_uevent
+from conftest import wait_for
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="sysfs inventory is Linux-only")
+
+def make_disk(root, base, sectors, removable=1):
+    d = root / "block" / base
+    (d / "queue").mkdir(parents=True, exist_ok=True)
+    (d / "size").write_text(f"{sectors}\n")
+    (d / "removable").write_text(f"{removable}\n")
+    (d / "queue" / "logical_block_size").write_text("512\n")
+    return d
+
+def uevent(action, base, devtype="disk"):
+    return {"ACTION": action, "DEVPATH": f"/devices/virtual/block/{base}", "DEVNAME": base,
+            "DEVTYPE": devtype, "SUBSYSTEM": "block"}
+
+class Recorder:
+    def __init__(self, inv):
+        self.events = []
+        inv.on_added = lambda d: self.events.append(("added", d.path, d.size))
+        inv.on_changed = lambda d: self.events.append(("changed", d.path, d.size))
+        inv.on_removed = lambda d: self.events.append(("removed", d.path, d.size))
+
+def paths(inv):
+    return sorted(d.path for d in inv.devices())
+
+def test_parse_uevent():
+    raw = b"add@/devices/pci0000:00/usb1/1-1/block/sdx\0ACTION=add\0SUBSYSTEM=block\0DEVNAME=sdx\0DEVTYPE=disk\0"
+    ev = parse_uevent(raw)
+    assert ev["ACTION"] == "add"
+    assert ev["DEVPATH"] == "/devices/pci0000:00/usb1/1-1/block/sdx"
+    assert ev["DEVNAME"] == "sdx" and ev["DEVTYPE"] == "disk"
+    assert parse_uevent(b"libudev\0whatever") == {}
+
+def test_add_change_remove(tmp_path):
+    make_disk(tmp_path, "sdx", 2048)
+    inv = DeviceInventory(events=QueueEvents(), sysfs_root=str(tmp_path))
+    rec = Recorder(inv)
+    inv.rescan()
+    assert paths(inv) == ["/dev/sdx"]
+    assert rec.events == [("added", "/dev/sdx", 2048 * 512)]
+
+    make_disk(tmp_path, "sdy", 4096)
+    inv.apply(uevent("add", "sdy"))
+    assert paths(inv) == ["/dev/sdx", "/dev/sdy"]
+
+    (tmp_path / "block" / "sdx" / "size").write_text("8192\n")
+    inv.apply(uevent("change", "sdx"))
+    assert inv.get("/dev/sdx").size == 8192 * 512
+
+    inv.apply(uevent("change", "sdy"))
+    inv.apply(uevent("remove", "sdy"))
+    assert paths(inv) == ["/dev/sdx"]
+    assert rec.events[1:] == [("added", "/dev/sdy", 4096 * 512), ("changed", "/dev/sdx", 8192 * 512),
+                              ("removed", "/dev/sdy", 4096 * 512)]
+
+def test_ignores_partitions_and_unknown_devices(tmp_path):
+    make_disk(tmp_path, "sdx", 2048)
+    inv = DeviceInventory(events=QueueEvents(), sysfs_root=str(tmp_path))
+    rec = Recorder(inv)
+    inv.rescan()
+    inv.apply(uevent("add", "sdx1", devtype="partition"))
+    inv.apply(uevent("add", "sdz"))
+    inv.apply(uevent("add", "loop0"))
+    inv.apply(uevent("remove", "sdz"))
+    assert paths(inv) == ["/dev/sdx"]
+    assert [e[0] for e in rec.events] == ["added"]
+
+def test_monitor_thread_applies_feed(tmp_path):
+    make_disk(tmp_path, "sdx", 2048)
+    feed = QueueEvents()
+    inv = DeviceInventory(events=feed, sysfs_root=str(tmp_path))
+    rec = Recorder(inv)
+    inv.start()
+    try:
+        assert wait_for(lambda: paths(inv) == ["/dev/sdx"])
+        make_disk(tmp_path, "sdy", 1024)
+        feed.push(uevent("add", "sdy"))
+        assert wait_for(lambda: "/dev/sdy" in paths(inv))
+        feed.push(uevent("remove", "sdx"))
+        assert wait_for(lambda: paths(inv) == ["/dev/sdy"])
+    finally:
+        inv.stop()
+    assert [e[:2] for e in rec.events] == [("added", "/dev/sdx"), ("added", "/dev/sdy"), ("removed", "/dev/sdx")]
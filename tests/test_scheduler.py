@@ -0,0 +1,155 @@
+import threading
+
+from core.device_manager import UsbPath
+from core.scheduler import JobScheduler, link_bps
+from conftest import wait_for
+
+TOPOLOGY = {
+    "/dev/sdb": UsbPath(controller="xhci0", bus="usb1", hub="1-1", port="1-1.1"),
+    "/dev/sdc": UsbPath(controller="xhci0", bus="usb1", hub="1-1", port="1-1.2"),
+    "/dev/sdd": UsbPath(controller="xhci0", bus="usb1", hub="1-1", port="1-1.3"),
+    "/dev/sde": UsbPath(controller="xhci1", bus="usb2", hub="usb2", port="2-1"),
+    "/dev/sdf": UsbPath(controller="xhci1", bus="usb2", hub="usb2", port="2-2"),
+}
+
+class FakeWriter:
+    def __init__(self, log, fail=False):
+        self.log = log
+        self.fail = fail
+        self.device = None
+        self.on_progress = self.on_finished = self.on_error = self.on_canceled = None
+
+    def start(self, image, device, bmap=None, checksum=None):
+        if self.fail:
+            raise OSError("cannot open target")
+        self.device = device
+        self.log.append(self)
+
+    def finish(self):
+        self.on_finished()
+
+    def cancel(self):
+        self.on_canceled()
+
+def scheduler(log, **kw):
+    kw.setdefault("interval", 0.01)
+    return JobScheduler(lambda: FakeWriter(log), topology=TOPOLOGY.get, **kw)
+
+def devices(log):
+    return [w.device for w in log]
+
+def test_per_hub_limit_and_release():
+    log = []
+    s = scheduler(log, per_hub=2, per_bus=0)
+    for dev in ("/dev/sdb", "/dev/sdc", "/dev/sdd"):
+        s.submit("a.img", dev)
+    s.start()
+    assert wait_for(lambda: len(log) == 2)
+    assert devices(log) == ["/dev/sdb", "/dev/sdc"]
+    assert [j.state for j in s.jobs] == ["running", "running", "queued"]
+    log[0].finish()
+    assert wait_for(lambda: len(log) == 3)
+    assert log[2].device == "/dev/sdd"
+    for w in log[1:]:
+        w.finish()
+    assert s.wait(5)
+    assert [j.state for j in s.jobs] == ["done"] * 3
+
+def test_idle_bus_is_preferred():
+    log = []
+    s = scheduler(log, per_hub=0, per_bus=1)
+    for dev in ("/dev/sdb", "/dev/sdc", "/dev/sde"):
+        s.submit("a.img", dev)
+    s.start()
+    assert wait_for(lambda: len(log) == 2)
+    assert devices(log) == ["/dev/sdb", "/dev/sde"]
+    log[0].finish()
+    assert wait_for(lambda: len(log) == 3)
+    for w in log[1:]:
+        w.finish()
+    assert s.wait(5)
+
+def test_least_loaded_controller_first():
+    log = []
+    s = scheduler(log, per_hub=0, per_bus=0, max_jobs=1)
+    for dev in ("/dev/sdb", "/dev/sdc", "/dev/sde"):
+        s.submit("a.img", dev)
+    s.start()
+    order = []
+    while len(order) < 3:
+        assert wait_for(lambda: len(log) == len(order) + 1)
+        order.append(log[-1].device)
+        log[-1].finish()
+    assert order == ["/dev/sdb", "/dev/sdc", "/dev/sde"]
+    assert s.wait(5)
+
+def test_bus_bandwidth_budget():
+    log = []
+    s = scheduler(log, per_hub=0, per_bus=0, bus_bps=50 * 1024 * 1024, job_bps=30 * 1024 * 1024)
+    for dev in ("/dev/sde", "/dev/sdf"):
+        s.submit("a.img", dev)
+    s.start()
+    assert wait_for(lambda: len(log) == 1)
+    assert not wait_for(lambda: len(log) == 2, timeout=0.2)
+    log[0].finish()
+    assert wait_for(lambda: len(log) == 2)
+    log[1].finish()
+    assert s.wait(5)
+    assert link_bps(480) == 480 * 125000 * 0.6
+
+def test_same_device_jobs_run_in_turn():
+    log = []
+    s = scheduler(log, per_hub=0, per_bus=0)
+    s.submit("a.img", "/dev/sde")
+    s.submit("b.img", "/dev/sde")
+    s.start()
+    assert wait_for(lambda: len(log) == 1)
+    assert not wait_for(lambda: len(log) == 2, timeout=0.2)
+    log[0].finish()
+    assert wait_for(lambda: len(log) == 2)
+    log[1].finish()
+    assert s.wait(5)
+
+def test_start_failure_does_not_hang():
+    def factory():
+        return FakeWriter([], fail=True)
+    s = JobScheduler(factory, topology=TOPOLOGY.get, interval=0.01)
+    s.submit("a.img", "/dev/sdb")
+    s.submit("b.img", "/dev/sde")
+    s.start()
+    assert s.wait(5)
+    assert [(j.state, j.error) for j in s.jobs] == [("failed", "Error: cannot open target")] * 2
+
+def test_factory_failure_does_not_hang():
+    def factory():
+        raise RuntimeError("no writer")
+    s = JobScheduler(factory, topology=TOPOLOGY.get, interval=0.01)
+    s.submit("a.img", "/dev/sdb")
+    s.start()
+    assert s.wait(5)
+    assert s.jobs[0].state == "failed"
+
+def test_cancel_all():
+    log = []
+    s = scheduler(log, per_hub=1, per_bus=0)
+    for dev in ("/dev/sdb", "/dev/sdc"):
+        s.submit("a.img", dev)
+    finished = threading.Event()
+    s.on_finished = finished.set
+    s.start()
+    assert wait_for(lambda: len(log) == 1)
+    s.cancel()
+    assert s.wait(5) and finished.is_set()
+    assert [j.state for j in s.jobs] == ["canceled", "canceled"]
+    assert len(log) == 1
+
+def test_unknown_topology_gets_its_own_bus():
+    log = []
+    s = scheduler(log, per_hub=1, per_bus=1)
+    s.submit("a.img", "/tmp/one.img")
+    s.submit("a.img", "/tmp/two.img")
+    s.start()
+    assert wait_for(lambda: len(log) == 2)
+    for w in log:
+        w.finish()
+    assert s.wait(5)
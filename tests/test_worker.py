@@ -0,0 +1,50 @@
+import sys
+import struct
+import threading
+import time
+
+from core.worker import ProgressBlock, ProcessWriter, ROOT
+
+CHILD = f"""
+import os, sys, json, signal, struct
+sys.path.insert(0, {ROOT!r})
+from core.worker import _attach
+msg = json.loads(sys.stdin.readline())
+shm = _attach(msg["shm"])
+struct.pack_into("<Q", shm.buf, 0, 1)
+sys.stdin.readline()
+os.kill(os.getpid(), signal.SIGKILL)
+"""
+
+class Source:
+    paused = False
+    _src_stats = {"read": 5, "bmap_checked": 0}
+    runs = []
+
+def test_torn_block_returns_last_snapshot():
+    block = ProgressBlock.create(1)
+    try:
+        block.publish(Source())
+        header, slots = block.read()
+        assert header["read"] == 5
+        struct.pack_into("<Q", block.shm.buf, 0, header["seq"] + 1)
+        t0 = time.monotonic()
+        assert block.read() == (header, slots)
+        assert time.monotonic() - t0 < 1
+    finally:
+        block.close()
+
+def test_engine_killed_mid_publish(tmp_path):
+    child = tmp_path / "child.py"
+    child.write_text(CHILD)
+    w = ProcessWriter(launcher=[sys.executable, str(child)])
+    failed = threading.Event()
+    errors = []
+    w.on_error = lambda m: (errors.append(m), failed.set())
+    w.start("disk.img", "/dev/null")
+    time.sleep(0.2)
+    assert w.runs[0].state == "pending"
+    w.cancel()
+    assert failed.wait(5)
+    assert "exited unexpectedly" in errors[0]
+    assert w.runs[0].state == "failed" and w.stats["written"] == 0
@@ -1,15 +1,25 @@
 import os
+import threading
 from typing import Optional, List, Tuple
 from PySide6 import QtCore, QtGui, QtWidgets
-from core.utils import human_size, unzip_first
-from core.device_manager import list_devices, system_disk_path, Device
-from core.imaging import ImageWriter
+from core.utils import human_size
+from core.sources import IMAGE_EXTENSIONS, probe
+from core.bmap import find_bmap, parse_bmap
+from core.checksum import Checksum, HashCache, find_checksum, file_key
+from core.device_manager import Device
+from core.inventory import DeviceInventory
+from core.worker import ProcessWriter
+from core.telemetry import Telemetry
 from ui.styles import dark_qss
 from ui.widgets import DropZone, Badge
 
 Signal = QtCore.Signal
 
 class MainWindow(QtWidgets.QMainWindow):
+    device_event = Signal(str, object)
+    writer_event = Signal(str, object)
+    probe_event = Signal(str, object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("BitBurner")
@@ -17,9 +27,11 @@ class MainWindow(QtWidgets.QMainWindow):
         self.setMinimumSize(940, 620)
         self.src_path = ""
         self.src_size = 0
-        self.src_tmp = ""
+        self.src_bmap = ""
+        self.src_checksum: Optional[Checksum] = None
+        self._probe_seq = 0
         self.devices: List[Device] = []
-        self.selected: Optional[Device] = None
+        self.selected: List[Device] = []
         self.stack = QtWidgets.QStackedWidget()
         self.setCentralWidget(self.stack)
         self._build_select_page()
@@ -27,6 +39,23 @@ class MainWindow(QtWidgets.QMainWindow):
         self._build_burn_page()
         self.stack.setCurrentWidget(self.pg_select)
         self.setStyleSheet(dark_qss())
+        self.device_event.connect(self._on_device_event, QtCore.Qt.QueuedConnection)
+        self.writer_event.connect(self._on_writer_event, QtCore.Qt.QueuedConnection)
+        self.probe_event.connect(self._on_probe_event, QtCore.Qt.QueuedConnection)
+        self.telemetry: Optional[Telemetry] = None
+        self.progress_timer = QtCore.QTimer(self)
+        self.progress_timer.setInterval(200)
+        self.progress_timer.timeout.connect(self._sample_progress)
+        self.inventory = DeviceInventory()
+        self.inventory.on_added = lambda d: self.device_event.emit("added", d)
+        self.inventory.on_removed = lambda d: self.device_event.emit("removed", d)
+        self.inventory.on_changed = lambda d: self.device_event.emit("changed", d)
+        self.inventory.on_error = lambda msg: self.device_event.emit("error", msg)
+        self.inventory.start()
+
+    def closeEvent(self, e):
+        self.inventory.stop()
+        super().closeEvent(e)
 
     def _card(self, title: str, sub: str) -> Tuple[QtWidgets.QWidget, QtWidgets.QVBoxLayout]:
         w = QtWidgets.QWidget()
@@ -52,9 +81,9 @@ class MainWindow(QtWidgets.QMainWindow):
         return w, inner
 
     def _build_select_page(self):
-        self.pg_select, box = self._card("1) Select Image", "ISO/IMG or ZIP — drag & drop or choose via dialog")
+        self.pg_select, box = self._card("1) Select Image", "ISO/IMG or compressed image — drag & drop or choose via dialog")
         self.drop = DropZone()
-        self.drop.setToolTip("*.img, *.iso, *.zip")
+        self.drop.setToolTip(", ".join("*" + e for e in IMAGE_EXTENSIONS))
         self.drop.fileDropped.connect(self._set_image_path)
         self.drop.clicked.connect(self._open_file_dialog)
         btn_row = QtWidgets.QHBoxLayout()
@@ -75,9 +104,9 @@ class MainWindow(QtWidgets.QMainWindow):
         self.stack.addWidget(self.pg_select)
 
     def _open_file_dialog(self):
-        dlg = QtWidgets.QFileDialog(self, "Choose image (.img/.iso/.zip)")
+        dlg = QtWidgets.QFileDialog(self, "Choose image (.img/.iso/.zip/.xz/.gz/.bz2/.zst/.qcow2/.vhd/.vmdk)")
         dlg.setOption(QtWidgets.QFileDialog.DontUseNativeDialog, True)
-        dlg.setNameFilter("Image Files (*.img *.iso *.zip)")
+        dlg.setNameFilter("Image Files ({})".format(" ".join("*" + e for e in IMAGE_EXTENSIONS)))
         dlg.setFileMode(QtWidgets.QFileDialog.ExistingFile)
         if dlg.exec():
             files = dlg.selectedFiles()
@@ -85,27 +114,68 @@ class MainWindow(QtWidgets.QMainWindow):
                 self._set_image_path(files[0])
 
     def _set_image_path(self, path: str):
-        if self.src_tmp and os.path.exists(self.src_tmp):
-            try:
-                os.remove(self.src_tmp)
-            except Exception:
-                pass
-        self.src_tmp = ""
+        self._probe_seq += 1
+        self.src_path = ""
+        self.btn_next1.setEnabled(False)
+        self.lbl_sel.setText(f"Reading {os.path.basename(path)}…")
+        threading.Thread(target=self._probe_image, args=(self._probe_seq, path), daemon=True).start()
+
+    def _probe_image(self, seq: int, path: str):
         try:
-            if path.lower().endswith(".zip"):
-                tmp, size, inner = unzip_first(path)
-                if not tmp:
-                    QtWidgets.QMessageBox.critical(self, "ZIP", "Failed to extract inner file from ZIP.")
-                    return
-                self.src_path, self.src_size, self.src_tmp = tmp, size, tmp
-                shown = f"{os.path.basename(path)} → {inner} ({human_size(size)})"
-            else:
-                self.src_path = path
-                self.src_size = os.path.getsize(path)
-                shown = f"{os.path.basename(path)} ({human_size(self.src_size)})"
+            kind, size, inner = probe(path)
+            info = {"seq": seq, "path": path, "kind": kind, "size": size, "inner": inner,
+                    "bmap": find_bmap(path) or "", "bmap_error": None, "bmap_info": None}
+            if info["bmap"]:
+                try:
+                    info["bmap_info"] = parse_bmap(info["bmap"])
+                except Exception as e:
+                    info["bmap_error"] = str(e)
+            info["checksum"] = find_checksum(path)
+            c = info["checksum"]
+            info["known"] = HashCache().lookup(file_key(path), c.algo) if c else None
         except Exception as e:
-            QtWidgets.QMessageBox.critical(self, "File", f"Failed to process file: {e}")
+            self.probe_event.emit("error", (seq, str(e)))
             return
+        self.probe_event.emit("done", info)
+
+    def _on_probe_event(self, kind: str, payload):
+        if kind == "error":
+            seq, msg = payload
+            if seq == self._probe_seq:
+                self.lbl_sel.setText("No file selected")
+                QtWidgets.QMessageBox.critical(self, "File", f"Failed to process file: {msg}")
+            return
+        if payload["seq"] != self._probe_seq:
+            return
+        path, kind, size, inner = payload["path"], payload["kind"], payload["size"], payload["inner"]
+        self.src_path = path
+        self.src_size = size
+        if kind == "zip":
+            shown = f"{os.path.basename(path)} → {inner} ({human_size(size)})"
+        elif kind != "raw":
+            extra = f", {human_size(size)} uncompressed" if size else ""
+            shown = f"{os.path.basename(path)} ({kind}{extra})"
+        else:
+            shown = f"{os.path.basename(path)} ({human_size(size)})"
+        self.src_bmap = payload["bmap"]
+        if payload["bmap_error"]:
+            QtWidgets.QMessageBox.warning(self, "Block Map", f"Ignoring {os.path.basename(self.src_bmap)}: {payload['bmap_error']}\nThe whole image will be written.")
+            self.src_bmap = ""
+        elif self.src_bmap:
+            bm = payload["bmap_info"]
+            self.src_size = self.src_size or bm.image_size
+            shown += f" + {os.path.basename(self.src_bmap)} ({human_size(bm.mapped_bytes)} mapped)"
+        self.src_checksum = payload["checksum"]
+        if self.src_checksum:
+            c = self.src_checksum
+            known = payload["known"]
+            if known and known != c.digest:
+                self.src_path = ""
+                self.lbl_sel.setText("No file selected")
+                QtWidgets.QMessageBox.critical(self, "Checksum", f"{os.path.basename(path)} does not match its {c.algo.upper()} checksum in {os.path.basename(c.sidecar)}.")
+                return
+            state = "verified" if known else "checked while writing"
+            shown += f" · {c.algo.upper()} {state}"
         self.lbl_sel.setText(f"Selected: <b>{shown}</b>")
         self.btn_next1.setEnabled(True)
         eff = QtWidgets.QGraphicsColorizeEffect(self.drop)
@@ -129,6 +199,7 @@ class MainWindow(QtWidgets.QMainWindow):
         hh.setSectionResizeMode(3, QtWidgets.QHeaderView.ResizeToContents)
         self.tbl.verticalHeader().setVisible(False)
         self.tbl.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.tbl.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
         self.tbl.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
         self.tbl.setShowGrid(False)
         self.tbl.setAlternatingRowColors(True)
@@ -152,55 +223,98 @@ class MainWindow(QtWidgets.QMainWindow):
         box.addWidget(self.tbl, 1)
         box.addWidget(self.lbl_sel_dev)
         box.addLayout(btns)
-        self.btn_refresh.clicked.connect(self._refresh_devices)
-        self.btn_next2.clicked.connect(lambda: self.stack.setCurrentWidget(self.pg_burn))
-        self.tbl.cellClicked.connect(self._on_table_clicked)
+        self.btn_refresh.clicked.connect(lambda: threading.Thread(target=self.inventory.rescan, daemon=True).start())
+        self.btn_next2.clicked.connect(self._show_burn_page)
+        self.tbl.itemSelectionChanged.connect(self._on_selection_changed)
         self.stack.addWidget(self.pg_devices)
 
     def _refresh_devices(self):
-        self.devices = list_devices()
+        self.devices = self.inventory.devices()
         self.tbl.setRowCount(len(self.devices))
-        lock_icon = self.style().standardIcon(QtWidgets.QStyle.SP_MessageBoxWarning)
-        drive_icon = self.style().standardIcon(QtWidgets.QStyle.SP_DriveHDIcon)
-        usb_icon = self.style().standardIcon(QtWidgets.QStyle.SP_DriveFDIcon)
         for i, d in enumerate(self.devices):
-            name = d.name or os.path.basename(d.path)
-            it0 = QtWidgets.QTableWidgetItem(name)
-            it1 = QtWidgets.QTableWidgetItem(d.path)
-            it2 = QtWidgets.QTableWidgetItem(human_size(d.size))
-            status = "SYSTEM (LOCKED)" if d.protected else "Available"
-            it3 = QtWidgets.QTableWidgetItem(status)
-            it0.setIcon(lock_icon if d.protected else (usb_icon if "usb" in name.lower() else drive_icon))
-            f = it0.font()
-            f.setBold(True)
-            it0.setFont(f)
-            if d.protected:
-                col = QtGui.QColor("#ff8b8b")
-                for it in (it0,it1,it2,it3):
-                    it.setForeground(col)
-            else:
-                it3.setForeground(QtGui.QBrush(QtGui.QColor("#9fe1b4")))
-            self.tbl.setItem(i,0,it0)
-            self.tbl.setItem(i,1,it1)
-            self.tbl.setItem(i,2,it2)
-            self.tbl.setItem(i,3,it3)
-            self.tbl.setRowHeight(i, 34)
-        self.selected = None
+            self._fill_device_row(i, d)
+        self.selected = []
         self.lbl_sel_dev.setText("No device selected")
         self.btn_next2.setEnabled(False)
 
-    def _on_table_clicked(self, row, col):
-        d = self.devices[row]
+    def _fill_device_row(self, i: int, d: Device):
+        lock_icon = self.style().standardIcon(QtWidgets.QStyle.SP_MessageBoxWarning)
+        drive_icon = self.style().standardIcon(QtWidgets.QStyle.SP_DriveHDIcon)
+        usb_icon = self.style().standardIcon(QtWidgets.QStyle.SP_DriveFDIcon)
+        name = d.name or os.path.basename(d.path)
+        it0 = QtWidgets.QTableWidgetItem(name)
+        it1 = QtWidgets.QTableWidgetItem(d.path)
+        it2 = QtWidgets.QTableWidgetItem(human_size(d.size))
+        status = "SYSTEM (LOCKED)" if d.protected else "Available"
+        it3 = QtWidgets.QTableWidgetItem(status)
+        portable = (d.caps and d.caps.transport in ("usb", "mmc")) or "usb" in name.lower()
+        it0.setIcon(lock_icon if d.protected else (usb_icon if portable else drive_icon))
+        f = it0.font()
+        f.setBold(True)
+        it0.setFont(f)
         if d.protected:
+            col = QtGui.QColor("#ff8b8b")
+            for it in (it0,it1,it2,it3):
+                it.setForeground(col)
+        else:
+            it3.setForeground(QtGui.QBrush(QtGui.QColor("#9fe1b4")))
+        self.tbl.setItem(i,0,it0)
+        self.tbl.setItem(i,1,it1)
+        self.tbl.setItem(i,2,it2)
+        self.tbl.setItem(i,3,it3)
+        self.tbl.setRowHeight(i, 34)
+
+    def _on_device_event(self, kind: str, d):
+        if kind == "error":
+            self.lbl_sel_dev.setText(d)
+            return
+        row = next((i for i, x in enumerate(self.devices) if x.path == d.path), -1)
+        if kind == "removed":
+            if row < 0:
+                return
+            self.tbl.blockSignals(True)
+            self.tbl.removeRow(row)
+            self.tbl.blockSignals(False)
+            del self.devices[row]
+            if self.stack.currentWidget() is not self.pg_burn:
+                self._on_selection_changed()
+            if d.path in {j.path for j in self.selected} and self.btn_cancel.isEnabled():
+                self._set_job_status(d.path, "Removed")
+            return
+        if row < 0:
+            row = len(self.devices)
+            self.devices.append(d)
+            self.tbl.insertRow(row)
+        else:
+            self.devices[row] = d
+            self.selected = [d if j.path == d.path else j for j in self.selected]
+        self._fill_device_row(row, d)
+
+    def _on_selection_changed(self):
+        rows = sorted({i.row() for i in self.tbl.selectedIndexes()})
+        locked = [r for r in rows if self.devices[r].protected]
+        if locked:
+            self.tbl.blockSignals(True)
+            for r in locked:
+                self.tbl.selectionModel().select(self.tbl.model().index(r, 0),
+                    QtCore.QItemSelectionModel.Deselect | QtCore.QItemSelectionModel.Rows)
+            self.tbl.blockSignals(False)
             QtWidgets.QMessageBox.warning(self, "Locked", "This appears to be the system disk and is not selectable.")
-            self.tbl.clearSelection()
-            self.selected = None
-            self.btn_next2.setEnabled(False)
+        self.selected = [self.devices[r] for r in rows if r not in locked]
+        if not self.selected:
             self.lbl_sel_dev.setText("No device selected")
-            return
-        self.selected = d
-        self.lbl_sel_dev.setText(f"Selected: <b>{d.name}</b> — {d.path} ({human_size(d.size)})")
-        self.btn_next2.setEnabled(True)
+        elif len(self.selected) == 1:
+            d = self.selected[0]
+            self.lbl_sel_dev.setText(f"Selected: <b>{d.name}</b> — {d.path} ({human_size(d.size)})")
+        else:
+            self.lbl_sel_dev.setText(f"Selected: <b>{len(self.selected)} devices</b> — " + ", ".join(d.path for d in self.selected))
+        self.btn_next2.setEnabled(bool(self.selected))
+
+    def _show_burn_page(self):
+        multi = len(self.selected) > 1
+        self.lbl_lag.setVisible(multi)
+        self.spn_lag.setVisible(multi)
+        self.stack.setCurrentWidget(self.pg_burn)
 
     def _build_burn_page(self):
         self.pg_burn, box = self._card("3) Write Image", "Do not remove the device during writing")
@@ -209,22 +323,62 @@ class MainWindow(QtWidgets.QMainWindow):
         self.btn_cancel = QtWidgets.QPushButton("Stop")
         self.btn_cancel.setProperty("secondary","true")
         self.btn_cancel.setEnabled(False)
+        self.btn_pause = QtWidgets.QPushButton("Pause")
+        self.btn_pause.setProperty("secondary","true")
+        self.btn_pause.setEnabled(False)
+        self.chk_verify = QtWidgets.QCheckBox("Verify after writing")
+        self.chk_verify.setChecked(True)
+        self.chk_resume = QtWidgets.QCheckBox("Resume interrupted write")
+        self.chk_resume.setChecked(True)
+        self.spn_lag = QtWidgets.QSpinBox()
+        self.spn_lag.setRange(0, 600)
+        self.spn_lag.setSuffix(" s")
+        self.spn_lag.setSpecialValueText("never")
+        self.spn_lag.setToolTip("Drop a device that stalls the other targets for this long")
+        self.lbl_lag = QtWidgets.QLabel("Drop a stalled device after:")
         top.addWidget(self.btn_start)
         top.addWidget(self.btn_cancel)
+        top.addWidget(self.btn_pause)
         top.addStretch(1)
+        top.addWidget(self.lbl_lag)
+        top.addWidget(self.spn_lag)
+        top.addWidget(self.chk_resume)
+        top.addWidget(self.chk_verify)
         self.p_write = QtWidgets.QProgressBar()
         self.p_write.setRange(0,100)
         self.l_speed = QtWidgets.QLabel("Speed: —/s")
         self.l_speed.setProperty("class","muted")
         self.l_eta   = QtWidgets.QLabel("ETA: —")
         self.l_eta.setProperty("class","muted")
+        self.p_verify = QtWidgets.QProgressBar()
+        self.p_verify.setRange(0,100)
+        self.l_vspeed = QtWidgets.QLabel("Speed: —/s")
+        self.l_vspeed.setProperty("class","muted")
+        self.l_veta = QtWidgets.QLabel("ETA: —")
+        self.l_veta.setProperty("class","muted")
         box.addLayout(top)
         box.addWidget(QtWidgets.QLabel("<b>Progress</b>"))
         box.addWidget(self.p_write)
         box.addWidget(self.l_speed)
         box.addWidget(self.l_eta)
+        box.addWidget(QtWidgets.QLabel("<b>Verify</b>"))
+        box.addWidget(self.p_verify)
+        box.addWidget(self.l_vspeed)
+        box.addWidget(self.l_veta)
+        self.tbl_jobs = QtWidgets.QTableWidget(0, 3)
+        self.tbl_jobs.setHorizontalHeaderLabels(["Device", "Progress", "Status"])
+        jh = self.tbl_jobs.horizontalHeader()
+        jh.setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+        jh.setSectionResizeMode(1, QtWidgets.QHeaderView.ResizeToContents)
+        jh.setSectionResizeMode(2, QtWidgets.QHeaderView.Stretch)
+        self.tbl_jobs.verticalHeader().setVisible(False)
+        self.tbl_jobs.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.tbl_jobs.setShowGrid(False)
+        self.tbl_jobs.setVisible(False)
+        box.addWidget(self.tbl_jobs, 1)
         self.btn_start.clicked.connect(self._start_burn)
         self.btn_cancel.clicked.connect(self._cancel_burn)
+        self.btn_pause.clicked.connect(self._toggle_pause)
         self.stack.addWidget(self.pg_burn)
 
     def _start_burn(self):
@@ -234,33 +388,116 @@ class MainWindow(QtWidgets.QMainWindow):
         if not self.selected:
             QtWidgets.QMessageBox.warning(self, "Missing", "Choose a target device.")
             return
-        if self.selected.protected:
-            QtWidgets.QMessageBox.warning(self, "Locked", "System disk is protected.")
-            return
-        if self.selected.size and self.src_size and self.src_size > self.selected.size:
-            QtWidgets.QMessageBox.critical(self, "Size Mismatch", f"Image size ({human_size(self.src_size)}) is larger than device ({human_size(self.selected.size)}).")
-            return
+        for d in self.selected:
+            if d.protected:
+                QtWidgets.QMessageBox.warning(self, "Locked", "System disk is protected.")
+                return
+            if d.size and self.src_size and self.src_size > d.size:
+                QtWidgets.QMessageBox.critical(self, "Size Mismatch", f"Image size ({human_size(self.src_size)}) is larger than device {d.path} ({human_size(d.size)}).")
+                return
         self.p_write.setValue(0)
         self.l_speed.setText("Speed: —/s")
         self.l_eta.setText("ETA: —")
+        self.p_verify.setValue(0)
+        self.l_vspeed.setText("Speed: —/s")
+        self.l_veta.setText("ETA: —")
         self.btn_start.setEnabled(False)
         self.btn_cancel.setEnabled(True)
-        self.writer = ImageWriter()
-        self.writer.on_progress = self._on_progress
-        self.writer.on_error = self._on_error
-        self.writer.on_finished = self._on_finished
-        self.writer.on_canceled = self._on_canceled
-        self.writer.start(self.src_path, self.selected.path)
+        self.btn_pause.setEnabled(True)
+        self.btn_pause.setText("Pause")
+        self.writer = ProcessWriter(verify=self.chk_verify.isChecked(), resume=self.chk_resume.isChecked(),
+                                    lag_timeout=self.spn_lag.value() or None)
+        self.writer.on_error = lambda msg: self.writer_event.emit("error", msg)
+        self.writer.on_finished = lambda: self.writer_event.emit("finished", None)
+        self.writer.on_canceled = lambda: self.writer_event.emit("canceled", None)
+        self.writer.on_device_error = lambda path, msg: self.writer_event.emit("status", (path, msg))
+        self.writer.on_device_finished = lambda path: self.writer_event.emit("status", (path, "Done"))
+        self.telemetry = Telemetry(self.writer)
+        paths = [d.path for d in self.selected]
+        self.tbl_jobs.setRowCount(len(paths))
+        for i, p in enumerate(paths):
+            self.tbl_jobs.setItem(i, 0, QtWidgets.QTableWidgetItem(p))
+            self.tbl_jobs.setItem(i, 1, QtWidgets.QTableWidgetItem("0%"))
+            self.tbl_jobs.setItem(i, 2, QtWidgets.QTableWidgetItem("Waiting"))
+        self.tbl_jobs.setVisible(len(paths) > 1)
+        self.writer.start(self.src_path, paths if len(paths) > 1 else paths[0], self.src_bmap or None, self.src_checksum)
+        self.progress_timer.start()
 
     def _cancel_burn(self):
         if hasattr(self, "writer") and self.writer:
             self.writer.cancel()
 
+    def _toggle_pause(self):
+        if not (hasattr(self, "writer") and self.writer):
+            return
+        if self.btn_pause.text() == "Pause":
+            self.writer.pause()
+            self.btn_pause.setText("Continue")
+        else:
+            self.writer.unpause()
+            self.btn_pause.setText("Pause")
+
+    def _sample_progress(self):
+        if not self.telemetry:
+            return
+        snap = self.telemetry.sample()
+        for d in snap["devices"]:
+            if d["finished"] or d["state"] not in ("writing", "verifying"):
+                continue
+            self._on_device_progress(d["path"], d["phase"], d["ratio"], d["done"], d["total"], d["bps"], d["eta"])
+        for phase, slot in (("write", self._on_progress), ("verify", self._on_verify_progress)):
+            o = snap[phase]
+            if o:
+                slot(o["ratio"], o["done"], o["total"], o["bps"], o["eta"])
+
+    def _on_writer_event(self, kind: str, payload):
+        if kind == "status":
+            self._set_job_status(*payload)
+            return
+        self.progress_timer.stop()
+        self._sample_progress()
+        self.telemetry = None
+        self.btn_pause.setEnabled(False)
+        self.btn_pause.setText("Pause")
+        if kind == "error":
+            self._on_error(payload)
+        elif kind == "canceled":
+            self._on_canceled()
+        else:
+            self._on_finished()
+
     def _on_progress(self, ratio, done, total, bps, eta):
         self.p_write.setValue(int(ratio*100))
-        self.l_speed.setText(f"Speed: {human_size(int(bps))}/s")
+        stats = self.writer.stats
+        skipped = stats.get("skipped", 0)
+        extra = f" — written {human_size(stats.get('written', 0))}, skipped {human_size(skipped)}" if skipped else ""
+        self.l_speed.setText(f"Speed: {human_size(int(bps))}/s{extra}")
         self.l_eta.setText("ETA: calculating…" if eta < 0 else f"ETA: {eta}s")
 
+    def _on_verify_progress(self, ratio, done, total, bps, eta):
+        self.p_verify.setValue(int(ratio*100))
+        self.l_vspeed.setText(f"Speed: {human_size(int(bps))}/s")
+        self.l_veta.setText("ETA: calculating…" if eta < 0 else f"ETA: {eta}s")
+
+    def _job_row(self, path) -> int:
+        for i in range(self.tbl_jobs.rowCount()):
+            if self.tbl_jobs.item(i, 0).text() == path:
+                return i
+        return -1
+
+    def _on_device_progress(self, path, phase, ratio, done, total, bps, eta):
+        row = self._job_row(path)
+        if row < 0:
+            return
+        self.tbl_jobs.item(row, 1).setText(f"{int(ratio*100)}%")
+        label = "Writing" if phase == "write" else "Verifying"
+        self.tbl_jobs.item(row, 2).setText(f"{label} — {human_size(int(bps))}/s")
+
+    def _set_job_status(self, path, text):
+        row = self._job_row(path)
+        if row >= 0:
+            self.tbl_jobs.item(row, 2).setText(text)
+
     def _on_error(self, msg):
         self.btn_cancel.setEnabled(False)
         self.btn_start.setEnabled(True)
@@ -272,19 +509,21 @@ class MainWindow(QtWidgets.QMainWindow):
     def _on_finished(self):
         self.btn_cancel.setEnabled(False)
         self.p_write.setValue(100)
-        QtWidgets.QMessageBox.information(self, "Done", "Image has been written successfully.")
+        msg = "Image has been written and verified successfully." if self.writer.verify else "Image has been written successfully."
+        if self.writer.source_check and self.src_checksum:
+            msg += f"\nSource checksum matches {os.path.basename(self.src_checksum.sidecar)}."
+        failed = {p: e for p, e in self.writer.results.items() if e}
+        if failed:
+            msg += "\n\nFailed targets:\n" + "\n".join(f"{p}: {e}" for p, e in failed.items())
+        QtWidgets.QMessageBox.information(self, "Done", msg)
         self._reset_to_home(None)
 
     def _reset_common(self):
-        if self.src_tmp and os.path.exists(self.src_tmp):
-            try:
-                os.remove(self.src_tmp)
-            except Exception:
-                pass
         self.src_path = ""
         self.src_size = 0
-        self.src_tmp = ""
-        self.selected = None
+        self.src_bmap = ""
+        self.src_checksum = None
+        self.selected = []
 
     def _reset_to_home(self, info_text: Optional[str]):
         self._reset_common()
@@ -296,6 +535,11 @@ class MainWindow(QtWidgets.QMainWindow):
         self.p_write.setValue(0)
         self.l_speed.setText("Speed: —/s")
         self.l_eta.setText("ETA: —")
+        self.p_verify.setValue(0)
+        self.l_vspeed.setText("Speed: —/s")
+        self.l_veta.setText("ETA: —")
+        self.tbl_jobs.setRowCount(0)
+        self.tbl_jobs.setVisible(False)
         self.stack.setCurrentWidget(self.pg_select)
         if info_text:
             QtWidgets.QMessageBox.information(self, "Info", info_text)
@@ -1,4 +1,5 @@
 from PySide6 import QtCore, QtGui, QtWidgets
+from core.sources import IMAGE_EXTENSIONS
 
 Signal = QtCore.Signal
 
@@ -54,7 +55,7 @@ class DropZone(QtWidgets.QFrame):
     def dragEnterEvent(self, e):
         if e.mimeData().hasUrls():
             for u in e.mimeData().urls():
-                if u.toLocalFile().lower().endswith((".img",".iso",".zip")):
+                if u.toLocalFile().lower().endswith(IMAGE_EXTENSIONS):
                     e.acceptProposedAction()
                     return
         e.ignore()
@@ -62,7 +63,7 @@ class DropZone(QtWidgets.QFrame):
     def dropEvent(self, e):
         for u in e.mimeData().urls():
             p = u.toLocalFile()
-            if p.lower().endswith((".img",".iso",".zip")):
+            if p.lower().endswith(IMAGE_EXTENSIONS):
                 self.fileDropped.emit(p)
                 break
 